@@ -0,0 +1,59 @@
+"""
+ASGI entry point: the Solara server running `cds_portal.pages`, plus the
+portal's own operational routes.
+
+    uvicorn cds_portal.asgi:app --port 8000
+
+`/metrics` serves the API client metrics (see `cds_portal.metrics`) in the
+Prometheus text format. When `CDS_METRICS_TOKEN` is set, scrapers must send
+it as a bearer token.
+
+With `CDS_RENDER_CACHE` set, anonymous first paints of the static pages are
+served from a render cache (see `cds_portal.render_cache`). With
+`CDS_SESSION_POOL_SIZE` set, new anonymous visitors are handed pre-warmed
+sessions (see `cds_portal.session_pool`).
+"""
+
+import hmac
+import os
+
+# Must be set before `solara.server` is imported, which loads the app.
+os.environ.setdefault("SOLARA_APP", "cds_portal.pages")
+
+from solara.server.starlette import app  # noqa: E402
+from starlette.requests import Request  # noqa: E402
+from starlette.responses import PlainTextResponse, Response  # noqa: E402
+from starlette.routing import Route  # noqa: E402
+
+from . import metrics, render_cache, routing, session_pool  # noqa: E402
+
+METRICS_TOKEN = os.getenv("CDS_METRICS_TOKEN")
+
+
+def metrics_endpoint(request: Request) -> Response:
+    if METRICS_TOKEN and not hmac.compare_digest(
+        request.headers.get("authorization", ""), f"Bearer {METRICS_TOKEN}"
+    ):
+        return Response(status_code=401)
+
+    return PlainTextResponse(
+        metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+# Ahead of Solara's own routes, so its catch-all page route does not answer
+# these paths.
+app.router.routes.insert(0, Route("/metrics", endpoint=metrics_endpoint))
+
+
+def preload_pages():
+    # Already imported by Solara's own startup handler, which runs first
+    from . import pages
+
+    routing.preload(pages.__name__, pages.__path__)
+
+
+app.router.on_startup.append(preload_pages)
+
+render_cache.install()
+session_pool.install()
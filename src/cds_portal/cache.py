@@ -0,0 +1,220 @@
+import threading
+import time
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Thread-safe, process-wide mapping whose entries expire `ttl` seconds after
+    they were stored. `None` is a valid cached value; use the `default`
+    argument of `get` to tell a miss apart from a cached `None`.
+    """
+
+    def __init__(self, ttl: float, maxsize: int = 1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+
+            value, expires = entry
+
+            if expires < time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl: float = None):
+        ttl = self.ttl if ttl is None else ttl
+
+        with self._lock:
+            if key not in self._data and len(self._data) >= self.maxsize:
+                self._evict()
+
+            self._data[key] = (value, time.monotonic() + ttl)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._data.pop(key, _MISSING)
+
+        return default if entry is _MISSING else entry[0]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def stats(self) -> dict:
+        """Returns the number of lookups that hit and missed, and the size."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._data)}
+
+    def __len__(self):
+        return len(self._data)
+
+    def _evict(self):
+        # Drop anything already expired first, then fall back to the oldest
+        # insertion so the cache never grows past `maxsize`.
+        now = time.monotonic()
+        expired = [key for key, (_, expires) in self._data.items() if expires < now]
+
+        for key in expired:
+            del self._data[key]
+
+        if len(self._data) >= self.maxsize:
+            del self._data[next(iter(self._data))]
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls that share a key into a single execution: the
+    first caller runs the function while later callers block until it
+    finishes and then receive the same result (or exception).
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            self.calls += 1
+
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+
+            if call.error is not None:
+                raise call.error
+
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+            call.done.set()
+
+        return call.result
+
+    def stats(self) -> dict:
+        """
+        Returns the number of calls made through this `SingleFlight`, how many
+        of them were served by another caller's in-flight execution, and how
+        many executions are currently in flight.
+        """
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._calls),
+            }
+
+
+class StaleWhileRevalidateCache:
+    """
+    Cache that always answers from the last known value once it has one. A
+    value older than `max_age` seconds is still returned immediately, but a
+    refresh is started on `executor` so a later call sees fresh data.
+
+    `invalidate` forgets a value outright (e.g. after a write), and also
+    discards the result of any refresh that was already running for it.
+    """
+
+    def __init__(self, max_age: float, executor, logger=None):
+        self.max_age = max_age
+        self.executor = executor
+        self.logger = logger
+        self._data = {}
+        self._generations = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def get(self, key, fetch, block: bool = True):
+        """
+        Returns the value for `key`, calling `fetch()` to produce it on a miss.
+        With `block=False`, a miss returns `None` instead of fetching.
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            generation = self._generations.get(key, 0)
+            stale = entry is not None and time.monotonic() - entry[1] > self.max_age
+            refresh = stale and key not in self._refreshing
+
+            if refresh:
+                self._refreshing.add(key)
+
+        if refresh:
+            self.executor.submit(self._refresh, key, fetch, generation)
+
+        if entry is not None:
+            return entry[0]
+
+        if not block:
+            return None
+
+        value = fetch()
+        self._store(key, value, generation)
+
+        return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic())
+
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+            self._generations[key] = self._generations.get(key, 0) + 1
+
+    def _store(self, key, value, generation):
+        with self._lock:
+            # A write invalidated the key while we were fetching; whatever we
+            # fetched may predate it.
+            if self._generations.get(key, 0) == generation:
+                self._data[key] = (value, time.monotonic())
+
+    def _refresh(self, key, fetch, generation):
+        try:
+            self._store(key, fetch(), generation)
+        except Exception:
+            if self.logger is not None:
+                self.logger.exception("Failed to refresh cached value for %s.", key)
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
@@ -0,0 +1,253 @@
+"""
+Attributes every upstream API call to the component render, widget event or
+background task that issued it, and warns when one of them makes more than
+`CALL_BUDGET` calls. A render or event handler that loops over classes (or
+students) calling the API once per item shows up here long before it shows
+up in latency.
+
+Tracking is off unless `CDS_API_CALL_TRACKING` is set (e.g. to "1"); it is
+cheap enough to leave on in production. Exceeded budgets are logged with the
+offending endpoints and call site, and counted in the
+`cds_api_call_budget_exceeded_total` metric.
+
+Scopes are found as follows:
+
+- while reacton renders a component (or runs its effects), calls belong to
+  that component's current render;
+- otherwise they belong to the innermost `scope` entered in the current
+  context, e.g. the widget event being handled (see `install`) or the
+  `use_api_resource` fetch that is running;
+- work submitted to a `ScopedThreadPoolExecutor` stays in the scope that
+  submitted it.
+"""
+
+import collections
+import contextlib
+import contextvars
+import inspect
+import os
+import sys
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from . import metrics
+from .logger import setup_logger
+
+logger = setup_logger("CALLS")
+
+ENABLED = os.getenv("CDS_API_CALL_TRACKING", "").lower() in ("1", "true", "yes")
+
+# Number of upstream calls a single render, event or task may make before a
+# warning is logged.
+CALL_BUDGET = int(os.getenv("CDS_API_CALL_BUDGET", 5))
+
+BUDGET_EXCEEDED = metrics.REGISTRY.register(
+    metrics.Counter(
+        "cds_api_call_budget_exceeded_total",
+        "Renders, events and tasks that made more upstream API calls than"
+        " CDS_API_CALL_BUDGET.",
+        ("kind", "name"),
+    )
+)
+
+# Frames in these files are plumbing, not the code that asked for the call.
+_INTERNAL_FILES = {
+    str(Path(__file__).with_name(name))
+    for name in ("call_tracking.py", "remote.py", "cache.py", "utils.py")
+}
+
+
+class CallScope:
+    def __init__(self, kind: str, name: str):
+        self.kind = kind
+        self.name = name
+        self.calls = collections.Counter()  # "METHOD endpoint" -> count
+        self.exceeded = False
+        self._lock = threading.Lock()
+
+    def add(self, call: str) -> bool:
+        """
+        Counts `call` and returns whether it is the one that took the scope
+        over budget.
+        """
+        with self._lock:
+            self.calls[call] += 1
+
+            if self.exceeded or sum(self.calls.values()) <= CALL_BUDGET:
+                return False
+
+            self.exceeded = True
+            return True
+
+
+_current = contextvars.ContextVar("cds_api_call_scope", default=None)
+
+# Render context -> (render phase, {id(component context): CallScope})
+_render_scopes = weakref.WeakKeyDictionary()
+_render_lock = threading.Lock()
+
+
+def _render_scope() -> CallScope | None:
+    import reacton.core
+
+    rc = reacton.core.get_render_context(required=False)
+    context = getattr(rc, "context", None)
+    element = getattr(context, "invoke_element", None)
+
+    if element is None:
+        return None
+
+    with _render_lock:
+        phase, scopes = _render_scopes.get(rc, (None, None))
+
+        if phase != rc.render_count:
+            scopes = {}
+            _render_scopes[rc] = (rc.render_count, scopes)
+
+        scope = scopes.get(id(context))
+
+        if scope is None:
+            component = element.component
+            f = getattr(component, "f", None)
+            name = f"{f.__module__}.{f.__qualname__}" if f else repr(component)
+            scope = scopes[id(context)] = CallScope("render", name)
+
+    return scope
+
+
+def current_scope() -> CallScope | None:
+    if not ENABLED:
+        return None
+
+    return _render_scope() or _current.get()
+
+
+@contextlib.contextmanager
+def scope(kind: str, name: str):
+    """Attributes the calls made inside the block to a new scope."""
+    if not ENABLED:
+        yield None
+        return
+
+    new_scope = CallScope(kind, name)
+    token = _current.set(new_scope)
+
+    try:
+        yield new_scope
+    finally:
+        _current.reset(token)
+
+
+def tracked(kind: str, fn):
+    """
+    Returns `fn` (a function or coroutine function) wrapped so that each call
+    runs in its own scope, named after `fn`.
+    """
+    if not ENABLED:
+        return fn
+
+    name = f"{fn.__module__}.{fn.__qualname__}"
+
+    if inspect.iscoroutinefunction(fn):
+        async def _tracked_coroutine(*args, **kwargs):
+            with scope(kind, name):
+                return await fn(*args, **kwargs)
+
+        return _tracked_coroutine
+
+    def _tracked(*args, **kwargs):
+        with scope(kind, name):
+            return fn(*args, **kwargs)
+
+    return _tracked
+
+
+def _call_site() -> str:
+    frame = sys._getframe(1)
+
+    while frame is not None:
+        filename = frame.f_code.co_filename
+
+        if filename not in _INTERNAL_FILES and "cds_portal" in filename:
+            return f" at {filename}:{frame.f_lineno} in {frame.f_code.co_name}"
+
+        frame = frame.f_back
+
+    # e.g. on a worker thread, where the scope name is all there is to go by
+    return ""
+
+
+def record(method: str, endpoint: str):
+    """Counts an upstream call against the scope it was made in."""
+    if not ENABLED:
+        return
+
+    current = current_scope()
+
+    if current is None or not current.add(f"{method} {endpoint}"):
+        return
+
+    BUDGET_EXCEEDED.inc(current.kind, current.name)
+    logger.warning(
+        "%s %s exceeded its budget of %d API calls (%s)%s.",
+        current.kind,
+        current.name,
+        CALL_BUDGET,
+        ", ".join(f"{call} x{count}" for call, count in current.calls.most_common()),
+        _call_site(),
+    )
+
+
+def _run_in_scope(call_scope, fn, *args, **kwargs):
+    token = _current.set(call_scope)
+
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        _current.reset(token)
+
+
+class ScopedThreadPoolExecutor(ThreadPoolExecutor):
+    """
+    `ThreadPoolExecutor` whose work counts against the scope of whoever
+    submitted it, so fanning calls out to worker threads does not hide them.
+    """
+
+    def submit(self, fn, /, *args, **kwargs):
+        call_scope = current_scope()
+
+        if call_scope is None:
+            return super().submit(fn, *args, **kwargs)
+
+        return super().submit(_run_in_scope, call_scope, fn, *args, **kwargs)
+
+
+_installed = False
+
+
+def install():
+    """
+    Opens a scope for every message a widget receives from the browser
+    (clicks, value changes, ...), so calls made by event handlers are
+    attributed to them. Does nothing unless tracking is enabled.
+    """
+    global _installed
+
+    if not ENABLED or _installed:
+        return
+
+    import ipywidgets
+
+    handle_msg = ipywidgets.Widget._handle_msg
+
+    def _handle_msg(self, msg):
+        data = msg["content"]["data"]
+        event = (data.get("content") or {}).get("event") or data.get("method")
+
+        with scope("event", f"{type(self).__name__} {event}"):
+            return handle_msg(self, msg)
+
+    ipywidgets.Widget._handle_msg = _handle_msg
+    _installed = True
@@ -0,0 +1,94 @@
+"""
+Process-wide cache of Plotly figures that are the same for every session,
+such as those of the static example pages.
+
+A figure is built once per key and kept as its Plotly JSON. Sessions get a
+`go.Figure` rebuilt from that JSON without running Plotly's validators again,
+which costs a fraction of building (and validating) the figure from scratch.
+Concurrent sessions asking for a figure that is not cached yet wait for a
+single build.
+"""
+
+import json
+from typing import Callable, Hashable
+
+import plotly.graph_objects as go
+
+from . import metrics
+from .cache import SingleFlight, TTLCache
+
+# Distinct figures kept, e.g. one per resolution of each example plot; the
+# oldest is dropped beyond this.
+FIGURE_CACHE_SIZE = 256
+
+
+class FigureCache:
+    def __init__(self, maxsize: int = FIGURE_CACHE_SIZE):
+        # Figures never go stale; they only change with the code
+        self._json = TTLCache(ttl=float("inf"), maxsize=maxsize)
+        self._flight = SingleFlight()
+
+    def _build(self, key: Hashable, build: Callable[[], go.Figure]) -> str:
+        figure_json = build().to_json()
+        self._json.set(key, figure_json)
+
+        return figure_json
+
+    def get_json(self, key: Hashable, build: Callable[[], go.Figure]) -> str:
+        """
+        Returns the Plotly JSON of the figure for `key`, calling `build()` to
+        make the figure if it is not cached.
+        """
+        figure_json = self._json.get(key)
+
+        if figure_json is None:
+            figure_json = self._flight.do(key, lambda: self._build(key, build))
+
+        return figure_json
+
+    def get(self, key: Hashable, build: Callable[[], go.Figure]) -> go.Figure:
+        """
+        Returns a copy of the figure for `key`, which the caller may modify
+        without affecting other sessions.
+        """
+        return go.Figure(json.loads(self.get_json(key, build)), _validate=False)
+
+    def clear(self):
+        self._json.clear()
+
+    def collect_metrics(self) -> list:
+        stats = self._json.stats()
+
+        return [
+            *metrics.samples(
+                "cds_figure_cache_hits_total",
+                "Figures served from the process-wide figure cache.",
+                "counter",
+                {None: stats["hits"]},
+            ),
+            *metrics.samples(
+                "cds_figure_cache_misses_total",
+                "Figure cache lookups that found no figure and built (or waited for) it.",
+                "counter",
+                {None: stats["misses"]},
+            ),
+            *metrics.samples(
+                "cds_figure_cache_entries",
+                "Figures held in the process-wide figure cache.",
+                "gauge",
+                {None: stats["size"]},
+            ),
+        ]
+
+
+FIGURES = FigureCache()
+metrics.REGISTRY.add_collector(FIGURES.collect_metrics)
+
+
+def cached_figure(key: Hashable, build: Callable[[], go.Figure]) -> go.Figure:
+    """
+    Returns the figure for `key` from the process-wide cache, building it
+    with `build()` on first use. `key` must identify everything the figure
+    depends on, since every session asking for it gets the same figure.
+    """
+    return FIGURES.get(key, build)
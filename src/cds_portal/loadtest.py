@@ -0,0 +1,645 @@
+"""
+Load test for the portal. Opens `--sessions` concurrent websocket sessions
+against a portal server, speaking the same kernel protocol as the browser,
+and walks each one through a scripted educator journey (login, Manage
+Classes, activate a class, Manage Students):
+
+    cds-portal-loadtest --sessions 50 --ramp 10
+
+It needs the `loadtest` extra (`pip install cds-portal[loadtest]`).
+
+By default the portal is started in a subprocess, as in the `Procfile`, against
+an in-process `cds_portal.mock_api` server, so the numbers include neither
+Auth0 nor the real CosmicDS API. Use `--url` (with `--api-url` and `--pid`)
+to point the harness at servers that are already running instead.
+
+"Login" is a session cookie signed with the server's session secret, carrying
+a generated user, which is what the Auth0 callback would have stored. The
+latency of a step is the time from sending its message until the server has
+sent its last widget update, i.e. until the session has been quiet for
+`--settle` seconds. The report gives p50/p95/p99 latencies per step, the
+number of requests the portal made to the (mock) API and the resident memory
+of the portal process.
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import math
+import os
+import secrets
+import socket
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+import httpx
+
+from .logger import setup_logger
+
+logger = setup_logger("LOADTEST")
+
+SESSION_COOKIE = "solara-session"
+SESSION_ID_COOKIE = "solara-session-id"
+
+
+def _percentile(values: list, q: float) -> float:
+    """Nearest-rank percentile of `values` (0 < q <= 100)."""
+    if not values:
+        return float("nan")
+
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def _rss_bytes(pid: int) -> int | None:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+
+    return None
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def login_cookie(secret_key: str, client_id: str, userinfo: dict) -> str:
+    """
+    Returns a `solara-session` cookie value that the server's session
+    middleware accepts as a logged in `userinfo`.
+    """
+    import itsdangerous
+
+    session = {
+        "token": json.dumps({}),
+        "user": json.dumps(userinfo),
+        "client_id": client_id,
+    }
+    data = base64.b64encode(json.dumps(session).encode("utf-8"))
+
+    return itsdangerous.TimestampSigner(str(secret_key)).sign(data).decode("utf-8")
+
+
+def _message(msg_type: str, content: dict, session: str) -> str:
+    return json.dumps(
+        {
+            "header": {
+                "msg_id": uuid.uuid4().hex,
+                "msg_type": msg_type,
+                "session": session,
+                "username": "loadtest",
+                "date": datetime.now(timezone.utc).isoformat(),
+                "version": "5.3",
+            },
+            "parent_header": {},
+            "metadata": {},
+            "content": content,
+            "channel": "shell",
+            "buffers": [],
+        }
+    )
+
+
+def _decode(message) -> dict:
+    if isinstance(message, str):
+        return json.loads(message)
+
+    # Binary frames carry widget buffers after the JSON part; see
+    # `solara.server.kernel.serialize_binary_message`.
+    count = int.from_bytes(message[:4], "big")
+    start = int.from_bytes(message[4:8], "big")
+    end = int.from_bytes(message[8:12], "big") if count > 1 else None
+
+    return json.loads(message[start:end].decode("utf-8"))
+
+
+class PortalSession:
+    """
+    One simulated browser tab: a websocket to a fresh kernel, plus a mirror of
+    the state of every widget the server has created in it, so that steps can
+    find the button or table they want to interact with.
+    """
+
+    def __init__(self, url: str, cookies: dict, settle: float = 0.3, timeout: float = 30):
+        self.url = url.rstrip("/")
+        self.cookies = dict(cookies)
+        self.settle = settle
+        self.timeout = timeout
+        self.page_id = uuid.uuid4().hex
+        self.models = {}  # comm id -> widget state
+        self._ws = None
+        self._reader = None
+        self._last_message = 0.0
+        self._finished = asyncio.Event()
+
+    async def connect(self, client: httpx.AsyncClient):
+        import websockets
+
+        # The first page load is what hands out the session id cookie.
+        response = await client.get(f"{self.url}/", cookies=self.cookies)
+        response.raise_for_status()
+
+        if SESSION_ID_COOKIE in response.cookies:
+            self.cookies[SESSION_ID_COOKIE] = response.cookies[SESSION_ID_COOKIE]
+
+        ws_url = self.url.replace("http", "ws", 1)
+        cookie = "; ".join(f"{key}={value}" for key, value in self.cookies.items())
+        self._ws = await websockets.connect(
+            f"{ws_url}/jupyter/api/kernels/{uuid.uuid4()}/channels"
+            f"?session_id={self.page_id}",
+            additional_headers={"Cookie": cookie},
+            max_size=None,
+        )
+        self._reader = asyncio.create_task(self._read())
+
+    async def close(self):
+        if self._ws is not None:
+            await self._ws.close()
+
+        if self._reader is not None:
+            await asyncio.gather(self._reader, return_exceptions=True)
+
+    async def _read(self):
+        async for message in self._ws:
+            self._last_message = time.perf_counter()
+            msg = _decode(message)
+            msg_type = msg["header"]["msg_type"]
+            content = msg["content"]
+
+            if msg_type == "comm_open" and content.get("target_name") == "jupyter.widget":
+                self.models[content["comm_id"]] = dict(content["data"].get("state", {}))
+            elif msg_type == "comm_msg":
+                data = content["data"]
+
+                if data.get("method") == "update" and content["comm_id"] in self.models:
+                    self.models[content["comm_id"]].update(data.get("state", {}))
+                elif data.get("method") == "finished":
+                    self._finished.set()
+            elif msg_type == "comm_close":
+                self.models.pop(content["comm_id"], None)
+
+    async def _send(self, msg_type: str, content: dict):
+        await self._ws.send(_message(msg_type, content, self.page_id))
+
+    async def _quiet(self, started: float) -> float:
+        """
+        Waits until the server has been silent for `settle` seconds and returns
+        the time from `started` until its last message.
+        """
+        deadline = started + self.timeout
+
+        while True:
+            if self._reader.done():
+                raise ConnectionError("The server closed the websocket.")
+
+            now = time.perf_counter()
+            last = max(self._last_message, started)
+
+            if now - last >= self.settle:
+                return last - started
+
+            if now > deadline:
+                raise TimeoutError(f"The session did not settle within {self.timeout}s.")
+
+            await asyncio.sleep(min(self.settle / 4, 0.05))
+
+    async def open(self, path: str = "/") -> float:
+        """Renders the app at `path`, as loading the page in a browser does."""
+        started = time.perf_counter()
+        comm_id = uuid.uuid4().hex
+        await self._send(
+            "comm_open",
+            {"comm_id": comm_id, "target_name": "solara.control", "data": {}},
+        )
+        await self._send(
+            "comm_msg",
+            {
+                "comm_id": comm_id,
+                "data": {
+                    "method": "run",
+                    "args": {"path": path, "appName": "__default__", "dark": True},
+                },
+            },
+        )
+        await asyncio.wait_for(self._finished.wait(), self.timeout)
+
+        return await self._quiet(started)
+
+    async def update(self, model_id: str, state: dict) -> float:
+        started = time.perf_counter()
+        self.models[model_id].update(state)
+        await self._send(
+            "comm_msg",
+            {
+                "comm_id": model_id,
+                "data": {"method": "update", "state": state, "buffer_paths": []},
+            },
+        )
+
+        return await self._quiet(started)
+
+    async def fire(self, model_id: str, event: str, data=None) -> float:
+        started = time.perf_counter()
+        await self._send(
+            "comm_msg",
+            {
+                "comm_id": model_id,
+                "data": {
+                    "method": "custom",
+                    "content": {"event": event, "data": data or {}},
+                },
+            },
+        )
+
+        return await self._quiet(started)
+
+    def text(self, model_id: str) -> str:
+        """Concatenated text of a widget and all of its descendants."""
+        parts = []
+
+        for child in self.models.get(model_id, {}).get("children") or []:
+            if isinstance(child, str) and child.startswith("IPY_MODEL_"):
+                parts.append(self.text(child[len("IPY_MODEL_"):]))
+            elif isinstance(child, str):
+                parts.append(child)
+
+        return " ".join(part for part in parts if part)
+
+    def find(self, model_name: str, predicate=lambda model_id, state: True) -> str:
+        for model_id, state in list(self.models.items()):
+            if state.get("_model_name") == model_name and predicate(model_id, state):
+                return model_id
+
+        raise LookupError(f"No {model_name} widget found in the session.")
+
+    async def navigate(self, path: str) -> float:
+        navigator = self.find("VuetifyTemplateModel", lambda _, state: "location" in state)
+        return await self.update(navigator, {"location": path})
+
+    async def click(self, label: str) -> float:
+        button = self.find(
+            "BtnModel",
+            lambda model_id, state: not state.get("disabled")
+            and self.text(model_id).strip() == label,
+        )
+        return await self.fire(button, "click")
+
+    async def select_rows(self, count: int = 1) -> float:
+        table = self.find("DataTableModel", lambda _, state: state.get("items"))
+        return await self.update(table, {"v_model": self.models[table]["items"][:count]})
+
+
+async def _manage_classes(session):
+    return await session.navigate("/manage_classes")
+
+
+async def _toggle_active(session):
+    # Selecting the row re-renders the activation buttons before they can be
+    # clicked, so both round trips count towards the step.
+    return await session.select_rows(1) + await session.click("Activate")
+
+
+async def _manage_students(session):
+    return await session.navigate("/manage_students")
+
+
+EDUCATOR_JOURNEY = [
+    ("login", lambda session: session.open("/")),
+    ("manage_classes", _manage_classes),
+    ("toggle_active", _toggle_active),
+    ("manage_students", _manage_students),
+]
+
+
+@dataclass
+class Results:
+    latencies: dict = field(default_factory=dict)  # step -> [seconds]
+    errors: dict = field(default_factory=dict)  # step -> [message]
+    rss: list = field(default_factory=list)  # sampled bytes
+    sessions: int = 0
+    duration: float = 0.0
+    upstream: dict = field(default_factory=dict)
+
+    def record(self, step: str, latency: float):
+        self.latencies.setdefault(step, []).append(latency)
+
+    def fail(self, step: str, error: BaseException):
+        self.errors.setdefault(step, []).append(f"{type(error).__name__}: {error}")
+
+    def summary(self) -> dict:
+        steps = {}
+
+        for step, values in self.latencies.items():
+            steps[step] = {
+                "count": len(values),
+                "p50": _percentile(values, 50),
+                "p95": _percentile(values, 95),
+                "p99": _percentile(values, 99),
+                "max": max(values),
+            }
+
+        return {
+            "sessions": self.sessions,
+            "duration": self.duration,
+            "steps": steps,
+            "errors": {step: len(errors) for step, errors in self.errors.items()},
+            "upstream": self.upstream,
+            "rss": {
+                "start": self.rss[0] if self.rss else None,
+                "peak": max(self.rss) if self.rss else None,
+                "end": self.rss[-1] if self.rss else None,
+            },
+        }
+
+
+async def _run_session(index: int, args, client: httpx.AsyncClient, results: Results):
+    userinfo = {
+        "cds/email": f"loadtest-{index}-{uuid.uuid4().hex[:8]}@example.org",
+        "cds/name": f"Load Test {index}",
+    }
+    cookies = {SESSION_COOKIE: login_cookie(args.secret_key, args.client_id, userinfo)}
+    session = PortalSession(args.url, cookies, settle=args.settle, timeout=args.timeout)
+
+    try:
+        await session.connect(client)
+
+        for step, action in EDUCATOR_JOURNEY:
+            try:
+                results.record(step, await action(session))
+            except Exception as e:
+                results.fail(step, e)
+                break
+    except Exception as e:
+        results.fail("connect", e)
+    finally:
+        await session.close()
+
+
+async def _sample_rss(pid: int, results: Results, stop: asyncio.Event):
+    while True:
+        rss = _rss_bytes(pid)
+
+        if rss is not None:
+            results.rss.append(rss)
+
+        try:
+            await asyncio.wait_for(stop.wait(), 0.5)
+            return
+        except asyncio.TimeoutError:
+            pass
+
+
+async def _upstream_stats(client: httpx.AsyncClient, api_url: str) -> dict | None:
+    from .mock_api import STATS_PATH
+
+    try:
+        response = await client.get(f"{api_url.rstrip('/')}{STATS_PATH}")
+        response.raise_for_status()
+    except httpx.HTTPError:
+        return None
+
+    return response.json()
+
+
+async def run_load_test(args) -> Results:
+    results = Results(sessions=args.sessions)
+    stop = asyncio.Event()
+    limits = httpx.Limits(max_connections=args.sessions)
+
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+        before = await _upstream_stats(client, args.api_url) if args.api_url else None
+        sampler = (
+            asyncio.create_task(_sample_rss(args.pid, results, stop))
+            if args.pid
+            else None
+        )
+        started = time.perf_counter()
+
+        async def _delayed(index):
+            await asyncio.sleep(args.ramp * index / max(1, args.sessions))
+            await _run_session(index, args, client, results)
+
+        await asyncio.gather(*(_delayed(index) for index in range(args.sessions)))
+        results.duration = time.perf_counter() - started
+        stop.set()
+
+        if sampler is not None:
+            await sampler
+
+        after = await _upstream_stats(client, args.api_url) if args.api_url else None
+
+    if before is not None and after is not None:
+        endpoints = {
+            endpoint: count - before["endpoints"].get(endpoint, 0)
+            for endpoint, count in after["endpoints"].items()
+        }
+        results.upstream = {
+            "requests": after["requests"] - before["requests"],
+            "per_session": (after["requests"] - before["requests"]) / max(1, args.sessions),
+            "endpoints": {endpoint: count for endpoint, count in endpoints.items() if count},
+        }
+
+    return results
+
+
+def _start_mock_api(args) -> tuple:
+    import uvicorn
+
+    from .mock_api import MockState, create_app
+
+    state = MockState(
+        educators=args.sessions,
+        classes_per_educator=args.classes_per_educator,
+        students_per_class=args.students_per_class,
+    )
+    app = create_app(state, latency=args.api_latency, jitter=args.api_latency / 2)
+    port = _free_port()
+    server = uvicorn.Server(
+        uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+    )
+    thread = threading.Thread(target=server.run, name="mock-api", daemon=True)
+    thread.start()
+
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError("The mock API server failed to start.")
+        time.sleep(0.05)
+
+    return server, f"http://127.0.0.1:{port}"
+
+
+def _start_portal(args, api_url: str) -> subprocess.Popen:
+    port = _free_port()
+    env = dict(
+        os.environ,
+        CDS_API_URL=api_url,
+        SOLARA_SESSION_SECRET_KEY=args.secret_key,
+        SOLARA_OAUTH_CLIENT_ID=args.client_id,
+    )
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "cds_portal.asgi:app",
+            "--host", "127.0.0.1", "--port", str(port),
+        ],
+        env=env,
+    )
+    args.url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + args.startup_timeout
+
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"The portal exited with code {process.returncode}.")
+
+        try:
+            if httpx.get(f"{args.url}/readyz", timeout=1).status_code == 200:
+                return process
+        except httpx.HTTPError:
+            pass
+
+        time.sleep(0.25)
+
+    process.terminate()
+    raise TimeoutError(f"The portal did not start within {args.startup_timeout}s.")
+
+
+def format_report(summary: dict) -> str:
+    lines = [
+        f"{summary['sessions']} sessions in {summary['duration']:.1f}s",
+        "",
+        f"{'step':<18}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}{'errors':>8}",
+    ]
+
+    for step, _ in [("connect", None), *EDUCATOR_JOURNEY]:
+        stats = summary["steps"].get(step)
+        errors = summary["errors"].get(step, 0)
+
+        if stats is None and not errors:
+            continue
+
+        stats = stats or {"count": 0, "p50": 0, "p95": 0, "p99": 0, "max": 0}
+        lines.append(
+            f"{step:<18}{stats['count']:>6}"
+            + "".join(f"{stats[key] * 1000:>10.0f}" for key in ("p50", "p95", "p99", "max"))
+            + f"{errors:>8}"
+        )
+
+    if summary["upstream"]:
+        upstream = summary["upstream"]
+        lines += [
+            "",
+            f"upstream requests: {upstream['requests']}"
+            f" ({upstream['per_session']:.1f} per session)",
+        ]
+        lines += [
+            f"  {count:>6}  {endpoint}"
+            for endpoint, count in sorted(
+                upstream["endpoints"].items(), key=lambda item: -item[1]
+            )
+        ]
+
+    rss = summary["rss"]
+    if rss["peak"] is not None:
+        lines += [
+            "",
+            "portal RSS: "
+            + ", ".join(
+                f"{key} {rss[key] / 2**20:.0f} MiB" for key in ("start", "peak", "end")
+            ),
+        ]
+
+    return "\n".join(lines)
+
+
+def parse_args(args):
+    parser = argparse.ArgumentParser(description="Concurrent session load test for the portal")
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument(
+        "--ramp", type=float, default=5.0, help="Seconds over which sessions are started"
+    )
+    parser.add_argument(
+        "--settle",
+        type=float,
+        default=0.3,
+        help="Seconds without server messages after which a step counts as rendered",
+    )
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-step timeout (s)")
+    parser.add_argument(
+        "--url", help="Portal to test; by default one is started in a subprocess"
+    )
+    parser.add_argument(
+        "--api-url",
+        help="Mock API the portal talks to, for upstream request counts"
+        " (started in-process when --url is not given)",
+    )
+    parser.add_argument("--pid", type=int, help="Portal process id, for RSS sampling")
+    parser.add_argument(
+        "--secret-key",
+        default=os.getenv("SOLARA_SESSION_SECRET_KEY") or secrets.token_hex(16),
+        help="The portal's SOLARA_SESSION_SECRET_KEY, used to sign login cookies",
+    )
+    parser.add_argument(
+        "--client-id",
+        help="The portal's SOLARA_OAUTH_CLIENT_ID (default: solara's setting)",
+    )
+    parser.add_argument("--api-latency", type=float, default=20.0, help="Mock API latency (ms)")
+    parser.add_argument("--classes-per-educator", type=int, default=4)
+    parser.add_argument("--students-per-class", type=int, default=30)
+    parser.add_argument("--startup-timeout", type=float, default=60.0)
+    parser.add_argument("--json", action="store_true", help="Print the summary as JSON")
+    return parser.parse_args(args)
+
+
+def main(args):
+    args = parse_args(args)
+
+    if args.client_id is None:
+        from solara.server import settings
+
+        args.client_id = settings.oauth.client_id
+
+    mock_server = portal = None
+
+    try:
+        if args.url is None:
+            mock_server, args.api_url = _start_mock_api(args)
+            portal = _start_portal(args, args.api_url)
+            args.pid = portal.pid
+            logger.info("Started the portal at %s (pid %d).", args.url, portal.pid)
+
+        results = asyncio.run(run_load_test(args))
+    finally:
+        if portal is not None:
+            portal.terminate()
+            portal.wait()
+
+        if mock_server is not None:
+            mock_server.should_exit = True
+
+    summary = results.summary()
+    print(json.dumps(summary, indent=2) if args.json else format_report(summary))
+
+    for step, errors in results.errors.items():
+        for error in sorted(set(errors)):
+            logger.warning("%s: %s", step, error)
+
+
+def run():
+    main(sys.argv[1:])
+
+
+if __name__ == "__main__":
+    run()
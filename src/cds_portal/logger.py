@@ -1,4 +1,23 @@
+import atexit
+import copy
+import json
 import logging
+import logging.handlers
+import os
+import queue
+import random
+from datetime import datetime, timezone
+
+# "json" writes one JSON object per record from a background thread (see
+# `_get_queue_handler`); anything else keeps the plain console format.
+LOG_FORMAT = os.getenv("CDS_LOG_FORMAT", "text").lower()
+
+# Overrides the level passed to `setup_logger`, e.g. CDS_LOG_LEVEL=INFO.
+LOG_LEVEL = os.getenv("CDS_LOG_LEVEL")
+
+# Fraction of DEBUG records that are kept; the rest are dropped before they
+# are formatted.
+DEBUG_SAMPLE_RATE = float(os.getenv("CDS_LOG_DEBUG_SAMPLE_RATE", 1.0))
 
 
 class CustomFormatter(logging.Formatter):
@@ -9,11 +28,127 @@ class CustomFormatter(logging.Formatter):
         super().__init__(self.FORMAT, datefmt="%Y-%m-%d %H:%M:%S")
 
 
+class JsonFormatter(logging.Formatter):
+    FIELDS = ("session_id", "kernel_id", "request_id")
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "thread": record.threadName,
+        }
+
+        for field in self.FIELDS:
+            value = getattr(record, field, None)
+
+            if value is not None:
+                entry[field] = value
+
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif getattr(record, "exception", None):
+            entry["exception"] = record.exception
+
+        return json.dumps(entry, default=str)
+
+
+class CorrelationFilter(logging.Filter):
+    """
+    Tags records with the Solara session and kernel (browser tab) they were
+    logged from, and the id of the kernel message (e.g. a click) being
+    handled. Must run on the thread that logs, i.e. before the queue.
+    """
+
+    def filter(self, record):
+        try:
+            from solara.server import kernel_context
+
+            if not kernel_context.has_current_context():
+                return True
+
+            context = kernel_context.get_current_context()
+        except Exception:
+            return True
+
+        record.session_id = context.session_id
+        record.kernel_id = context.id
+
+        try:
+            record.request_id = context.kernel.get_parent("shell")["header"]["msg_id"]
+        except Exception:
+            pass
+
+        return True
+
+
+class DebugSampler(logging.Filter):
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno > logging.DEBUG or random.random() < self.rate
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # Unlike the default, keeps the traceback out of the message so it
+        # ends up in its own JSON field.
+        record = copy.copy(record)
+        record.msg = record.message = record.getMessage()
+        record.args = None
+
+        if record.exc_info:
+            record.exception = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+            record.exc_text = None
+
+        return record
+
+
+_queue_handler = None
+
+
+def _get_queue_handler() -> logging.Handler:
+    """
+    Returns the `QueueHandler` shared by all loggers in JSON mode. Records are
+    tagged and sampled on the calling thread, then formatted and written by a
+    `QueueListener` thread, so logging never waits on the output stream.
+    """
+    global _queue_handler
+
+    if _queue_handler is None:
+        records = queue.SimpleQueue()
+        stream = logging.StreamHandler()
+        stream.setFormatter(JsonFormatter())
+
+        listener = logging.handlers.QueueListener(records, stream)
+        listener.start()
+        atexit.register(listener.stop)
+
+        handler = _QueueHandler(records)
+        handler.addFilter(DebugSampler(DEBUG_SAMPLE_RATE))
+        handler.addFilter(CorrelationFilter())
+        _queue_handler = handler
+
+    return _queue_handler
+
+
 def setup_logger(name, level=logging.DEBUG):
+    level = LOG_LEVEL.upper() if LOG_LEVEL else level
+
     # Create a logger
     logger = logging.getLogger(name)
     logger.setLevel(level)
 
+    if LOG_FORMAT == "json":
+        if not logger.hasHandlers():
+            logger.addHandler(_get_queue_handler())
+
+        return logger
+
     # Create a console handler
     ch = logging.StreamHandler()
     ch.setLevel(level)
@@ -21,6 +156,9 @@ def setup_logger(name, level=logging.DEBUG):
     # Set the custom formatter
     ch.setFormatter(CustomFormatter())
 
+    if DEBUG_SAMPLE_RATE < 1:
+        ch.addFilter(DebugSampler(DEBUG_SAMPLE_RATE))
+
     # Add the handler to the logger
     if not logger.hasHandlers():
         logger.addHandler(ch)
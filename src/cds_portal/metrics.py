@@ -0,0 +1,223 @@
+"""
+Process-wide metrics of the portal's requests to the CosmicDS API, rendered
+in the Prometheus text exposition format by `render` (served at `/metrics`
+by `cds_portal.asgi`).
+
+Requests are labelled with their endpoint template (e.g.
+"/classes/roster/{class_id}") rather than the formatted path, so the number
+of series stays bounded.
+"""
+
+import bisect
+import threading
+from typing import Callable, Iterable
+
+# Upper bounds of the request duration (seconds) and payload size (bytes)
+# histogram buckets.
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20)
+SIZE_BUCKETS = (128, 512, 2048, 8192, 32768, 131072, 524288, 2097152)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+
+    if extra:
+        pairs.append(extra)
+
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels) -> float:
+        with self._lock:
+            return self._values.get(labels, 0)
+
+    def collect(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} counter"
+
+        with self._lock:
+            values = sorted(self._values.items())
+
+        for labels, value in values:
+            yield f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"
+
+
+class Histogram:
+    """
+    Cumulative histogram with fixed bucket upper bounds, one set of buckets
+    per combination of label values.
+    """
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: tuple = (), buckets=DURATION_BUCKETS
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # labels -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+
+        with self._lock:
+            series = self._series.get(labels)
+
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+
+            series[index] += 1
+            series[-1] += value
+
+    def count(self, *labels) -> int:
+        with self._lock:
+            series = self._series.get(labels)
+            return sum(series[:-1]) if series else 0
+
+    def collect(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+
+        with self._lock:
+            all_series = sorted((labels, list(series)) for labels, series in self._series.items())
+
+        for labels, series in all_series:
+            cumulative = 0
+
+            for bound, count in zip((*self.buckets, float("inf")), series):
+                cumulative += count
+                le = f'le="{_number(bound)}"'
+                yield (
+                    f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}"
+                )
+
+            yield f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(series[-1])}"
+
+
+class Registry:
+    """
+    The metrics to render. Besides metric objects, a registry holds
+    collectors: functions called at render time that return the lines of
+    metrics kept elsewhere (e.g. the circuit breaker's state).
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+
+        return metric
+
+    def add_collector(self, collector: Callable[[], Iterable[str]]):
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        with self._lock:
+            sources = [metric.collect for metric in self._metrics] + list(self._collectors)
+
+        lines = []
+
+        for source in sources:
+            lines.extend(source())
+
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+API_REQUEST_DURATION = REGISTRY.register(
+    Histogram(
+        "cds_api_request_duration_seconds",
+        "Duration of requests to the CosmicDS API, per attempt.",
+        ("endpoint", "method"),
+    )
+)
+API_REQUESTS = REGISTRY.register(
+    Counter(
+        "cds_api_requests_total",
+        "Requests to the CosmicDS API by response status ('error' for"
+        " requests that got no response, e.g. connection errors and timeouts).",
+        ("endpoint", "method", "status"),
+    )
+)
+API_RESPONSE_SIZE = REGISTRY.register(
+    Histogram(
+        "cds_api_response_size_bytes",
+        "Size of CosmicDS API response bodies.",
+        ("endpoint", "method"),
+        buckets=SIZE_BUCKETS,
+    )
+)
+API_CACHE = REGISTRY.register(
+    Counter(
+        "cds_api_cache_total",
+        "GET requests to the CosmicDS API by how they were answered: 'miss'"
+        " (fresh body from the server), 'revalidated' (304, cached body reused),"
+        " 'coalesced' (shared a concurrent identical request) or 'stale'"
+        " (last good response served while the server is failing).",
+        ("endpoint", "result"),
+    )
+)
+
+
+def observe_request(
+    endpoint: str, method: str, status, duration: float, size: int = None
+):
+    API_REQUEST_DURATION.observe(duration, endpoint, method)
+    API_REQUESTS.inc(endpoint, method, str(status))
+
+    if size is not None:
+        API_RESPONSE_SIZE.observe(size, endpoint, method)
+
+
+def observe_cache(endpoint: str, result: str):
+    API_CACHE.inc(endpoint, result)
+
+
+def samples(name: str, documentation: str, kind: str, values: dict, labelname: str = None) -> list:
+    """
+    Returns the lines of a metric of type `kind` ("gauge" or "counter") kept
+    outside the registry, with one sample per item of `values`, keyed by the
+    value of label `labelname` (or by `None` for a metric without labels).
+    """
+    lines = [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}"]
+
+    for key, value in values.items():
+        labels = _labels((labelname,), (key,)) if labelname else ""
+        lines.append(f"{name}{labels} {_number(value)}")
+
+    return lines
+
+
+def render() -> str:
+    return REGISTRY.render()
@@ -0,0 +1,501 @@
+"""
+Local stand-in for the CosmicDS API server, implementing the endpoints used
+by `cds_portal.remote`. Rosters are seeded from a deterministic generator and
+responses can be delayed or failed on purpose, so the portal's data paths can
+be exercised (and benchmarked) offline:
+
+    cds-portal-mock-api --port 8081 --educators 20 --latency 40 --error-rate 0.01
+    CDS_API_URL=http://localhost:8081 solara run cds_portal.pages
+
+Any educator hash the server has not seen before is bound to the next seeded
+educator (or a freshly generated one), so whoever logs in to the portal sees
+a populated set of classes. Request counts, in total and per endpoint, are
+served from `/_mock/stats`.
+"""
+
+import argparse
+import asyncio
+import collections
+import hashlib
+import itertools
+import json
+import random
+import string
+import sys
+import threading
+from datetime import datetime, timedelta, timezone
+
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Match, Route
+
+STATS_PATH = "/_mock/stats"
+
+
+def _timestamp(moment: datetime) -> str:
+    return moment.strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+class MockState:
+    """
+    In-memory data behind the mock server, seeded with `educators` educators,
+    each with `classes_per_educator` classes of `students_per_class` students.
+    """
+
+    def __init__(
+        self,
+        educators: int = 10,
+        classes_per_educator: int = 4,
+        students_per_class: int = 30,
+        seed: int = 0,
+        auto_provision: bool = True,
+    ):
+        self.random = random.Random(seed)
+        self.auto_provision = auto_provision
+        self.lock = threading.Lock()
+        self.now = datetime(2024, 9, 1, tzinfo=timezone.utc)
+
+        self._ids = itertools.count(1)
+        self.requests = 0
+        self.endpoint_requests = collections.Counter()  # "METHOD /route" -> count
+        self.educators = {}  # username -> educator
+        self.students = {}  # username -> student
+        self.classes = {}  # id -> class
+        self.rosters = {}  # class id -> [student username]
+        self.active = {}  # (class id, story name) -> bool
+        self.overrides = set()  # class ids
+        self._unclaimed = []
+
+        for _ in range(educators):
+            educator = self._new_educator(f"seed-educator-{len(self.educators)}")
+            self._unclaimed.append(educator["username"])
+
+            for _ in range(classes_per_educator):
+                cls = self._new_class(educator["id"], f"Section {len(self.classes) + 1}")
+
+                for _ in range(students_per_class):
+                    student = self._new_student(f"seed-student-{len(self.students)}")
+                    self.rosters[cls["id"]].append(student["username"])
+
+    def _new_educator(self, username: str, **info) -> dict:
+        first_name = info.get("first_name") or self.random.choice(
+            ["Ada", "Carl", "Henrietta", "Edwin", "Vera", "Annie", "Jocelyn"]
+        )
+        last_name = info.get("last_name") or self.random.choice(
+            ["Leavitt", "Hubble", "Rubin", "Cannon", "Sagan", "Burnell"]
+        )
+        educator = {
+            "id": next(self._ids),
+            "username": username,
+            "first_name": first_name,
+            "last_name": last_name,
+            "email": info.get("email", f"{username}@example.org"),
+            "institution": info.get("institution", "Mock High School"),
+        }
+        self.educators[username] = educator
+
+        return educator
+
+    def _new_student(self, username: str) -> dict:
+        created = self.now - timedelta(days=self.random.randint(1, 365))
+        last_visit = created + timedelta(days=self.random.randint(0, 30))
+        student = {
+            "id": next(self._ids),
+            "username": username,
+            "profile_created": _timestamp(created),
+            "last_visit": _timestamp(last_visit),
+        }
+        self.students[username] = student
+
+        return student
+
+    def _new_class(self, educator_id: int, name: str, **info) -> dict:
+        class_id = next(self._ids)
+        cls = {
+            "id": class_id,
+            "name": name,
+            "code": "".join(self.random.choices(string.ascii_lowercase, k=8)),
+            "educator_id": educator_id,
+            "created": _timestamp(self.now - timedelta(days=self.random.randint(1, 90))),
+            "expected_size": info.get("expected_size", 30),
+            "small_class": info.get("expected_size", 30) < 15,
+            "asynchronous": info.get("asynchronous", False),
+        }
+        self.classes[class_id] = cls
+        self.rosters[class_id] = []
+        self.active[(class_id, info.get("story_name", "hubbles_law"))] = (
+            self.random.random() < 0.5
+        )
+
+        return cls
+
+    def educator(self, key: str) -> dict | None:
+        if key in self.educators:
+            return self.educators[key]
+
+        if key.isdigit():
+            return next(
+                (edu for edu in self.educators.values() if edu["id"] == int(key)), None
+            )
+
+        if not self.auto_provision:
+            return None
+
+        # Bind a previously unseen (hashed) user to a seeded educator, so a
+        # portal login lands on a populated account.
+        if self._unclaimed:
+            educator = self.educators.pop(self._unclaimed.pop(0))
+        else:
+            educator = self._new_educator(key)
+            self._new_class(educator["id"], "Section 1")
+
+        educator["username"] = key
+        self.educators[key] = educator
+
+        return educator
+
+    def class_by_code(self, code: str) -> dict | None:
+        return next((cls for cls in self.classes.values() if cls["code"] == code), None)
+
+
+def _etag(payload) -> str:
+    body = json.dumps(payload, sort_keys=True).encode()
+    return f'"{hashlib.md5(body).hexdigest()}"'
+
+
+def _conditional(request: Request, payload) -> Response:
+    etag = _etag(payload)
+
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+
+    return JSONResponse(payload, headers={"ETag": etag})
+
+
+def create_app(
+    state: MockState,
+    latency: float = 0.0,
+    jitter: float = 0.0,
+    error_rate: float = 0.0,
+    bulk_active: bool = True,
+) -> Starlette:
+    """
+    Returns the mock API as a Starlette app. Every request is delayed by
+    `latency` ± `jitter` milliseconds and fails with a 503 with probability
+    `error_rate`. With `bulk_active=False` the bulk class activation endpoint
+    answers 404, as the production server may.
+    """
+
+    async def get_student(request: Request):
+        with state.lock:
+            student = state.students.get(request.path_params["username"])
+
+        return JSONResponse({"student": student})
+
+    async def get_student_classes(request: Request):
+        username = request.path_params["username"]
+
+        with state.lock:
+            if username not in state.students:
+                return JSONResponse({"classes": []}, status_code=404)
+
+            classes = [
+                state.classes[class_id]
+                for class_id, roster in state.rosters.items()
+                if username in roster
+            ]
+
+        return JSONResponse({"classes": classes})
+
+    async def create_student(request: Request):
+        data = await request.json()
+
+        with state.lock:
+            cls = state.class_by_code(data.get("classroom_code", ""))
+
+            if data["username"] in state.students or cls is None:
+                return JSONResponse({"error": "Invalid request"}, status_code=400)
+
+            student = state._new_student(data["username"])
+            state.rosters[cls["id"]].append(student["username"])
+
+        return JSONResponse({"student_info": student}, status_code=201)
+
+    async def get_educator(request: Request):
+        with state.lock:
+            educator = state.educator(request.path_params["key"])
+
+        return JSONResponse({"educator": educator})
+
+    async def create_educator(request: Request):
+        data = await request.json()
+
+        with state.lock:
+            if data["username"] in state.educators:
+                return JSONResponse({"error": "Educator exists"}, status_code=400)
+
+            educator = state._new_educator(data.pop("username"), **data)
+
+        return JSONResponse({"educator_info": educator}, status_code=201)
+
+    async def validate_class_code(request: Request):
+        with state.lock:
+            cls = state.class_by_code(request.path_params["code"])
+
+        return JSONResponse({"valid": cls is not None}, status_code=200 if cls else 404)
+
+    async def educator_classes(request: Request):
+        educator_id = request.path_params["educator_id"]
+
+        with state.lock:
+            classes = [
+                cls for cls in state.classes.values() if cls["educator_id"] == educator_id
+            ]
+
+        return _conditional(request, {"classes": classes})
+
+    async def create_class(request: Request):
+        data = await request.json()
+
+        with state.lock:
+            cls = state._new_class(data.pop("educator_id"), data.pop("name"), **data)
+
+        return JSONResponse({"class": cls}, status_code=201)
+
+    async def delete_class(request: Request):
+        class_id = request.path_params["class_id"]
+
+        with state.lock:
+            cls = state.classes.pop(class_id, None)
+            state.rosters.pop(class_id, None)
+
+        return JSONResponse({"success": cls is not None})
+
+    async def roster(request: Request):
+        with state.lock:
+            usernames = state.rosters.get(request.path_params["class_id"], [])
+            students = [state.students[username] for username in usernames]
+
+        return _conditional(request, students)
+
+    async def join_class(request: Request):
+        data = await request.json()
+
+        with state.lock:
+            cls = state.class_by_code(data["class_code"])
+
+            if cls is None or data["username"] not in state.students:
+                return JSONResponse({"error": "Invalid request"}, status_code=404)
+
+            if data["username"] not in state.rosters[cls["id"]]:
+                state.rosters[cls["id"]].append(data["username"])
+
+        return JSONResponse({"success": True})
+
+    async def leave_class(request: Request):
+        student_id = request.path_params["student_id"]
+        class_id = request.path_params["class_id"]
+
+        with state.lock:
+            state.rosters[class_id] = [
+                username
+                for username in state.rosters.get(class_id, [])
+                if state.students[username]["id"] != student_id
+            ]
+
+        return JSONResponse({"success": True})
+
+    async def get_override(request: Request):
+        with state.lock:
+            status = request.path_params["class_id"] in state.overrides
+
+        return JSONResponse({"override_status": status})
+
+    async def set_override(request: Request):
+        class_id = (await request.json())["class_id"]
+
+        with state.lock:
+            if request.method == "PUT":
+                state.overrides.add(class_id)
+            else:
+                state.overrides.discard(class_id)
+
+        return JSONResponse({"success": True})
+
+    async def class_active(request: Request):
+        key = (request.path_params["class_id"], request.path_params["story_name"])
+
+        if request.method == "POST":
+            active = (await request.json())["active"]
+
+            with state.lock:
+                state.active[key] = active
+
+            return JSONResponse({"success": True})
+
+        with state.lock:
+            return JSONResponse({"active": state.active.get(key, False)})
+
+    async def classes_active(request: Request):
+        if not bulk_active:
+            return JSONResponse({"error": "Not found"}, status_code=404)
+
+        story_name = request.path_params["story_name"]
+        class_ids = [
+            int(class_id)
+            for class_id in request.query_params.get("class_ids", "").split(",")
+            if class_id
+        ]
+
+        with state.lock:
+            active = {
+                str(class_id): state.active.get((class_id, story_name), False)
+                for class_id in class_ids
+            }
+
+        return JSONResponse({"active": active})
+
+    async def stats(request: Request):
+        with state.lock:
+            return JSONResponse(
+                {
+                    "requests": state.requests,
+                    "endpoints": dict(state.endpoint_requests),
+                }
+            )
+
+    routes = [
+        Route("/students/create", create_student, methods=["POST"]),
+        Route("/students/{username}", get_student),
+        Route("/student/{username}", get_student),
+        Route("/students/{username}/classes", get_student_classes),
+        Route(
+            "/students/{student_id:int}/classes/{class_id:int}",
+            leave_class,
+            methods=["DELETE"],
+        ),
+        Route("/educators/create", create_educator, methods=["POST"]),
+        Route("/educators/{key}", get_educator),
+        Route("/validate-classroom-code/{code}", validate_class_code),
+        Route("/educator-classes/{educator_id:int}", educator_classes),
+        Route("/classes/create", create_class, methods=["POST"]),
+        Route("/classes/join", join_class, methods=["POST"]),
+        Route("/classes/roster/{class_id:int}", roster),
+        Route(
+            "/classes/active/{class_id:int}/{story_name}",
+            class_active,
+            methods=["GET", "POST"],
+        ),
+        Route("/classes/active/{story_name}", classes_active),
+        Route("/classes/{class_id:int}", delete_class, methods=["DELETE"]),
+        Route(
+            "/hubbles_law/waiting-room-override/{class_id:int}",
+            get_override,
+        ),
+        Route(
+            "/hubbles_law/waiting-room-override",
+            set_override,
+            methods=["PUT", "DELETE"],
+        ),
+    ]
+
+    def _endpoint(request: Request) -> str:
+        for route in routes:
+            match, _ = route.matches(request.scope)
+
+            if match == Match.FULL:
+                return f"{request.method} {route.path}"
+
+        return f"{request.method} (unmatched)"
+
+    async def inject_faults(request: Request, call_next):
+        # Bookkeeping for load tests; the stats route itself is not counted.
+        if request.url.path == STATS_PATH:
+            return await call_next(request)
+
+        with state.lock:
+            state.requests += 1
+            state.endpoint_requests[_endpoint(request)] += 1
+
+        delay = max(0.0, latency + random.uniform(-jitter, jitter)) / 1000
+
+        if delay:
+            await asyncio.sleep(delay)
+
+        if error_rate and random.random() < error_rate:
+            return JSONResponse({"error": "Injected failure"}, status_code=503)
+
+        return await call_next(request)
+
+    app = Starlette(
+        routes=[*routes, Route(STATS_PATH, stats)],
+        middleware=[Middleware(BaseHTTPMiddleware, dispatch=inject_faults)],
+    )
+    app.state.mock = state
+
+    return app
+
+
+def parse_args(args):
+    parser = argparse.ArgumentParser(description="Local stand-in for the CosmicDS API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--educators", type=int, default=10)
+    parser.add_argument("--classes-per-educator", type=int, default=4)
+    parser.add_argument("--students-per-class", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="Added latency per request (ms)"
+    )
+    parser.add_argument(
+        "--jitter", type=float, default=0.0, help="Uniform latency jitter (± ms)"
+    )
+    parser.add_argument(
+        "--error-rate",
+        type=float,
+        default=0.0,
+        help="Fraction of requests answered with a 503",
+    )
+    parser.add_argument(
+        "--no-bulk-active",
+        action="store_true",
+        help="Answer 404 on the bulk class activation endpoint",
+    )
+    parser.add_argument(
+        "--no-auto-provision",
+        action="store_true",
+        help="Do not bind unknown educator hashes to seeded educators",
+    )
+    return parser.parse_args(args)
+
+
+def main(args):
+    import uvicorn
+
+    args = parse_args(args)
+    state = MockState(
+        educators=args.educators,
+        classes_per_educator=args.classes_per_educator,
+        students_per_class=args.students_per_class,
+        seed=args.seed,
+        auto_provision=not args.no_auto_provision,
+    )
+    app = create_app(
+        state,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        bulk_active=not args.no_bulk_active,
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+def run():
+    main(sys.argv[1:])
+
+
+if __name__ == "__main__":
+    run()
@@ -2,6 +2,7 @@ from pathlib import Path
 
 import solara
 from solara.alias import rv
+from .. import routing
 from ..layout import Layout
 
 IMG_PATH = Path("static") / "public" / "images"
@@ -75,4 +76,13 @@ Educator contact information is stored according to
 Student contact information is anonymized by …
 """)
 
-    return main
\ No newline at end of file
+    return main
+
+
+# Page packages are imported when first visited, or in the background once
+# the server has started (see `cds_portal.asgi`), rather than by autorouting
+# when the app is loaded.
+routes = [
+    solara.Route(path="/", component=Page, label="Pages", layout=Layout),
+    *routing.lazy_routes(__name__, __path__),
+]
@@ -11,6 +11,7 @@ from cds_portal.components.input import IntegerInput
 from cds_portal.components.toggle_botton import ToggleButton
 
 from ...remote import BASE_API
+from ...utils import use_api_resource
 
 
 # If we want to remove more characters in the future
@@ -187,6 +188,22 @@ def ClassActionsDialog(disabled: bool,
     message, set_message = solara.use_state("")
     message_color, set_message_color = solara.use_state("")
 
+    class_ids = [data["id"] for data in class_data]
+    hubble_class_ids = [data["id"] for data in class_data if data["story"] == "Hubble's Law"]
+
+    def _load_class_states():
+        classes_active = BASE_API.get_classes_active(class_ids, "hubbles_law")
+        override_statuses = BASE_API.executor.map(
+            lambda class_id: BASE_API.get_hubble_waiting_room_override(class_id)["override_status"],
+            hubble_class_ids,
+        )
+        return any(classes_active.values()), list(override_statuses)
+
+    class_states = use_api_resource(_load_class_states,
+                                    dependencies=[tuple(class_ids)],
+                                    initial=(False, []))
+    any_active, override_statuses = class_states.data
+
     with rv.Dialog(
         v_model=active,
         on_v_model=set_active,
@@ -236,6 +253,8 @@ def ClassActionsDialog(disabled: bool,
                 if on_active_changed is not None:
                     on_active_changed(class_data, active)
 
+                class_states.refresh()
+
             with rv.Container():
                 with rv.CardText():
                     single_class = len(class_data) == 1
@@ -243,8 +262,10 @@ def ClassActionsDialog(disabled: bool,
                     is_are_string = "is" if single_class else "are"
                     solara.Text(f"Set whether or not the selected {classes_string} {is_are_string} active")
                 with solara.Row():
-                    any_active = any(BASE_API.get_class_active(data["id"], "hubbles_law") for data in class_data)
-                    solara.Switch(label="Set active", value=any_active, on_value=_on_active_switched)
+                    solara.Switch(label="Set active",
+                                  value=any_active,
+                                  on_value=_on_active_switched,
+                                  disabled=class_states.loading)
                     rv.Alert(children=[f"This will affect {len(class_data)} {classes_string}"],
                              color="accent",
                              outlined=True,
@@ -254,8 +275,8 @@ def ClassActionsDialog(disabled: bool,
 
                 hubble_classes = classes_by_story["Hubble's Law"]
 
-                override_statuses = [BASE_API.get_hubble_waiting_room_override(data["id"])["override_status"] for data in hubble_classes]
-                all_overridden = all(override_statuses)
+                # Nothing is known to be overridden before the states load
+                all_overridden = bool(override_statuses) and all(override_statuses)
 
                 def _on_override_button_pressed(*args):
                     failures = []
@@ -274,6 +295,7 @@ def ClassActionsDialog(disabled: bool,
                     color = "error" if failures else "success"
 
                     _update_snackbar(message=message, color=color)
+                    class_states.refresh()
 
                 with rv.Container():
                     with rv.CardText():
@@ -283,7 +305,7 @@ def ClassActionsDialog(disabled: bool,
                         no_override_classes = "class" if no_override_count == 1 else "classes"
                         solara.Button(label="Set override",
                                       on_click=_on_override_button_pressed,
-                                      disabled=all_overridden)
+                                      disabled=all_overridden or class_states.loading)
                         rv.Alert(children=[f"This will affect {no_override_count} {no_override_classes}"],
                                  color="accent",
                                  outlined=True,
@@ -301,7 +323,7 @@ def ClassActionsDialog(disabled: bool,
                     children=[message])
 
 
-
+@solara.component
 def ChangeClassActivation(disabled: bool,
                        class_data: list[dict],
                        on_active_changed: Optional[Callable] = None,
@@ -311,13 +333,18 @@ def ChangeClassActivation(disabled: bool,
     for data in class_data:
         classes_by_story[data["story"]].append(data)
 
-    _active = [BASE_API.get_class_active(data["id"], "hubbles_law") for data in class_data]
+    # The rows carry the "active" column the page loaded with them, so
+    # rendering never asks the API
+    _active = [data["active"] for data in class_data]
     any_active = any(_active)
     all_active = all(_active)
     mixed_active = not (all_active or not any_active) 
 
-    if on_mixed_active_changed is not None:
-        on_mixed_active_changed(mixed_active)
+    def _report_mixed_active():
+        if on_mixed_active_changed is not None:
+            on_mixed_active_changed(mixed_active)
+
+    solara.use_effect(_report_mixed_active, [mixed_active])
 
     def _on_active_switched(active: bool):
         for data in class_data:
@@ -377,6 +404,9 @@ def Page():
 
     def _retrieve_classes():
         classes_dict = BASE_API.load_educator_classes()
+        classes_active = BASE_API.get_classes_active(
+            [cls["id"] for cls in classes_dict["classes"]], "hubbles_law"
+        )
 
         new_classes = [
             {
@@ -388,13 +418,17 @@ def Page():
                 "expected_size": cls["expected_size"],
                 "small_class": cls["small_class"],
                 "asynchronous": cls["asynchronous"],
-                "active": BASE_API.get_class_active(cls["id"], "hubbles_law"),
+                "active": classes_active[cls["id"]],
             }
             for cls in classes_dict["classes"]
         ]
 
         data.set(new_classes)
 
+        # Keep the selection, with the rows' new values (e.g. "active")
+        selected_ids = {row["id"] for row in selected_rows.value}
+        selected_rows.set([row for row in new_classes if row["id"] in selected_ids])
+
     solara.use_effect(_retrieve_classes, [retrieve.value])
 
     def _create_class_callback(class_info):
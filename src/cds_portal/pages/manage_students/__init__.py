@@ -1,6 +1,7 @@
 import solara
 from solara.alias import rv
-from ...remote import BASE_API
+from ... import call_tracking
+from ...remote import BASE_API, ASYNC_API
 from datetime import datetime
 
 
@@ -57,50 +58,56 @@ def RemoveStudentDialog(disabled: bool, on_remove_clicked: callable = None):
     return dialog
 
 
+def _format_student_row(student: dict, cls: dict) -> dict:
+    return {
+        "student_id": student["id"],
+        "class_id": cls["id"],
+        "username": student["username"],
+        "created": datetime.fromisoformat(
+            student["profile_created"].removesuffix("Z")
+        ).strftime("%m/%d/%Y"),
+        "last_visit": datetime.fromisoformat(
+            student["last_visit"].removesuffix("Z")
+        ).strftime("%m/%d/%Y"),
+        "class": cls["name"],
+        "story": "Hubble's Law",
+    }
+
+
 @solara.component
 def Page():
     selected_rows = solara.use_reactive([])
     data = solara.use_reactive([])
     search = solara.use_reactive("")
+    retrieve = solara.use_reactive(0)
 
-    def _retrieve_students():
-        classes_dict = BASE_API.load_educator_classes()
-        new_data = []
-
-        for cls in classes_dict["classes"]:
-            students = BASE_API.load_students_for_class(cls["id"])
+    async def _retrieve_students():
+        classes_dict = await ASYNC_API.load_educator_classes()
+        data.set([])
 
+        # Rows are appended class by class as each roster arrives, so the
+        # table fills in progressively instead of waiting for every class.
+        async for cls, students in ASYNC_API.iter_class_rosters(
+            classes_dict["classes"]
+        ):
             if len(students) == 0:
                 continue
 
-            new_data.extend(
-                [
-                    {
-                        "student_id": student["id"],
-                        "class_id": cls["id"],
-                        "username": student["username"],
-                        "created": datetime.fromisoformat(
-                            student["profile_created"].removesuffix("Z")
-                        ).strftime("%m/%d/%Y"),
-                        "last_visit": datetime.fromisoformat(
-                            student["last_visit"].removesuffix("Z")
-                        ).strftime("%m/%d/%Y"),
-                        "class": cls["name"],
-                        "story": "Hubble's Law",
-                    }
-                    for student in students
-                ]
+            data.set(
+                data.value + [_format_student_row(student, cls) for student in students]
             )
 
-        data.set(new_data)
-
-    solara.use_effect(_retrieve_students, [])
+    retrieve_task = solara.lab.use_task(
+        call_tracking.tracked("task", _retrieve_students),
+        dependencies=[retrieve.value],
+        prefer_threaded=False,
+    )
 
     def _remove_students_from_classes():
         for row in selected_rows.value:
             r = BASE_API.remove_student_from_class(row["student_id"], row["class_id"])
 
-        _retrieve_students()
+        retrieve.set(retrieve.value + 1)
 
     with solara.Row():
         with rv.Col(cols=12):
@@ -128,6 +135,7 @@ def Page():
 
                 student_table = rv.DataTable(
                     items=data.value,
+                    loading=retrieve_task.pending,
                     single_select=False,
                     show_select=True,
                     search=search.value,
@@ -1,39 +1,88 @@
 
-import solara
+from functools import lru_cache
+
+import numpy as np
 import pandas as pd
+import solara
 import plotly.graph_objects as go
-from datetime import datetime
-
-# Function to convert decimal year to datetime
-def decimal_year_to_date(decimal_year):
-    year = int(decimal_year)
-    rem = decimal_year - year
-    base = datetime(year, 1, 1)
-    next_year = datetime(year + 1, 1, 1)
-    return base + (next_year - base) * rem
-
-# Load data
-from pathlib import Path
-current_dir = Path(__file__).parent
-sunspot_df = pd.read_csv(current_dir / "sunspot_data_1945_2018.csv")
-tsi_df = pd.read_csv(current_dir / "tsi_data_1945_2018.csv")
-
-# Convert decimal years to datetime
-sunspot_df['Date'] = sunspot_df['Year'].apply(decimal_year_to_date)
-tsi_df['Date'] = tsi_df['Year'].apply(decimal_year_to_date)
-
-# Solar cycle start dates and labels (Cycle 18 to 24)
-solar_cycle_starts = [1944.12, 1954.29, 1964.79, 1976.20, 1986.71, 1996.62, 2008.96]
-solar_cycle_labels = [f"Cycle {n}" for n in range(18, 25)]
-solar_cycle_dates = pd.Series(solar_cycle_starts).apply(decimal_year_to_date)
 
-@solara.component
-def Page():
+from ...figures import cached_figure
+from ...solar.cycles import solar_cycles
+from ...solar.data import load_sunspots, load_tsi
+from ...solar.downsample import downsample
+from ...solar.resample import RESOLUTIONS, effective_resolution, sunspot_aggregates, tsi_aggregates
+
+
+def sunspot_points(resolution='daily', x_range=None):
+    """
+    The downsampled sunspot series at `resolution` for the date window
+    `x_range` (or all of it). The full series is shared by all sessions;
+    windows are zoom-specific, so they are computed for each request.
+    """
+    if x_range is None:
+        return _full_sunspot_points(resolution)
+
+    return _sunspot_points(resolution, x_range)
+
+
+@lru_cache(maxsize=None)
+def _full_sunspot_points(resolution):
+    return _sunspot_points(resolution)
+
+
+def _sunspot_points(resolution, x_range=None):
+    sunspot_df = sunspot_aggregates()[resolution]
+    dates, numbers = downsample(
+        sunspot_df['Date'].to_numpy(), sunspot_df['Sunspot_Number'].to_numpy(), x_range=x_range
+    )
+
+    # Plotly serializes pandas dates as dates, but raw datetime64 as integers
+    return pd.DatetimeIndex(dates), numbers
+
+
+@lru_cache(maxsize=None)
+def year_span():
+    """The first and last years covered by the sunspot and TSI series, e.g. "1945–2017"."""
+    dates = pd.concat([load_sunspots()['Date'], load_tsi()['Date']])
+    return f"{dates.min().year}–{dates.max().year}"
+
+
+def relayout_x_range(relayout_data, current):
+    """
+    The date window shown after a Plotly relayout (zoom, pan or reset),
+    `None` for the full range, or `current` if the x axis did not change.
+    """
+    if relayout_data.get('xaxis.autorange'):
+        return None
+
+    if 'xaxis.range[0]' in relayout_data:
+        start, end = relayout_data['xaxis.range[0]'], relayout_data['xaxis.range[1]']
+    elif 'xaxis.range' in relayout_data:
+        start, end = relayout_data['xaxis.range']
+    else:
+        return current
+
+    return (
+        np.datetime64(pd.Timestamp(start), 'ns'),
+        np.datetime64(pd.Timestamp(end), 'ns'),
+    )
+
+
+def build_figure(resolution='daily', x_range=None):
+    """
+    The sunspot and TSI plot at `resolution`, showing the date window
+    `x_range` (or all of it). Only depends on its arguments, so the full
+    plot at each resolution is built once per process (see
+    `cds_portal.figures`).
+    """
+    tsi_df = tsi_aggregates()[resolution]
+    sunspot_dates, sunspot_numbers = sunspot_points(resolution, x_range)
+
     fig = go.Figure()
 
     # Sunspot trace
     fig.add_trace(go.Scatter(
-        x=sunspot_df['Date'], y=sunspot_df['Sunspot_Number'],
+        x=sunspot_dates, y=sunspot_numbers,
         name='Sunspot Number', yaxis='y1', line=dict(color='darkblue'),
         hovertemplate='Date: %{x|%Y-%m-%d}<br>Sunspots: %{y:.0f}'
     ))
@@ -47,23 +96,39 @@ def Page():
     ))
 
     # Add solar cycle lines and annotations
-    for date, label in zip(solar_cycle_dates, solar_cycle_labels):
-        fig.add_shape(
-            type='line',
-            x0=date, x1=date, y0=0, y1=1,
-            xref='x', yref='paper',
-            line=dict(color='dimgray', dash='dot', width=1)
-        )
+    # Cycles are found in the data (see `cds_portal.solar.cycles`); the one in
+    # progress when the data starts is labelled at the first date, unmarked
+    first_date = load_sunspots()['Date'].iloc[0]
+
+    for cycle in solar_cycles().itertuples():
+        if not pd.isna(cycle.start):
+            fig.add_shape(
+                type='line',
+                x0=cycle.start, x1=cycle.start, y0=0, y1=1,
+                xref='x', yref='paper',
+                line=dict(color='dimgray', dash='dot', width=1)
+            )
+
+        hovertext = f"Maximum: {cycle.amplitude:.0f} (smoothed), {cycle.maximum:%b %Y}"
+
+        if not pd.isna(cycle.tsi_correlation):
+            hovertext += f"<br>Correlation with TSI: {cycle.tsi_correlation:.2f}"
+
         fig.add_annotation(
-            x=date, y=1.05, xref='x', yref='paper',
-            text=label,
+            x=first_date if pd.isna(cycle.start) else cycle.start,
+            y=1.05, xref='x', yref='paper',
+            text=f"Cycle {cycle.number}",
+            hovertext=hovertext,
             showarrow=False,
             font=dict(size=10, color='dimgray')
         )
 
     # Layout settings
     fig.update_layout(
-        title="Sunspot Number (daily) and TSI (yearly), 1945–2018",
+        title=(
+            f"Sunspot Number ({effective_resolution('daily', resolution)})"
+            f" and TSI ({effective_resolution('yearly', resolution)}), {year_span()}"
+        ),
         xaxis=dict(
             title="Date",
             showline=True,
@@ -72,7 +137,9 @@ def Page():
             showgrid=True,
             gridcolor='lightgray',
             gridwidth=1,
-            griddash='dot'
+            griddash='dot',
+            # Keeps the zoom when the traces are replaced for a new window
+            range=[pd.Timestamp(t) for t in x_range] if x_range else None,
         ),
         yaxis=dict(
             title="Sunspot Number",
@@ -107,7 +174,41 @@ def Page():
         height=500
     )
 
-    solara.FigurePlotly(fig)
+    return fig
+
+
+@solara.component
+def Page():
+    # Zooming in re-queries the sunspot series at full resolution for the
+    # visible window, so only ever about 2k points are sent to the browser
+    x_range = solara.use_reactive(None)
+
+    # Every resolution is computed once per process; switching only picks
+    # another cached aggregate (and figure)
+    resolution = solara.use_reactive('daily')
+
+    def on_relayout(event):
+        if event:
+            x_range.set(relayout_x_range(event['relayout_data'], x_range.value))
+
+    # Data is loaded, and the figure built, on first visit rather than on
+    # import. The unzoomed figures are shared by all sessions; a zoomed one
+    # is only ever seen by the session that zoomed, so it is not cached
+    def get_figure():
+        if x_range.value is not None:
+            return build_figure(resolution.value, x_range.value)
+
+        return cached_figure(
+            ('solar_example', resolution.value),
+            lambda: build_figure(resolution.value),
+        )
+
+    fig = solara.use_memo(get_figure, dependencies=[resolution.value, x_range.value])
+
+    solara.ToggleButtonsSingle(value=resolution, values=list(RESOLUTIONS))
+    solara.FigurePlotly(
+        fig, on_relayout=on_relayout, dependencies=[resolution.value, x_range.value]
+    )
     # NB: We achieve line breaks via two spaces at the end of each line
     solara.Markdown("""**Data:**  
                     TSI: Historical Total Solar Irradiance Reconstruction via [LASP](https://lasp.colorado.edu/lisird/data/historical_tsi)   
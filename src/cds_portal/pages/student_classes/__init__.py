@@ -6,6 +6,7 @@ from solara.server import settings
 
 from ...components.join_class import JoinClass
 from ...remote import BASE_API
+from ...utils import use_api_resource
 
 
 @solara.component
@@ -81,13 +82,26 @@ def JoinClassDialog(callback: callable = lambda: None):
 def Page():
     classes = solara.use_reactive([])
     selected_rows, set_selected_rows = solara.use_state(None)
+    selected_code = selected_rows[0]["code"] if selected_rows else None
+
+    def _load_selected_active():
+        if selected_code is None:
+            return False
+        return BASE_API.get_class_active(selected_code, "hubbles_law")
+
+    selected_active = use_api_resource(
+        _load_selected_active, dependencies=[selected_code], initial=False
+    )
 
     def _retrieve_classes():
         classes_response = BASE_API.load_student_classes()
+        educators = BASE_API.load_educators_info(
+            [cls["educator_id"] for cls in classes_response]
+        )
         formatted_classes = []
 
         for cls in classes_response:
-            educator_response = BASE_API.load_educator_info(cls["educator_id"])
+            educator_response = educators[cls["educator_id"]]
 
             cls_fmt = {
                 "name": cls["name"],
@@ -110,13 +124,8 @@ def Page():
                 JoinClassDialog(callback=_retrieve_classes)
 
                 class_selected = bool(selected_rows)
-                if class_selected:
-                    class_data = selected_rows[0]
-                    code = class_data["code"]
-                    active = BASE_API.get_class_active(class_data["code"], "hubbles_law")
-                else:
-                    code = None
-                    active = False
+                code = selected_code
+                active = class_selected and bool(selected_active.data)
                 query_string = f"?class_code={code}" if code else ""
                 solara.Button(
                     "Launch",
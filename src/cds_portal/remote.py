@@ -1,11 +1,21 @@
+import asyncio
+import atexit
+import json
+import threading
+import time
 import uuid
 
 from solara_enterprise import auth
 import hashlib
+import httpx
 import os
 from requests import Session, Response
-from functools import cached_property
+from requests.exceptions import ConnectionError as RequestsConnectionError, Timeout
+from functools import cached_property, lru_cache
 
+from . import call_tracking, metrics
+from .cache import SingleFlight, StaleWhileRevalidateCache, TTLCache
+from .resilience import CircuitBreaker, CircuitOpenError, backoff_delay
 from .state import GlobalState
 from solara import Reactive
 from solara.lab import Ref
@@ -13,10 +23,80 @@ from .logger import setup_logger
 
 logger = setup_logger("API")
 
+call_tracking.install()
+
+# How long (in seconds) a resolved student/educator profile is trusted before
+# it is fetched again from the API server.
+IDENTITY_TTL = float(os.getenv("CDS_IDENTITY_TTL", 300))
+
+# How long (in seconds) a class' active state for a story is cached. Changes
+# made through this process update the cache immediately; the TTL only bounds
+# how long changes made elsewhere take to show up.
+CLASS_ACTIVE_TTL = float(os.getenv("CDS_CLASS_ACTIVE_TTL", 60))
+
+# How long (in seconds) another educator's profile (e.g. the teacher of one
+# of a student's classes) is cached, process-wide.
+EDUCATOR_PROFILE_TTL = float(os.getenv("CDS_EDUCATOR_PROFILE_TTL", 600))
+
+# Age (in seconds) after which an educator's cached class list is refreshed in
+# the background. The cached list is still served while it refreshes.
+CLASS_LIST_MAX_AGE = float(os.getenv("CDS_CLASS_LIST_MAX_AGE", 15))
+
+# Number of worker threads used to fan out independent blocking requests.
+API_WORKERS = int(os.getenv("CDS_API_WORKERS", 8))
+
+# Connect and (default) read timeouts, in seconds, for requests to the API
+# server. Per-endpoint read timeouts can be set with `CDS_API_ENDPOINT_TIMEOUTS`,
+# a JSON object mapping endpoint templates (as passed to `BaseAPI._request`,
+# e.g. "/classes/roster/{class_id}") to seconds.
+API_CONNECT_TIMEOUT = float(os.getenv("CDS_API_CONNECT_TIMEOUT", 3.05))
+API_TIMEOUT = float(os.getenv("CDS_API_TIMEOUT", 10))
+
+# Idempotent requests are retried up to `API_RETRIES` times on connection
+# errors, timeouts and the gateway errors in `RETRY_STATUSES`.
+API_RETRIES = int(os.getenv("CDS_API_RETRIES", 2))
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+RETRY_STATUSES = frozenset({502, 503, 504})
+
+# After `BREAKER_FAILURE_THRESHOLD` consecutive failures, requests fail fast
+# for `BREAKER_COOLDOWN` seconds, during which GETs are answered with the
+# last successful response (kept for up to `STALE_RESPONSE_TTL` seconds).
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("CDS_BREAKER_FAILURE_THRESHOLD", 5))
+BREAKER_COOLDOWN = float(os.getenv("CDS_BREAKER_COOLDOWN", 30))
+STALE_RESPONSE_TTL = float(os.getenv("CDS_STALE_RESPONSE_TTL", 3600))
+
+# How long (in seconds) a decoded body is kept for revalidation with its
+# `ETag` / `Last-Modified` validators.
+VALIDATED_BODY_TTL = float(os.getenv("CDS_VALIDATED_BODY_TTL", 3600))
+
+_TRANSIENT_ERRORS = (RequestsConnectionError, Timeout)
+
+_UNRESOLVED = object()
+
+
+@lru_cache(maxsize=1024)
+def _hash_user_ref(user_ref: str) -> str:
+    return hashlib.sha1(
+        (user_ref + os.environ["SOLARA_SESSION_SECRET_KEY"]).encode()
+    ).hexdigest()
+
 
 class BaseAPI:
-    API_URL = "https://api.cosmicds.cfa.harvard.edu"
-    # API_URL = "http://localhost:8081"
+    # Point at a local server (e.g. `cds-portal-mock-api`) with
+    # CDS_API_URL=http://localhost:8081
+    API_URL = os.getenv("CDS_API_URL", "https://api.cosmicds.cfa.harvard.edu")
+
+    # Flipped off the first time the server turns out not to provide the
+    # bulk class activation endpoint.
+    bulk_class_active_supported = True
+
+    # Read timeouts (in seconds) for endpoints that need more (or less) time
+    # than `API_TIMEOUT`, keyed by endpoint template.
+    ENDPOINT_TIMEOUTS = {
+        "/classes/roster/{class_id}": 20,
+        "/educator-classes/{educator_id}": 15,
+        **json.loads(os.getenv("CDS_API_ENDPOINT_TIMEOUTS", "{}")),
+    }
 
     @cached_property
     def request_session(self):
@@ -29,6 +109,271 @@ class BaseAPI:
         session.headers.update({"Authorization": os.getenv("CDS_API_KEY")})
         return session
 
+    @cached_property
+    def identity_cache(self) -> TTLCache:
+        """
+        Returns the cache of resolved student and educator profiles, keyed by
+        `(hashed_user, role)`. Entries live for `IDENTITY_TTL` seconds and are
+        dropped explicitly whenever a new student or educator is created.
+        """
+        return TTLCache(IDENTITY_TTL)
+
+    @cached_property
+    def class_active_cache(self) -> TTLCache:
+        """
+        Returns the cache of class activation states, keyed by
+        `(class_id, story_name)`.
+        """
+        return TTLCache(CLASS_ACTIVE_TTL)
+
+    @cached_property
+    def educator_profile_cache(self) -> TTLCache:
+        """
+        Returns the process-wide cache of educator profiles looked up by
+        educator ID, shared by every session.
+        """
+        return TTLCache(EDUCATOR_PROFILE_TTL)
+
+    @cached_property
+    def profile_flight(self) -> SingleFlight:
+        """
+        Returns the `SingleFlight` that merges concurrent lookups of the same
+        educator profile into one request.
+        """
+        return SingleFlight()
+
+    @cached_property
+    def class_list_cache(self) -> StaleWhileRevalidateCache:
+        """
+        Returns the stale-while-revalidate cache of class lists, keyed by
+        educator ID. Creating or deleting a class invalidates the educator's
+        entry.
+        """
+        return StaleWhileRevalidateCache(CLASS_LIST_MAX_AGE, self.executor, logger)
+
+    @cached_property
+    def executor(self) -> call_tracking.ScopedThreadPoolExecutor:
+        """
+        Returns the thread pool used to issue independent requests
+        concurrently.
+        """
+        return call_tracking.ScopedThreadPoolExecutor(
+            max_workers=API_WORKERS, thread_name_prefix="api"
+        )
+
+    @cached_property
+    def request_flight(self) -> SingleFlight:
+        """
+        Returns the `SingleFlight` through which every GET request is issued,
+        so that identical requests made concurrently by different sessions
+        share one upstream call. Its `stats()` report how many were merged.
+        """
+        return SingleFlight()
+
+    @cached_property
+    def circuit_breaker(self) -> CircuitBreaker:
+        """
+        Returns the circuit breaker guarding the API server. Its `stats()`
+        report the breaker state and how often it has tripped.
+        """
+        return CircuitBreaker(BREAKER_FAILURE_THRESHOLD, BREAKER_COOLDOWN)
+
+    @cached_property
+    def stale_responses(self) -> TTLCache:
+        """
+        Returns the last successful response of each GET request, served in
+        place of a live response while the API server is failing.
+        """
+        return TTLCache(STALE_RESPONSE_TTL, maxsize=4096)
+
+    def _request(
+        self,
+        method: str,
+        endpoint: str,
+        params: dict = None,
+        json: dict = None,
+        headers: dict = None,
+        **path_params,
+    ) -> Response:
+        """
+        Issues a `method` request for `endpoint`, a path template under
+        `API_URL` formatted with `path_params`, using the timeout configured
+        for that endpoint. Idempotent requests are retried with jittered
+        backoff on connection errors, timeouts and gateway errors. Raises
+        `CircuitOpenError` without contacting the server while the circuit
+        breaker is open.
+        """
+        url = f"{self.API_URL}{endpoint.format(**path_params)}"
+        timeout = (API_CONNECT_TIMEOUT, self.ENDPOINT_TIMEOUTS.get(endpoint, API_TIMEOUT))
+        attempts = 1 + (API_RETRIES if method in IDEMPOTENT_METHODS else 0)
+        call_tracking.record(method, endpoint)
+
+        for attempt in range(attempts):
+            last_attempt = attempt == attempts - 1
+            trial = self.circuit_breaker.before_request()
+            started = time.perf_counter()
+
+            try:
+                r = self.request_session.request(
+                    method,
+                    url,
+                    params=params,
+                    json=json,
+                    headers=headers,
+                    timeout=timeout,
+                )
+            except _TRANSIENT_ERRORS as e:
+                metrics.observe_request(
+                    endpoint, method, "error", time.perf_counter() - started
+                )
+                self.circuit_breaker.record_failure()
+
+                if last_attempt:
+                    raise
+
+                logger.warning("%s %s failed (%s); retrying.", method, endpoint, e)
+            except Exception:
+                # Not worth retrying (e.g. a malformed response), but still a
+                # failed request as far as the circuit breaker is concerned
+                metrics.observe_request(
+                    endpoint, method, "error", time.perf_counter() - started
+                )
+                self.circuit_breaker.record_failure()
+                raise
+            else:
+                metrics.observe_request(
+                    endpoint,
+                    method,
+                    r.status_code,
+                    time.perf_counter() - started,
+                    len(r.content),
+                )
+
+                if r.status_code < 500:
+                    self.circuit_breaker.record_success()
+                    return r
+
+                self.circuit_breaker.record_failure()
+
+                if last_attempt or r.status_code not in RETRY_STATUSES:
+                    return r
+
+                logger.warning(
+                    "%s %s returned %s; retrying.", method, endpoint, r.status_code
+                )
+            finally:
+                if trial:
+                    self.circuit_breaker.release_trial()
+
+            time.sleep(backoff_delay(attempt))
+
+    @staticmethod
+    def _request_key(endpoint: str, params: dict = None, **path_params) -> tuple:
+        return (
+            endpoint.format(**path_params),
+            tuple(sorted(params.items())) if params else (),
+        )
+
+    def _get(
+        self, endpoint: str, params: dict = None, headers: dict = None, **path_params
+    ) -> Response:
+        """
+        Issues a GET request for `endpoint` (see `_request`). Concurrent
+        identical requests are coalesced into a single upstream call whose
+        response is handed to every caller, so callers must treat the response
+        as read-only. If the server is unavailable, the last successful
+        response for the same request is returned instead, when there is one.
+        """
+        key = self._request_key(endpoint, params, **path_params)
+        flight_key = key + (tuple(sorted(headers.items())) if headers else (),)
+        leader = False
+
+        def _fetch():
+            nonlocal leader
+            leader = True
+            error = None
+
+            try:
+                r = self._request(
+                    "GET", endpoint, params=params, headers=headers, **path_params
+                )
+            except (CircuitOpenError, *_TRANSIENT_ERRORS) as e:
+                error, r = e, None
+
+            if r is not None and r.status_code < 500:
+                if r.status_code == 200:
+                    self.stale_responses.set(key, r)
+                return r
+
+            stale = self.stale_responses.get(key)
+
+            if stale is None:
+                if error is not None:
+                    raise error
+                return r
+
+            logger.warning("Serving a cached response for %s.", key[0])
+            metrics.observe_cache(endpoint, "stale")
+            return stale
+
+        r = self.request_flight.do(flight_key, _fetch)
+
+        if not leader:
+            metrics.observe_cache(endpoint, "coalesced")
+
+        return r
+
+    @cached_property
+    def validated_bodies(self) -> TTLCache:
+        """
+        Returns the parsed bodies of conditional GET requests together with
+        their `ETag` and `Last-Modified` validators, keyed like
+        `stale_responses`.
+        """
+        return TTLCache(VALIDATED_BODY_TTL, maxsize=2048)
+
+    def _get_json(self, endpoint: str, params: dict = None, **path_params):
+        """
+        Returns the decoded JSON body of a GET request for `endpoint`. If an
+        earlier response carried an `ETag` or `Last-Modified` header, the
+        request is made conditional and a `304 Not Modified` answer reuses the
+        already decoded body. The returned object may be shared with other
+        callers and must not be modified.
+        """
+        key = self._request_key(endpoint, params, **path_params)
+        cached = self.validated_bodies.get(key)
+        headers = {}
+
+        if cached is not None:
+            etag, last_modified, body = cached
+
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+
+        r = self._get(endpoint, params=params, headers=headers, **path_params)
+
+        if r.status_code == 304 and cached is not None:
+            metrics.observe_cache(endpoint, "revalidated")
+            return body
+
+        if r.status_code == 304:
+            # Only a misbehaving server or proxy answers 304 to a request
+            # without validators; there is no body to reuse, so ask again
+            # unconditionally
+            r = self._get(endpoint, params=params, **path_params)
+
+        body = r.json()
+        etag = r.headers.get("ETag")
+        last_modified = r.headers.get("Last-Modified")
+        metrics.observe_cache(endpoint, "miss")
+
+        if r.status_code == 200 and (etag or last_modified):
+            self.validated_bodies.set(key, (etag, last_modified, body))
+
+        return body
+
     @property
     def hashed_user(self):
         if auth.user.value is None:
@@ -43,21 +388,44 @@ class BaseAPI:
 
         user_ref = userinfo.get("cds/email", userinfo["cds/name"])
 
-        hashed = hashlib.sha1(
-            (user_ref + os.environ["SOLARA_SESSION_SECRET_KEY"]).encode()
-        ).hexdigest()
+        return _hash_user_ref(user_ref)
+
+    def _user_profile(self, role: str) -> dict | None:
+        """
+        Returns the `student` or `educator` profile of the logged in user,
+        only querying the API server if no unexpired profile is cached.
+        """
+        if auth.user.value is None:
+            return None
 
-        return hashed
+        hashed_user = self.hashed_user
+        key = (hashed_user, role)
+        profile = self.identity_cache.get(key, default=_UNRESOLVED)
+
+        if profile is _UNRESOLVED:
+            r = self._get(f"/{role}s/{{hashed_user}}", hashed_user=hashed_user)
+            profile = r.json().get(role, None)
+            self.identity_cache.set(key, profile)
+
+        return profile
+
+    def invalidate_identity(self, hashed_user: str = None):
+        """
+        Drops the cached profiles of `hashed_user` (by default, the logged in
+        user) so that the next access queries the API server again.
+        """
+        hashed_user = self.hashed_user if hashed_user is None else hashed_user
+
+        for role in ("student", "educator"):
+            self.identity_cache.pop((hashed_user, role))
 
     @property
     def student_info(self):
-        r = self.request_session.get(f"{self.API_URL}/students/{self.hashed_user}")
-        return r.json().get("student", None)
+        return self._user_profile("student")
 
     @property
     def educator_info(self):
-        r = self.request_session.get(f"{self.API_URL}/educators/{self.hashed_user}")
-        return r.json().get("educator", None)
+        return self._user_profile("educator")
 
     @property
     def user_type_id(self) -> tuple[str | None, int | None]:
@@ -68,35 +436,72 @@ class BaseAPI:
         return None, None
 
     def validate_class_code(self, class_code: str) -> bool:
-        r = self.request_session.get(
-            f"{self.API_URL}/validate-classroom-code/{class_code}"
-        )
+        r = self._get("/validate-classroom-code/{class_code}", class_code=class_code)
         return r.status_code == 200
 
     def load_student_info(self, stu_id: str = None) -> dict:
-        stu_id = self.hashed_user if stu_id is None else stu_id
+        if stu_id is None or stu_id == self.hashed_user:
+            return self.student_info
 
-        student_json = self.request_session.get(
-            f"{self.API_URL}/students/{stu_id}"
-        ).json()
+        student_json = self._get("/students/{stu_id}", stu_id=stu_id).json()
 
         return student_json["student"]
 
     def load_educator_info(self, edu_id: str = None) -> dict:
-        edu_id = self.hashed_user if edu_id is None else edu_id
+        if edu_id is None or edu_id == self.hashed_user:
+            return self.educator_info
 
-        educator_json = self.request_session.get(
-            f"{self.API_URL}/educators/{edu_id}"
-        ).json()
+        return self._load_educator_profile(edu_id)
 
-        return educator_json["educator"]
+    def _load_educator_profile(self, edu_id: str) -> dict:
+        """
+        Returns the profile of the educator `edu_id` from the process-wide
+        cache, fetching it if needed. Reads no session state, so it is safe
+        to call from the worker threads of `executor`.
+        """
+        educator = self.educator_profile_cache.get(edu_id, default=_UNRESOLVED)
+
+        if educator is _UNRESOLVED:
+            educator = self.profile_flight.do(
+                ("educator", edu_id), lambda: self._fetch_educator_info(edu_id)
+            )
+
+        return educator
+
+    def _fetch_educator_info(self, edu_id: str) -> dict:
+        educator_json = self._get("/educators/{edu_id}", edu_id=edu_id).json()
+
+        educator = educator_json["educator"]
+        self.educator_profile_cache.set(edu_id, educator)
+
+        return educator
+
+    def load_educators_info(self, edu_ids: list[str]) -> dict[str, dict]:
+        """
+        Returns a mapping of each distinct ID in `edu_ids` to the educator's
+        profile, looking up uncached profiles concurrently.
+        """
+        # The logged in user is resolved here, on the session's own thread;
+        # the workers only see the process-wide profile cache
+        hashed_user = self.hashed_user
+        edu_ids = list(dict.fromkeys(edu_ids))
+        others = [edu_id for edu_id in edu_ids if edu_id is not None and edu_id != hashed_user]
+        educators = dict(zip(others, self.executor.map(self._load_educator_profile, others)))
+
+        if len(others) < len(edu_ids):
+            own_profile = self.educator_info
+
+            for edu_id in edu_ids:
+                educators.setdefault(edu_id, own_profile)
+
+        return {edu_id: educators[edu_id] for edu_id in edu_ids}
 
     def load_student_classes(self) -> list:
         student_json = self.load_student_info()
         sid = student_json["id"]
 
-        r = self.request_session.get(
-            f"{self.API_URL}/students/{self.hashed_user}/classes"
+        r = self._get(
+            "/students/{hashed_user}/classes", hashed_user=self.hashed_user
         )
 
         if r.status_code != 200:
@@ -106,7 +511,7 @@ class BaseAPI:
         return r.json()["classes"]
 
     def create_new_student(self, class_code: str) -> Response:
-        r = self.request_session.get(f"{self.API_URL}/student/{self.hashed_user}")
+        r = self._get("/student/{hashed_user}", hashed_user=self.hashed_user)
         student = r.json()["student"]
 
         if student is not None:
@@ -130,14 +535,12 @@ class BaseAPI:
             "classroom_code": class_code,
         }
 
-        r = self.request_session.post(
-            f"{self.API_URL}/students/create",
-            json=payload,
-        )
+        r = self._request("POST", "/students/create", json=payload)
 
         if r.status_code != 201:
             logger.error("Failed to create new user.")
         else:
+            self.invalidate_identity()
             logger.info(
                 "Created new user `%s` with class code '%s'.",
                 self.hashed_user,
@@ -147,7 +550,7 @@ class BaseAPI:
         return r
 
     def create_new_educator(self, form_data: dict) -> Response:
-        r = self.request_session.get(f"{self.API_URL}/educators/{self.hashed_user}")
+        r = self._get("/educators/{hashed_user}", hashed_user=self.hashed_user)
         educator = r.json()["educator"]
 
         if educator is not None:
@@ -163,10 +566,7 @@ class BaseAPI:
 
         form_data.update({"username": self.hashed_user, "password": str(uuid.uuid4())})
 
-        r = self.request_session.post(
-            f"{self.API_URL}/educators/create",
-            json=form_data,
-        )
+        r = self._request("POST", "/educators/create", json=form_data)
 
         if r.status_code != 201:
             logger.error("Failed to create new user.")
@@ -175,6 +575,7 @@ class BaseAPI:
             r.status_code = 500
             r.reason = "Something went wrong."
         else:
+            self.invalidate_identity()
             logger.info(
                 "Created new educator `%s`.",
                 self.hashed_user,
@@ -183,11 +584,11 @@ class BaseAPI:
         return r
 
     def create_new_class(self, info: dict) -> dict:
-        r = self.request_session.get(f"{self.API_URL}/educators/{self.hashed_user}")
-        educator = r.json()["educator"]
+        educator = self.educator_info
 
-        r = self.request_session.post(
-            f"{self.API_URL}/classes/create",
+        r = self._request(
+            "POST",
+            "/classes/create",
             json={
                 "educator_id": educator["id"],
                 "name": info["name"],
@@ -197,71 +598,260 @@ class BaseAPI:
             },
         )
 
+        self.class_list_cache.invalidate(educator["id"])
+
         return r.json()
 
     def delete_class(self, class_id: int) -> dict:
-        r = self.request_session.delete(f"{self.API_URL}/classes/{class_id}")
+        r = self._request("DELETE", "/classes/{class_id}", class_id=class_id)
+
+        if (educator := self.educator_info) is not None:
+            self.class_list_cache.invalidate(educator["id"])
 
         return r.json()
 
+    def _fetch_educator_classes(self, educator_id: int) -> dict:
+        return self._get_json(
+            "/educator-classes/{educator_id}", educator_id=educator_id
+        )
+
     def load_educator_classes(self):
-        r = self.request_session.get(f"{self.API_URL}/educators/{self.hashed_user}")
-        educator = r.json()["educator"]
+        educator = self.educator_info
 
-        r = self.request_session.get(
-            f"{self.API_URL}/educator-classes/{educator['id']}"
+        return self.class_list_cache.get(
+            educator["id"], lambda: self._fetch_educator_classes(educator["id"])
         )
 
-        return r.json()
-
     def load_students_for_class(self, class_id: int):
-        r = self.request_session.get(f"{self.API_URL}/classes/roster/{class_id}")
-        return r.json()
+        return self._get_json("/classes/roster/{class_id}", class_id=class_id)
 
     def add_student_to_class(self, class_code: str, username: str) -> Response:
-        r = self.request_session.post(
-            f"{self.API_URL}/classes/join",
+        r = self._request(
+            "POST",
+            "/classes/join",
             json={"class_code": class_code, "username": username},
         )
 
         return r
 
     def remove_student_from_class(self, student_id: int, class_id: int) -> Response:
-        r = self.request_session.delete(
-            f"{self.API_URL}/students/{student_id}/classes/{class_id}",
+        r = self._request(
+            "DELETE",
+            "/students/{student_id}/classes/{class_id}",
+            student_id=student_id,
+            class_id=class_id,
         )
 
         return r
 
     def get_hubble_waiting_room_override(self, class_id: int) -> dict:
-        r = self.request_session.get(
-            f"{self.API_URL}/hubbles_law/waiting-room-override/{class_id}"
+        r = self._get(
+            "/hubbles_law/waiting-room-override/{class_id}", class_id=class_id
         )
 
         return r.json()
 
     def set_hubble_waiting_room_override(self, class_id: int, value: bool) -> Response:
-        method = self.request_session.put if value else self.request_session.delete
-        r = method(
-            f"{self.API_URL}/hubbles_law/waiting-room-override",
+        r = self._request(
+            "PUT" if value else "DELETE",
+            "/hubbles_law/waiting-room-override",
             json={"class_id": class_id},
         )
 
         return r
 
-    def get_class_active(self, class_id: int, story_name: str) -> bool:
-        r = self.request_session.get(
-            f"{self.API_URL}/classes/active/{class_id}/{story_name}",
+    def _fetch_class_active(self, class_id: int, story_name: str) -> bool:
+        r = self._get(
+            "/classes/active/{class_id}/{story_name}",
+            class_id=class_id,
+            story_name=story_name,
         )
         return r.json()["active"]
 
+    def _fetch_classes_active_bulk(
+        self, class_ids: list[int], story_name: str
+    ) -> dict[int, bool] | None:
+        r = self._get(
+            "/classes/active/{story_name}",
+            params={"class_ids": ",".join(str(class_id) for class_id in class_ids)},
+            story_name=story_name,
+        )
+
+        if r.status_code in (404, 405):
+            logger.info(
+                "No bulk class activation endpoint; falling back to per-class requests."
+            )
+            self.bulk_class_active_supported = False
+            return None
+
+        if r.status_code != 200:
+            logger.error("Failed to load class activation states in bulk.")
+            return None
+
+        active = r.json()["active"]
+
+        # Classes the server left out are fetched one by one by the caller
+        return {
+            class_id: active[str(class_id)]
+            for class_id in class_ids
+            if active.get(str(class_id)) is not None
+        }
+
+    def get_classes_active(
+        self, class_ids: list[int], story_name: str
+    ) -> dict[int, bool]:
+        """
+        Returns a mapping of each of `class_ids` to whether the class is active
+        for `story_name`. Cached states are reused; the rest are fetched with a
+        single bulk request if the server supports it, and any the bulk
+        response leaves out (or all of them, without one) with concurrent
+        per-class requests.
+        """
+        states = {}
+        missing = []
+
+        for class_id in class_ids:
+            active = self.class_active_cache.get((class_id, story_name))
+
+            if active is None:
+                missing.append(class_id)
+            else:
+                states[class_id] = active
+
+        if not missing:
+            return states
+
+        fetched = {}
+
+        if self.bulk_class_active_supported and len(missing) > 1:
+            fetched = self._fetch_classes_active_bulk(missing, story_name) or {}
+            missing = [class_id for class_id in missing if class_id not in fetched]
+
+        fetched.update(
+            zip(
+                missing,
+                self.executor.map(
+                    lambda class_id: self._fetch_class_active(class_id, story_name),
+                    missing,
+                ),
+            )
+        )
+
+        for class_id, active in fetched.items():
+            self.class_active_cache.set((class_id, story_name), active)
+
+        states.update(fetched)
+
+        return states
+
+    def get_class_active(self, class_id: int, story_name: str) -> bool:
+        return self.get_classes_active([class_id], story_name)[class_id]
+
     def set_class_active(self, class_id: int, story_name: str, active: bool) -> bool:
-        r = self.request_session.post(
-            f"{self.API_URL}/classes/active/{class_id}/{story_name}",
+        r = self._request(
+            "POST",
+            "/classes/active/{class_id}/{story_name}",
             json={"active": active},
+            class_id=class_id,
+            story_name=story_name,
         )
-        return r.json()["success"]
+        success = r.json()["success"]
+
+        if success:
+            self.class_active_cache.set((class_id, story_name), active)
+        else:
+            self.class_active_cache.pop((class_id, story_name))
 
+        return success
+
+    def collect_metrics(self) -> list:
+        """
+        Returns the Prometheus lines for the state of the circuit breaker,
+        request coalescing and the in-memory caches.
+        """
+        breaker = self.circuit_breaker.stats()
+        flights = {
+            "request": self.request_flight.stats(),
+            "educator_profile": self.profile_flight.stats(),
+        }
+        caches = {
+            "identity": self.identity_cache.stats(),
+            "class_active": self.class_active_cache.stats(),
+            "educator_profile": self.educator_profile_cache.stats(),
+            "stale_response": self.stale_responses.stats(),
+            "validated_body": self.validated_bodies.stats(),
+        }
+
+        return [
+            *metrics.samples(
+                "cds_api_circuit_state",
+                "1 for the current state of the API circuit breaker.",
+                "gauge",
+                {
+                    state: int(state == breaker["state"])
+                    for state in (
+                        CircuitBreaker.CLOSED,
+                        CircuitBreaker.OPEN,
+                        CircuitBreaker.HALF_OPEN,
+                    )
+                },
+                "state",
+            ),
+            *metrics.samples(
+                "cds_api_circuit_opened_total",
+                "Times the API circuit breaker has opened.",
+                "counter",
+                {None: breaker["times_opened"]},
+            ),
+            *metrics.samples(
+                "cds_api_circuit_rejected_total",
+                "Requests refused while the API circuit breaker was open.",
+                "counter",
+                {None: breaker["rejected"]},
+            ),
+            *metrics.samples(
+                "cds_api_singleflight_calls_total",
+                "Calls made through a single-flight group.",
+                "counter",
+                {name: stats["calls"] for name, stats in flights.items()},
+                "flight",
+            ),
+            *metrics.samples(
+                "cds_api_singleflight_coalesced_total",
+                "Calls answered by another caller's in-flight execution.",
+                "counter",
+                {name: stats["coalesced"] for name, stats in flights.items()},
+                "flight",
+            ),
+            *metrics.samples(
+                "cds_api_singleflight_in_flight",
+                "Executions currently in flight.",
+                "gauge",
+                {name: stats["in_flight"] for name, stats in flights.items()},
+                "flight",
+            ),
+            *metrics.samples(
+                "cds_cache_hits_total",
+                "Lookups answered by an in-memory cache.",
+                "counter",
+                {name: stats["hits"] for name, stats in caches.items()},
+                "cache",
+            ),
+            *metrics.samples(
+                "cds_cache_misses_total",
+                "Lookups an in-memory cache could not answer.",
+                "counter",
+                {name: stats["misses"] for name, stats in caches.items()},
+                "cache",
+            ),
+            *metrics.samples(
+                "cds_cache_entries",
+                "Entries held by an in-memory cache.",
+                "gauge",
+                {name: stats["size"] for name, stats in caches.items()},
+                "cache",
+            ),
+        ]
 
     @staticmethod
     def clear_user(state: Reactive[GlobalState]):
@@ -271,3 +861,473 @@ class BaseAPI:
 
 
 BASE_API = BaseAPI()
+metrics.REGISTRY.add_collector(BASE_API.collect_metrics)
+
+
+class AsyncBaseAPI:
+    """
+    Non-blocking counterpart of `BaseAPI` for use from coroutines (e.g. async
+    `solara.lab.task`s), so that several API calls can be awaited concurrently
+    instead of queueing behind each other on a worker thread.
+
+    Requests go through a single pooled `httpx.AsyncClient` with HTTP/2 and
+    keep-alive, shared by every session. Identity (the hashed user and the
+    cached student/educator profiles) is shared with the blocking `BaseAPI`
+    instance passed in.
+    """
+
+    MAX_CONNECTIONS = 100
+    MAX_KEEPALIVE_CONNECTIONS = 20
+    KEEPALIVE_EXPIRY = 30
+    ROSTER_CONCURRENCY = int(os.getenv("CDS_ROSTER_CONCURRENCY", 6))
+
+    def __init__(self, base_api: BaseAPI, transport: httpx.AsyncBaseTransport = None):
+        self.base_api = base_api
+        # Replaces the network if given, e.g. with an `httpx.MockTransport`
+        self.transport = transport
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        self._client = None
+
+    @property
+    def API_URL(self):
+        return self.base_api.API_URL
+
+    @property
+    def hashed_user(self):
+        return self.base_api.hashed_user
+
+    def _start(self) -> tuple[asyncio.AbstractEventLoop, httpx.AsyncClient]:
+        """
+        Returns the event loop that owns the shared client, and the client,
+        starting both on first use. Solara runs a separate event loop for each
+        connection and a client's connections cannot move between loops, so
+        the client gets a long-lived loop of its own, run on a daemon thread.
+        """
+        with self._lock:
+            if self._loop is None:
+                api_key = os.getenv("CDS_API_KEY")
+                self._client = httpx.AsyncClient(
+                    base_url=self.API_URL,
+                    headers={"Authorization": api_key} if api_key else {},
+                    http2=True,
+                    timeout=httpx.Timeout(API_TIMEOUT, connect=API_CONNECT_TIMEOUT),
+                    limits=httpx.Limits(
+                        max_connections=self.MAX_CONNECTIONS,
+                        max_keepalive_connections=self.MAX_KEEPALIVE_CONNECTIONS,
+                        keepalive_expiry=self.KEEPALIVE_EXPIRY,
+                    ),
+                    transport=self.transport,
+                )
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=self._loop.run_forever, name="async-api", daemon=True
+                )
+                self._thread.start()
+
+            return self._loop, self._client
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """
+        Returns the shared `httpx.AsyncClient`. It may only be used from
+        coroutines running on its own loop; see `_send`.
+        """
+        return self._start()[1]
+
+    async def _send(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """
+        Issues a request through the shared client from whichever event loop
+        the caller runs on. Cancelling the caller cancels the request.
+        """
+        loop, client = self._start()
+        request = client.request(method, url, **kwargs)
+
+        if asyncio.get_running_loop() is loop:
+            return await request
+
+        future = asyncio.run_coroutine_threadsafe(request, loop)
+
+        return await asyncio.wrap_future(future)
+
+    def close(self):
+        """
+        Closes the shared client and stops its event loop. Both are started
+        again by the next request.
+        """
+        with self._lock:
+            loop, thread, client = self._loop, self._thread, self._client
+            self._loop = self._thread = self._client = None
+
+        if loop is None:
+            return
+
+        asyncio.run_coroutine_threadsafe(client.aclose(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+    async def _request(
+        self,
+        method: str,
+        endpoint: str,
+        params: dict = None,
+        json: dict = None,
+        headers: dict = None,
+        **path_params,
+    ) -> httpx.Response:
+        """
+        Issues a `method` request for `endpoint`, a path template formatted
+        with `path_params` as in `BaseAPI._request`, with the same per-endpoint
+        timeouts, retries and circuit breaker (shared with `base_api`), and
+        records it in the request metrics.
+        """
+        circuit_breaker = self.base_api.circuit_breaker
+        timeout = httpx.Timeout(
+            self.base_api.ENDPOINT_TIMEOUTS.get(endpoint, API_TIMEOUT),
+            connect=API_CONNECT_TIMEOUT,
+        )
+        attempts = 1 + (API_RETRIES if method in IDEMPOTENT_METHODS else 0)
+        call_tracking.record(method, endpoint)
+
+        for attempt in range(attempts):
+            last_attempt = attempt == attempts - 1
+            trial = circuit_breaker.before_request()
+            started = time.perf_counter()
+
+            try:
+                r = await self._send(
+                    method,
+                    endpoint.format(**path_params),
+                    params=params,
+                    json=json,
+                    headers=headers,
+                    timeout=timeout,
+                )
+            except httpx.TransportError as e:
+                metrics.observe_request(
+                    endpoint, method, "error", time.perf_counter() - started
+                )
+                circuit_breaker.record_failure()
+
+                if last_attempt:
+                    raise
+
+                logger.warning("%s %s failed (%s); retrying.", method, endpoint, e)
+            except Exception:
+                # See `BaseAPI._request`
+                metrics.observe_request(
+                    endpoint, method, "error", time.perf_counter() - started
+                )
+                circuit_breaker.record_failure()
+                raise
+            else:
+                metrics.observe_request(
+                    endpoint,
+                    method,
+                    r.status_code,
+                    time.perf_counter() - started,
+                    len(r.content),
+                )
+
+                if r.status_code < 500:
+                    circuit_breaker.record_success()
+                    return r
+
+                circuit_breaker.record_failure()
+
+                if last_attempt or r.status_code not in RETRY_STATUSES:
+                    return r
+
+                logger.warning(
+                    "%s %s returned %s; retrying.", method, endpoint, r.status_code
+                )
+            finally:
+                if trial:
+                    circuit_breaker.release_trial()
+
+            await asyncio.sleep(backoff_delay(attempt))
+
+    async def _get(
+        self, endpoint: str, params: dict = None, headers: dict = None, **path_params
+    ) -> httpx.Response:
+        """
+        Issues a GET request for `endpoint` (see `_request`). If the server is
+        unavailable, the last successful response for the same request, kept
+        in `BaseAPI.stale_responses`, is returned instead when there is one.
+        """
+        key = self.base_api._request_key(endpoint, params, **path_params)
+        stale_responses = self.base_api.stale_responses
+        error = None
+
+        try:
+            r = await self._request(
+                "GET", endpoint, params=params, headers=headers, **path_params
+            )
+        except (CircuitOpenError, httpx.TransportError) as e:
+            error, r = e, None
+
+        if r is not None and r.status_code < 500:
+            if r.status_code == 200:
+                stale_responses.set(key, r)
+            return r
+
+        stale = stale_responses.get(key)
+
+        if stale is None:
+            if error is not None:
+                raise error
+            return r
+
+        logger.warning("Serving a cached response for %s.", key[0])
+        metrics.observe_cache(endpoint, "stale")
+        return stale
+
+    async def _get_json(self, endpoint: str, **path_params):
+        """
+        Asynchronous counterpart of `BaseAPI._get_json`, sharing its cache of
+        validated bodies.
+        """
+        key = self.base_api._request_key(endpoint, **path_params)
+        cached = self.base_api.validated_bodies.get(key)
+        headers = {}
+
+        if cached is not None:
+            etag, last_modified, body = cached
+
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+
+        r = await self._get(endpoint, headers=headers, **path_params)
+
+        if r.status_code == 304 and cached is not None:
+            metrics.observe_cache(endpoint, "revalidated")
+            return body
+
+        if r.status_code == 304:
+            # See `BaseAPI._get_json`
+            r = await self._get(endpoint, **path_params)
+
+        body = r.json()
+        etag = r.headers.get("ETag")
+        last_modified = r.headers.get("Last-Modified")
+        metrics.observe_cache(endpoint, "miss")
+
+        if r.status_code == 200 and (etag or last_modified):
+            self.base_api.validated_bodies.set(key, (etag, last_modified, body))
+
+        return body
+
+    async def _user_profile(self, role: str) -> dict | None:
+        if auth.user.value is None:
+            return None
+
+        hashed_user = self.hashed_user
+        key = (hashed_user, role)
+        profile = self.base_api.identity_cache.get(key, default=_UNRESOLVED)
+
+        if profile is _UNRESOLVED:
+            r = await self._get(f"/{role}s/{{hashed_user}}", hashed_user=hashed_user)
+            profile = r.json().get(role, None)
+            self.base_api.identity_cache.set(key, profile)
+
+        return profile
+
+    async def student_info(self) -> dict | None:
+        return await self._user_profile("student")
+
+    async def educator_info(self) -> dict | None:
+        return await self._user_profile("educator")
+
+    async def validate_class_code(self, class_code: str) -> bool:
+        r = await self._get("/validate-classroom-code/{class_code}", class_code=class_code)
+        return r.status_code == 200
+
+    async def load_student_info(self, stu_id: str = None) -> dict:
+        if stu_id is None or stu_id == self.hashed_user:
+            return await self.student_info()
+
+        r = await self._get("/students/{stu_id}", stu_id=stu_id)
+        return r.json()["student"]
+
+    async def load_educator_info(self, edu_id: str = None) -> dict:
+        if edu_id is None or edu_id == self.hashed_user:
+            return await self.educator_info()
+
+        base_api = self.base_api
+        educator = base_api.educator_profile_cache.get(edu_id, default=_UNRESOLVED)
+
+        if educator is _UNRESOLVED:
+            # Looked up through `BaseAPI`, so that concurrent lookups from
+            # either API share its `profile_flight`
+            educator = await asyncio.wrap_future(
+                base_api.executor.submit(base_api._load_educator_profile, edu_id)
+            )
+
+        return educator
+
+    async def load_student_classes(self) -> list:
+        r = await self._get(
+            "/students/{hashed_user}/classes", hashed_user=self.hashed_user
+        )
+
+        if r.status_code != 200:
+            logger.error("Failed to load student classes.")
+            return []
+
+        return r.json()["classes"]
+
+    async def create_new_class(self, info: dict) -> dict:
+        educator = await self.educator_info()
+
+        r = await self._request(
+            "POST",
+            "/classes/create",
+            json={
+                "educator_id": educator["id"],
+                "name": info["name"],
+                "expected_size": info["expected_size"],
+                "asynchronous": info["asynchronous"],
+                "story_name": info["story_name"],
+            },
+        )
+
+        self.base_api.class_list_cache.invalidate(educator["id"])
+
+        return r.json()
+
+    async def delete_class(self, class_id: int) -> dict:
+        r = await self._request("DELETE", "/classes/{class_id}", class_id=class_id)
+
+        if (educator := await self.educator_info()) is not None:
+            self.base_api.class_list_cache.invalidate(educator["id"])
+
+        return r.json()
+
+    async def load_educator_classes(self):
+        educator = await self.educator_info()
+        class_list_cache = self.base_api.class_list_cache
+
+        # Serve (and, if stale, refresh in the background) the class list
+        # cached by `BaseAPI`, only awaiting the server on a miss.
+        classes = class_list_cache.get(
+            educator["id"],
+            lambda: self.base_api._fetch_educator_classes(educator["id"]),
+            block=False,
+        )
+
+        if classes is None:
+            classes = await self._get_json(
+                "/educator-classes/{educator_id}", educator_id=educator["id"]
+            )
+            class_list_cache.set(educator["id"], classes)
+
+        return classes
+
+    async def load_students_for_class(self, class_id: int):
+        return await self._get_json("/classes/roster/{class_id}", class_id=class_id)
+
+    async def iter_class_rosters(self, classes: list[dict], max_concurrency: int = None):
+        """
+        Fetches the rosters of `classes` concurrently, with at most
+        `max_concurrency` requests in flight, and yields `(cls, students)`
+        pairs in the order the responses arrive.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency or self.ROSTER_CONCURRENCY)
+
+        async def _load_roster(cls):
+            async with semaphore:
+                return cls, await self.load_students_for_class(cls["id"])
+
+        tasks = [asyncio.ensure_future(_load_roster(cls)) for cls in classes]
+
+        try:
+            for next_roster in asyncio.as_completed(tasks):
+                yield await next_roster
+        finally:
+            # Only has an effect if the consumer stopped early or was cancelled
+            for task in tasks:
+                task.cancel()
+
+    async def add_student_to_class(
+        self, class_code: str, username: str
+    ) -> httpx.Response:
+        return await self._request(
+            "POST",
+            "/classes/join",
+            json={"class_code": class_code, "username": username},
+        )
+
+    async def remove_student_from_class(
+        self, student_id: int, class_id: int
+    ) -> httpx.Response:
+        return await self._request(
+            "DELETE",
+            "/students/{student_id}/classes/{class_id}",
+            student_id=student_id,
+            class_id=class_id,
+        )
+
+    async def get_hubble_waiting_room_override(self, class_id: int) -> dict:
+        r = await self._get(
+            "/hubbles_law/waiting-room-override/{class_id}", class_id=class_id
+        )
+        return r.json()
+
+    async def set_hubble_waiting_room_override(
+        self, class_id: int, value: bool
+    ) -> httpx.Response:
+        return await self._request(
+            "PUT" if value else "DELETE",
+            "/hubbles_law/waiting-room-override",
+            json={"class_id": class_id},
+        )
+
+    async def get_class_active(self, class_id: int, story_name: str) -> bool:
+        key = (class_id, story_name)
+        active = self.base_api.class_active_cache.get(key)
+
+        if active is None:
+            r = await self._get(
+                "/classes/active/{class_id}/{story_name}",
+                class_id=class_id,
+                story_name=story_name,
+            )
+            active = r.json()["active"]
+            self.base_api.class_active_cache.set(key, active)
+
+        return active
+
+    async def get_classes_active(
+        self, class_ids: list[int], story_name: str
+    ) -> dict[int, bool]:
+        states = await asyncio.gather(
+            *(self.get_class_active(class_id, story_name) for class_id in class_ids)
+        )
+        return dict(zip(class_ids, states))
+
+    async def set_class_active(
+        self, class_id: int, story_name: str, active: bool
+    ) -> bool:
+        r = await self._request(
+            "POST",
+            "/classes/active/{class_id}/{story_name}",
+            json={"active": active},
+            class_id=class_id,
+            story_name=story_name,
+        )
+        success = r.json()["success"]
+
+        if success:
+            self.base_api.class_active_cache.set((class_id, story_name), active)
+        else:
+            self.base_api.class_active_cache.pop((class_id, story_name))
+
+        return success
+
+
+ASYNC_API = AsyncBaseAPI(BASE_API)
+atexit.register(ASYNC_API.close)
@@ -0,0 +1,319 @@
+"""
+Render cache for the pages that every visitor who is not signed in sees the
+same way: the landing page, about, team and the data stories.
+
+Such a page is rendered once per process (and theme), in a session of its
+own, and its widgets are kept as the `comm_open` messages that create them
+in the browser. An anonymous visitor's first paint of one of these pages is
+those messages, sent as they are; their session does not render anything.
+The page is only rendered for them (hydrated) when their browser first
+sends one of its widgets a message, e.g. a click. That render happens
+without sending anything, after which each live widget takes over the id of
+the cached widget it corresponds to, so the browser keeps what it shows and
+only receives what differs, and the message is then handled as usual.
+
+The cache is off unless `CDS_RENDER_CACHE` is set (to "1", "true" or
+"yes"); the pages it serves are listed in `CDS_RENDER_CACHE_PATHS` (comma
+separated). `cds_portal.asgi` installs it, except when Solara runs in
+development mode, where pages change with the code, or when the installed
+Solara is not a version whose internals this module was written against
+(see `widget_messages.solara_supported`).
+"""
+
+import collections
+import dataclasses
+import json
+import os
+import uuid
+
+from . import metrics, widget_messages
+from .cache import SingleFlight, TTLCache
+from .logger import setup_logger
+
+logger = setup_logger("RENDER")
+
+ENABLED = os.getenv("CDS_RENDER_CACHE", "").lower() in ("1", "true", "yes")
+
+CACHED_PATHS = tuple(
+    path
+    for path in os.getenv("CDS_RENDER_CACHE_PATHS", "/,/about,/team,/data_stories").split(",")
+    if path
+)
+
+# Rendered pages kept, one per path, app and theme
+RENDER_CACHE_SIZE = 32
+
+
+@dataclasses.dataclass(frozen=True)
+class Snapshot:
+    root: str  # model id of the container the page is rendered into
+    states: dict  # model id -> (state, buffer_paths, buffers)
+    order: list  # model ids in the order they are sent
+
+
+def _model(state: dict) -> tuple:
+    return state.get("_model_module"), state.get("_model_name")
+
+
+def _roots(states: dict) -> dict:
+    """Returns the widgets of `states` that no other widget references, by model."""
+    referenced = {
+        reference
+        for state, _, _ in states.values()
+        for reference in widget_messages.references(state)
+    }
+    roots = {}
+
+    for model_id, (state, _, _) in states.items():
+        if model_id not in referenced:
+            roots.setdefault(_model(state), []).append(model_id)
+
+    return roots
+
+
+class RenderCache:
+    def __init__(self, paths=CACHED_PATHS, maxsize: int = RENDER_CACHE_SIZE):
+        self.paths = frozenset(paths)
+        self.served = 0
+        self.hydrated = 0
+        # Pages never go stale; they only change with the code
+        self._snapshots = TTLCache(ttl=float("inf"), maxsize=maxsize)
+        self._flight = SingleFlight()
+        # Sessions showing a snapshot -> what to render when they hydrate
+        self._cold = {}
+
+    def _render(self, app_name: str, path: str, themes, dark) -> Snapshot:
+        import ipyvuetify
+        import ipywidgets
+        from solara.server import app as appmodule
+        from solara.server import kernel, kernel_context
+
+        context = kernel_context.VirtualKernelContext(
+            id=f"render-cache-{uuid.uuid4()}",
+            session_id="",
+            kernel=kernel.Kernel(),
+            control_sockets=[],
+            widgets={},
+            templates={},
+        )
+
+        try:
+            with context:
+                ipywidgets.register_comm_target(context.kernel)
+                appmodule.load_themes(themes, dark)
+                context.container = ipyvuetify.Html(tag="div")
+                appmodule.load_app_widget(None, appmodule.apps[app_name], path)
+
+                if context.app_object is None:
+                    # `load_app_widget` logs render errors rather than raising them
+                    raise RuntimeError(f"Could not render {path}")
+
+                states = widget_messages.serialize(context.widgets)
+
+                return Snapshot(
+                    root=context.container.model_id,
+                    states=states,
+                    order=widget_messages.dependency_order(states),
+                )
+        finally:
+            context.close()
+
+    def get(self, app_name: str, path: str, themes, dark) -> Snapshot:
+        """Returns the snapshot of `path`, rendering it if it is not cached."""
+        key = (app_name, path, json.dumps(themes, sort_keys=True), bool(dark))
+        snapshot = self._snapshots.get(key)
+
+        if snapshot is None:
+
+            def render():
+                snapshot = self._render(app_name, path, themes, dark)
+                self._snapshots.set(key, snapshot)
+                logger.info("Cached the render of %s (%d widgets).", path, len(snapshot.states))
+                return snapshot
+
+            snapshot = self._flight.do(key, render)
+
+        return snapshot
+
+    def _serve(self, context, comm, args: dict) -> bool:
+        """
+        Shows an anonymous visitor the cached render of the page they are
+        opening, if it is one of the cached paths.
+        """
+        from solara_enterprise import auth
+
+        path = args.get("path", "")
+        app_name = args.get("appName") or "__default__"
+
+        if path not in self.paths or auth.user.value is not None:
+            return False
+
+        try:
+            snapshot = self.get(app_name, path, args.get("themes"), args.get("dark"))
+        except Exception:
+            logger.exception("Failed to render %s for the cache; rendering it live.", path)
+            return False
+
+        kernel = context.kernel
+
+        for model_id in snapshot.order:
+            widget_messages.send_open(kernel, model_id, *snapshot.states[model_id])
+
+        self._cold[context.id] = (app_name, path, args, snapshot)
+        context.on_close(lambda: self._cold.pop(context.id, None))
+        comm_msg = kernel.comm_manager.comm_msg
+
+        def _comm_msg(stream, ident, msg):
+            if context.id in self._cold and msg["content"]["comm_id"] in snapshot.states:
+                self._hydrate(context)
+
+            return comm_msg(stream, ident, msg)
+
+        kernel.comm_manager.comm_msg = _comm_msg
+        self.served += 1
+        comm.send({"method": "finished", "widget_id": snapshot.root})
+
+        return True
+
+    def _hydrate(self, context):
+        """Renders the page a session shows from the cache for real."""
+        import ipyvuetify
+        from solara.server import app as appmodule
+
+        app_name, path, args, snapshot = self._cold.pop(context.id)
+
+        with widget_messages.muted(context.kernel):
+            appmodule.load_themes(args.get("themes"), args.get("dark"))
+            context.container = ipyvuetify.Html(tag="div")
+            appmodule.load_app_widget(None, appmodule.apps[app_name], path)
+
+        self._adopt(context, snapshot)
+        self.hydrated += 1
+        logger.debug("Hydrated %s in session %s.", path, context.id)
+
+    def _adopt(self, context, snapshot: Snapshot):
+        """
+        Gives the live widgets of `context` the ids of the cached widgets the
+        browser already has, matching them by their place in the widget
+        tree, and sends the browser whatever differs from the cache.
+        """
+        kernel = context.kernel
+        live = widget_messages.serialize(context.widgets)
+        renames = {}
+        adopted = set()
+        # Walk down from the widgets nothing references: the container, and
+        # others such as the theme, paired by type in the order they were made
+        pairs = collections.deque([(context.container.model_id, snapshot.root)])
+        live_roots = _roots(live)
+        cached_roots = _roots(snapshot.states)
+
+        for key in live_roots.keys() & cached_roots.keys():
+            pairs.extend(zip(live_roots[key], cached_roots[key]))
+
+        while pairs:
+            live_id, cached_id = pairs.popleft()
+
+            if live_id in renames or cached_id in adopted:
+                continue
+
+            if live_id not in live or cached_id not in snapshot.states:
+                continue
+
+            live_state = live[live_id][0]
+            cached_state = snapshot.states[cached_id][0]
+
+            if _model(live_state) != _model(cached_state):
+                continue
+
+            renames[live_id] = cached_id
+            adopted.add(cached_id)
+
+            for key, value in live_state.items():
+                live_references = list(widget_messages.references(value))
+                cached_references = list(widget_messages.references(cached_state.get(key)))
+
+                if len(live_references) == len(cached_references):
+                    pairs.extend(zip(live_references, cached_references))
+
+        for live_id, cached_id in renames.items():
+            widget = context.widgets.pop(live_id)
+            kernel.comm_manager.unregister_comm(widget.comm)
+            widget.comm.comm_id = widget._model_id = cached_id
+            widget.comm.topic = f"comm-{cached_id}".encode("ascii")
+            kernel.comm_manager.register_comm(widget.comm)
+            context.widgets[cached_id] = widget
+
+        states = widget_messages.serialize(context.widgets)
+        widget_messages.open_all(
+            kernel, {model_id: state for model_id, state in states.items() if model_id not in adopted}
+        )
+
+        for model_id in adopted:
+            if model_id in states and states[model_id] != snapshot.states[model_id]:
+                context.widgets[model_id].send_state()
+
+    def comm_target(self, solara_comm_target):
+        """Wraps Solara's `solara.control` comm target to serve from the cache."""
+        from solara.server import kernel_context
+
+        def _comm_target(comm, msg_first):
+            solara_comm_target(comm, msg_first)
+            run_app = comm._msg_callback
+
+            def on_msg(msg):
+                context = kernel_context.get_current_context()
+                data = msg["content"]["data"]
+
+                if context.id in self._cold:
+                    # Solara's own handling expects the app to be running
+                    self._hydrate(context)
+                elif data.get("method") == "run" and self._serve(context, comm, data["args"]):
+                    return
+
+                return run_app(msg)
+
+            comm.on_msg(on_msg)
+
+        return _comm_target
+
+    def collect_metrics(self) -> list:
+        return [
+            *metrics.samples(
+                "cds_render_cache_sessions_total",
+                "Anonymous sessions first shown a cached page ('served'), and those"
+                " of them that went on to render it live ('hydrated').",
+                "counter",
+                {"served": self.served, "hydrated": self.hydrated},
+                labelname="result",
+            ),
+            *metrics.samples(
+                "cds_render_cache_entries",
+                "Pages held in the render cache.",
+                "gauge",
+                {None: len(self._snapshots)},
+            ),
+        ]
+
+
+def install(paths=CACHED_PATHS, enabled: bool = ENABLED) -> RenderCache | None:
+    """
+    Serves anonymous first paints of `paths` from the render cache. Does
+    nothing unless `enabled`, if `paths` is empty, if Solara runs in
+    development mode or if the installed Solara is not supported.
+    """
+    from solara.server import app as appmodule
+    from solara.server import settings
+
+    if not enabled or not paths or settings.main.mode == "development":
+        return None
+
+    if not widget_messages.solara_supported():
+        logger.warning("Not installing the render cache on an unsupported Solara version.")
+        return None
+
+    cache = RenderCache(paths)
+    appmodule.solara_comm_target = cache.comm_target(appmodule.solara_comm_target)
+    metrics.REGISTRY.add_collector(cache.collect_metrics)
+    logger.info("Serving %s from the render cache.", ", ".join(sorted(cache.paths)))
+
+    return cache
@@ -0,0 +1,111 @@
+import random
+import threading
+import time
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of issuing a request while the circuit breaker is open."""
+
+
+def backoff_delay(attempt: int, base: float = 0.2, cap: float = 2.0) -> float:
+    """
+    Returns the "full jitter" exponential backoff delay (in seconds) before
+    retry number `attempt` (starting at 0).
+    """
+    return random.uniform(0, min(cap, base * 2**attempt))
+
+
+class CircuitBreaker:
+    """
+    Tracks consecutive upstream failures. After `failure_threshold` of them
+    the breaker opens and requests fail fast for `cooldown` seconds; it then
+    lets a single trial request through (half-open) and closes again if that
+    request succeeds.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, cooldown: float = 30):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self.times_opened = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if (
+            self._state == self.OPEN
+            and time.monotonic() - self._opened_at >= self.cooldown
+        ):
+            self._state = self.HALF_OPEN
+            self._trial_in_flight = False
+
+        return self._state
+
+    def before_request(self) -> bool:
+        """
+        Raises `CircuitOpenError` if a request should not be attempted right
+        now. Returns whether the request is the half-open trial, in which case
+        the caller must call `release_trial` once it is over, however it ends.
+        """
+        with self._lock:
+            state = self._current_state()
+
+            if state == self.CLOSED:
+                return False
+
+            if state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+
+            self.rejected += 1
+
+        raise CircuitOpenError("The CosmicDS API is currently unavailable.")
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def release_trial(self):
+        """
+        Ends the half-open trial even if neither `record_success` nor
+        `record_failure` was called for it (e.g. because the request was
+        cancelled), so that a later request can be the trial instead.
+        """
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            state = self._current_state()
+
+            if state == self.HALF_OPEN or (
+                state == self.CLOSED and self._failures >= self.failure_threshold
+            ):
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._trial_in_flight = False
+                self.times_opened += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "state": self._current_state(),
+                "consecutive_failures": self._failures,
+                "times_opened": self.times_opened,
+                "rejected": self.rejected,
+            }
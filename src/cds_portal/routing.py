@@ -0,0 +1,189 @@
+"""
+Routes to page packages that are imported when first visited, instead of
+when Solara loads the app. Autorouting imports every page package up front,
+so a worker could not answer anyone until the heaviest page (the educator
+dashboard, or pandas and plotly for the solar example) had been imported.
+
+The routes are shaped like autorouting's, including those of page packages
+nested in page packages, and a page package's `Layout` and `title` are still
+used once it is imported. Unlike autorouting, a page package's own `routes`
+and `route_order` are not supported, plain modules next to the page packages
+get no route, and a nested package gets a route even if it has no `Page`.
+
+Once the server has started, `preload` (run from a startup hook in
+`cds_portal.asgi`) imports the pages in a background thread anyway, so that
+usually no visitor waits for an import either. Set `CDS_PRELOAD_PAGES=0` to
+only import pages on demand.
+"""
+
+import importlib
+import os
+import pkgutil
+import re
+import sys
+import threading
+import time
+from typing import Iterable, List
+
+import solara
+
+from .logger import setup_logger
+
+logger = setup_logger("ROUTES")
+
+PRELOAD = os.getenv("CDS_PRELOAD_PAGES", "1").lower() not in ("0", "false", "no")
+
+# Seconds to wait after startup before preloading, so the server is
+# listening first
+PRELOAD_DELAY = float(os.getenv("CDS_PRELOAD_DELAY", 1))
+
+
+def _title(name: str) -> str:
+    # The label autorouting would give the page, e.g. "Solar Example"
+    name = re.sub("^[0-9\\-_ ]*", "", name)
+    return " ".join(part.title() for part in re.split("[\\-_ ]+", name))
+
+
+def import_page(module_name: str):
+    """Imports the page package `module_name`, logging how long it took."""
+    # Not returned from here: the module may still be being imported by
+    # another thread, which `import_module` waits for
+    loaded = module_name in sys.modules
+    start = time.perf_counter()
+
+    from solara.server import kernel_context
+
+    # As Solara does for the app itself: importing must not create widgets
+    # in whichever session happens to trigger it
+    with kernel_context.without_context():
+        module = importlib.import_module(module_name)
+
+    if not loaded:
+        logger.info("Imported %s in %.3fs.", module_name, time.perf_counter() - start)
+
+        if hasattr(module, "routes"):
+            logger.warning(
+                "Ignoring the routes of %s; see cds_portal.routing.", module_name
+            )
+
+    return module
+
+
+def _lazy_page(module_name: str):
+    @solara.component
+    def LazyPage():
+        module = import_page(module_name)
+        title = getattr(module, "_title", getattr(module, "title", None))
+
+        if not isinstance(title, str):
+            return module.Page()
+
+        # Deeper than the title the route's label gives the page, so it wins
+        with solara.Div() as main:
+            solara.Title(title)
+            module.Page()
+
+        return main
+
+    return LazyPage
+
+
+def _lazy_layout(module_name: str):
+    @solara.component
+    def LazyLayout(children=[]):
+        Layout = getattr(import_page(module_name), "Layout", None)
+
+        if Layout is None:
+            # Solara always wraps a single element in a layout
+            return children[0]
+
+        return Layout(children=children)
+
+    return LazyLayout
+
+
+def _page_names(package_path: Iterable[str]) -> List[str]:
+    return [info.name for info in pkgutil.iter_modules(package_path) if info.ispkg]
+
+
+def _subpackage_path(package_path: Iterable[str], name: str) -> List[str]:
+    return [os.path.join(path, name) for path in package_path]
+
+
+def lazy_route(
+    module_name: str, path: str, package_path: Iterable[str]
+) -> solara.Route:
+    """
+    A route at `path` for the page package `module_name`, found in
+    `package_path`, rendering its `Page` inside its `Layout`, if it has one,
+    with routes for the page packages nested in it as children.
+    """
+    label = _title(path)
+
+    return solara.Route(
+        path=path,
+        label=label,
+        children=[
+            solara.Route(
+                path="/",
+                component=_lazy_page(module_name),
+                layout=_lazy_layout(module_name),
+                label=label,
+            ),
+            *lazy_routes(module_name, package_path),
+        ],
+    )
+
+
+def lazy_routes(package_name: str, package_path: Iterable[str]) -> List[solara.Route]:
+    """
+    Routes for the page packages in a package, named like autorouting
+    would, without importing them.
+    """
+    return [
+        lazy_route(f"{package_name}.{name}", name, _subpackage_path(package_path, name))
+        for name in _page_names(package_path)
+    ]
+
+
+def page_modules(package_name: str, package_path: Iterable[str]) -> List[str]:
+    """The names of the page packages `lazy_routes` gives routes to."""
+    module_names = []
+
+    for name in _page_names(package_path):
+        module_name = f"{package_name}.{name}"
+        module_names.append(module_name)
+        module_names.extend(
+            page_modules(module_name, _subpackage_path(package_path, name))
+        )
+
+    return module_names
+
+
+def _preload(module_names: List[str], delay: float):
+    time.sleep(delay)
+
+    for module_name in module_names:
+        try:
+            import_page(module_name)
+        except Exception:
+            # Rendering the page will raise it again, where it can be seen
+            logger.exception("Failed to preload %s.", module_name)
+
+
+def preload(
+    package_name: str, package_path: Iterable[str], delay: float = PRELOAD_DELAY
+):
+    """
+    Imports the page packages in a package from a daemon thread, after
+    `delay` seconds, unless disabled with `CDS_PRELOAD_PAGES`.
+    """
+    if not PRELOAD:
+        return
+
+    threading.Thread(
+        target=_preload,
+        args=(page_modules(package_name, package_path), delay),
+        name="preload-pages",
+        daemon=True,
+    ).start()
@@ -0,0 +1,232 @@
+"""
+Pool of pre-warmed Solara sessions, so that a burst of new visitors (say, a
+classroom following the same link) does not queue one cold build of the
+layout, `GLOBAL_STATE` and the page per visitor.
+
+Each pooled session is a kernel whose app has already been rendered at
+`CDS_SESSION_POOL_PATH` (the landing page by default) by a background
+thread, without a browser attached. An anonymous visitor connecting a new
+kernel claims one instead of having a kernel created for them; when their
+browser asks Solara to run the app, the already-rendered widgets are sent
+instead, and the pool builds a replacement in the background. Visitors who
+are signed in, or whose first page is another path, get (or end up with) a
+fresh session as before, since theirs depends on who they are or where they
+are.
+
+The pool holds `CDS_SESSION_POOL_SIZE` sessions and is off (size 0) unless
+that is set. It is installed by `cds_portal.asgi`, but not when Solara runs
+in development mode, where sessions are reloaded with the code, or on a
+Solara version it was not written against. It starts filling on the first
+connection, once the server knows its base URL (which the layout's sign-in
+link needs). Claims and misses are counted in the `cds_session_pool_*`
+metrics.
+"""
+
+import collections
+import os
+import threading
+import time
+import uuid
+
+from . import metrics, widget_messages
+from .logger import setup_logger
+
+logger = setup_logger("POOL")
+
+POOL_SIZE = int(os.getenv("CDS_SESSION_POOL_SIZE", 0))
+
+# Path the pooled sessions are rendered at; first visits elsewhere render
+# their page from scratch
+POOL_PATH = os.getenv("CDS_SESSION_POOL_PATH", "/")
+
+
+class SessionPool:
+    def __init__(self, size: int = POOL_SIZE, path: str = POOL_PATH):
+        self.size = size
+        self.path = path
+        self.claimed = 0
+        self.missed = 0
+        self._warm = collections.deque()
+        # Claimed sessions whose browser has not run the app yet
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._wanted = threading.Event()
+        self._thread = None
+
+    def _prepare(self):
+        """Creates a kernel and renders the app into it, as a visit would."""
+        import ipyvuetify
+        import ipywidgets
+        from solara.server import app as appmodule
+        from solara.server import kernel, kernel_context
+
+        context = kernel_context.VirtualKernelContext(
+            id=f"pool-{uuid.uuid4()}",
+            session_id="",
+            kernel=kernel.Kernel(),
+            control_sockets=[],
+            widgets={},
+            templates={},
+        )
+
+        with context:
+            ipywidgets.register_comm_target(context.kernel)
+            context.kernel.comm_manager.register_target("solara.control", self._comm_target)
+            context.container = ipyvuetify.Html(tag="div")
+            appmodule.load_app_widget(None, appmodule.apps["__default__"], self.path)
+
+        if context.app_object is None:
+            # `load_app_widget` logs render errors rather than raising them
+            context.close()
+            raise RuntimeError(f"Could not render {self.path}")
+
+        return context
+
+    def _fill(self):
+        while True:
+            self._wanted.wait()
+
+            while len(self._warm) < self.size:
+                start = time.perf_counter()
+
+                try:
+                    context = self._prepare()
+                except Exception:
+                    logger.exception("Failed to prepare a pooled session; retrying shortly.")
+                    time.sleep(5)
+                    continue
+
+                with self._lock:
+                    self._warm.append(context)
+
+                logger.debug(
+                    "Prepared pooled session %s in %.3fs.", context.id, time.perf_counter() - start
+                )
+
+            self._wanted.clear()
+
+            # A claim may have come in between the last check and clearing
+            if len(self._warm) < self.size:
+                self._wanted.set()
+
+    def _refill(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._fill, name="session-pool", daemon=True)
+            self._thread.start()
+
+        self._wanted.set()
+
+    def claim(self, session_id: str, kernel_id: str) -> bool:
+        """
+        Hands a warm session to the kernel `kernel_id` that `session_id` is
+        connecting, if there is one and the kernel is new.
+        """
+        from solara.server import kernel_context
+
+        with self._lock:
+            if kernel_id in kernel_context.contexts:
+                return False
+
+            self._refill()
+
+            if not self._warm:
+                self.missed += 1
+                return False
+
+            context = self._warm.popleft()
+            self.claimed += 1
+            context.session_id = session_id
+            # The context keeps its own id, which its state is stored under;
+            # Solara finds it by the kernel id through this alias
+            kernel_context.contexts[kernel_id] = context
+            self._pending.add(context.id)
+
+        def release():
+            kernel_context.contexts.pop(kernel_id, None)
+            self._pending.discard(context.id)
+
+        context.on_close(release)
+        logger.debug("Kernel %s claimed pooled session %s.", kernel_id, context.id)
+
+        return True
+
+    def _comm_target(self, comm, msg_first):
+        from solara.server import app as appmodule
+        from solara.server import kernel_context
+
+        appmodule.solara_comm_target(comm, msg_first)
+        run_app = comm._msg_callback
+
+        def on_msg(msg):
+            context = kernel_context.get_current_context()
+            data = msg["content"]["data"]
+
+            if data.get("method") != "run" or context.id not in self._pending:
+                return run_app(msg)
+
+            self._pending.discard(context.id)
+            args = data["args"]
+
+            if args.get("path", "") != self.path or (args.get("appName") or "__default__") != "__default__":
+                # Rendered for another page; start over
+                context.app_object.close()
+                context.container.close()
+                context.app_object = None
+                return run_app(msg)
+
+            # Changes to the (already sent) widgets are in the state sent below
+            with widget_messages.muted(context.kernel):
+                appmodule.load_themes(args.get("themes"), args.get("dark"))
+
+            widget_messages.open_all(context.kernel, widget_messages.serialize(context.widgets))
+            comm.send({"method": "finished", "widget_id": context.container._model_id})
+
+        comm.on_msg(on_msg)
+
+    def collect_metrics(self) -> list:
+        return [
+            *metrics.samples(
+                "cds_session_pool_claims_total",
+                "New anonymous sessions by whether they claimed a pre-warmed session.",
+                "counter",
+                {"hit": self.claimed, "miss": self.missed},
+                labelname="result",
+            ),
+            *metrics.samples(
+                "cds_session_pool_warm",
+                "Pre-warmed sessions waiting to be claimed.",
+                "gauge",
+                {None: len(self._warm)},
+            ),
+        ]
+
+
+def install(size: int = POOL_SIZE, path: str = POOL_PATH) -> SessionPool | None:
+    """
+    Routes new anonymous connections to a pool of `size` warm sessions.
+    Does nothing if `size` is 0, if Solara runs in development mode or if
+    the installed Solara is not supported.
+    """
+    from solara.server import server, settings
+
+    if size <= 0 or settings.main.mode == "development":
+        return None
+
+    if not widget_messages.solara_supported():
+        logger.warning("Not installing the session pool on an unsupported Solara version.")
+        return None
+
+    pool = SessionPool(size, path)
+    app_loop = server.app_loop
+
+    async def _app_loop(ws, cookies, headers, session_id, kernel_id, page_id, user=None):
+        if user is None:
+            pool.claim(session_id, kernel_id)
+
+        await app_loop(ws, cookies, headers, session_id, kernel_id, page_id, user)
+
+    server.app_loop = _app_loop
+    metrics.REGISTRY.add_collector(pool.collect_metrics)
+    logger.info("Pooling %d warm sessions rendered at %s.", size, path)
+
+    return pool
@@ -0,0 +1,4 @@
+"""
+Data handling for the solar example page (`pages/solar_example`), kept out
+of `pages` so that autorouting does not turn these modules into routes.
+"""
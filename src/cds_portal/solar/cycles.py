@@ -0,0 +1,153 @@
+"""
+Solar cycles found in the daily sunspot series, rather than typed in.
+
+Cycles are delimited by the minima of the 13-month smoothed monthly mean
+sunspot number (the smoothing SILSO uses to date cycles), and numbered by
+counting mean-length cycles from the start of cycle 1 in 1755. For each
+cycle, its amplitude (the smoothed maximum) and the correlation between its
+yearly mean sunspot numbers and the yearly TSI are computed too.
+"""
+
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from .data import datetime_to_decimal_years, load_sunspots, load_tsi
+
+# The 13-month running mean, with half weight for the outer months
+SMOOTHING_WEIGHTS = np.r_[0.5, np.ones(11), 0.5] / 12
+
+# A minimum is the lowest smoothed value within this many months on either
+# side. Cycles last 9 to 14 years, so minima are never this close.
+MINIMUM_WINDOW = 48
+
+# A minimum needs at least this many smoothed months after (and before) it,
+# otherwise the series may just not have turned yet.
+EDGE_MONTHS = 12
+
+CYCLE_1_START = 1755.2
+MEAN_CYCLE_LENGTH = 11.06
+
+# Fewest yearly values for which a cycle's TSI correlation is computed
+MIN_CORRELATION_YEARS = 3
+
+
+def smoothed_monthly(sunspot_df: pd.DataFrame) -> pd.Series:
+    """
+    The 13-month smoothed monthly mean sunspot number, indexed by the first
+    day of each month. Months without data are skipped.
+    """
+    monthly = (
+        pd.Series(sunspot_df["Sunspot_Number"].to_numpy(), index=sunspot_df["Date"])
+        .resample("MS")
+        .mean()
+        .dropna()
+    )
+    offset = len(SMOOTHING_WEIGHTS) // 2
+    smoothed = np.convolve(monthly.to_numpy(), SMOOTHING_WEIGHTS, mode="valid")
+
+    return pd.Series(smoothed, index=monthly.index[offset:len(monthly) - offset])
+
+
+def find_minima(smoothed: pd.Series) -> pd.DatetimeIndex:
+    """The months of the cycle minima in a smoothed sunspot series."""
+    values = smoothed.to_numpy()
+    padded = np.pad(values, MINIMUM_WINDOW, constant_values=np.inf)
+    window_minimum = sliding_window_view(padded, 2 * MINIMUM_WINDOW + 1).min(axis=1)
+
+    candidates = np.flatnonzero(values == window_minimum)
+    candidates = candidates[
+        (candidates >= EDGE_MONTHS) & (candidates < len(values) - EDGE_MONTHS)
+    ]
+
+    # A flat minimum matches more than once; keep its first month
+    if len(candidates):
+        candidates = candidates[np.r_[True, np.diff(candidates) > MINIMUM_WINDOW]]
+
+    return smoothed.index[candidates]
+
+
+def cycle_numbers(decimal_years) -> np.ndarray:
+    """The numbers of the cycles starting at the given decimal years."""
+    elapsed = (np.asarray(decimal_years) - CYCLE_1_START) / MEAN_CYCLE_LENGTH
+    return np.rint(elapsed).astype(int) + 1
+
+
+def _correlations(groups: np.ndarray, x: np.ndarray, y: np.ndarray, size: int) -> np.ndarray:
+    # Pearson correlation per group, from per-group sums
+    n = np.bincount(groups, minlength=size).astype(float)
+    sum_x = np.bincount(groups, x, minlength=size)
+    sum_y = np.bincount(groups, y, minlength=size)
+    sum_xy = np.bincount(groups, x * y, minlength=size)
+    sum_xx = np.bincount(groups, x * x, minlength=size)
+    sum_yy = np.bincount(groups, y * y, minlength=size)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        covariance = n * sum_xy - sum_x * sum_y
+        spread = np.sqrt((n * sum_xx - sum_x**2) * (n * sum_yy - sum_y**2))
+        correlation = covariance / spread
+
+    correlation[n < MIN_CORRELATION_YEARS] = np.nan
+    return correlation
+
+
+def compute_cycles(sunspot_df: pd.DataFrame, tsi_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    One row per solar cycle in the data, in order, with its `number`,
+    `start` (the minimum it starts at, NaT for a cycle that began before the
+    data does), `start_year` (decimal), `maximum` (month of the smoothed
+    maximum), `amplitude` and `tsi_correlation`.
+    """
+    smoothed = smoothed_monthly(sunspot_df)
+    minima = find_minima(smoothed)
+    start_years = datetime_to_decimal_years(minima)
+
+    # Cycle k starts at minimum k - 1; cycle 0 is the part before the first
+    # minimum (if any data precedes it)
+    cycle = np.searchsorted(minima, smoothed.index, side="right")
+    first = 0 if cycle[0] == 0 else 1
+    count = len(minima) + 1
+
+    grouped = smoothed.groupby(cycle)
+    amplitude = grouped.max().reindex(range(count))
+    maximum = grouped.idxmax().reindex(range(count))
+
+    # Yearly mean sunspot numbers against the yearly TSI
+    yearly = sunspot_df.groupby(np.floor(sunspot_df["Year"]))["Sunspot_Number"].mean()
+    tsi_years = np.floor(tsi_df["Year"].to_numpy())
+    sunspot_means = yearly.reindex(tsi_years).to_numpy()
+    present = ~np.isnan(sunspot_means)
+    tsi_cycle = np.searchsorted(minima, tsi_df["Date"].to_numpy()[present], side="right")
+    correlation = _correlations(
+        tsi_cycle, sunspot_means[present], tsi_df["TSI"].to_numpy()[present], count
+    )
+
+    numbers = cycle_numbers(start_years)
+
+    if len(numbers):
+        leading = numbers[0] - 1
+    else:
+        # The cycle in progress when the data starts
+        elapsed = datetime_to_decimal_years(smoothed.index[:1]) - CYCLE_1_START
+        leading = int(elapsed[0] // MEAN_CYCLE_LENGTH) + 1
+
+    cycles = pd.DataFrame(
+        {
+            "number": np.r_[leading, numbers],
+            "start": pd.DatetimeIndex(np.r_[np.datetime64("NaT", "ns"), minima.to_numpy()]),
+            "start_year": np.r_[np.nan, start_years],
+            "maximum": pd.DatetimeIndex(maximum.to_numpy()),
+            "amplitude": amplitude.to_numpy(),
+            "tsi_correlation": correlation,
+        }
+    )
+
+    return cycles.iloc[first:].reset_index(drop=True)
+
+
+@lru_cache(maxsize=None)
+def solar_cycles() -> pd.DataFrame:
+    """The cycles in the bundled data. The frame is shared; do not modify it."""
+    return compute_cycles(load_sunspots(), load_tsi())
@@ -0,0 +1,121 @@
+"""
+Lazily loaded sunspot and total solar irradiance (TSI) series.
+
+The CSVs index observations by decimal year. They are parsed once per
+process, on first use, and the parsed columns (including the converted
+dates) are saved as an `.npz` file next to each CSV, or in
+`CDS_SOLAR_CACHE_DIR` when that is set (e.g. because the package is
+installed read-only). Later processes load that instead of parsing the CSV,
+unless the CSV's modification time has changed since.
+"""
+
+import os
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from ..logger import setup_logger
+
+logger = setup_logger("SOLAR")
+
+DATA_DIR = Path(__file__).parent.parent / "pages" / "solar_example"
+SUNSPOT_CSV = DATA_DIR / "sunspot_data_1945_2018.csv"
+TSI_CSV = DATA_DIR / "tsi_data_1945_2018.csv"
+
+# Directory of the `.npz` caches of the bundled CSVs; `None` keeps each one
+# next to its CSV.
+CACHE_DIR = (
+    Path(os.environ["CDS_SOLAR_CACHE_DIR"]) if os.getenv("CDS_SOLAR_CACHE_DIR") else None
+)
+
+
+def decimal_years_to_datetime(decimal_years) -> np.ndarray:
+    """
+    Converts an array of decimal years (e.g. 1996.62) to `datetime64[ns]`,
+    interpolating linearly within each calendar year.
+    """
+    decimal_years = np.asarray(decimal_years, dtype=float)
+    years = np.floor(decimal_years).astype(np.int64)
+
+    start = (years - 1970).astype("datetime64[Y]").astype("datetime64[ns]")
+    end = (years - 1969).astype("datetime64[Y]").astype("datetime64[ns]")
+    year_length = (end - start).astype(np.int64)
+    offset = np.rint(year_length * (decimal_years - years)).astype("timedelta64[ns]")
+
+    return start + offset
+
+
+def datetime_to_decimal_years(dates) -> np.ndarray:
+    """The inverse of `decimal_years_to_datetime`."""
+    dates = np.asarray(dates, dtype="datetime64[ns]")
+    years = dates.astype("datetime64[Y]")
+
+    start = years.astype("datetime64[ns]")
+    year_length = ((years + 1).astype("datetime64[ns]") - start).astype(np.int64)
+
+    return years.astype(np.int64) + 1970 + (dates - start).astype(np.int64) / year_length
+
+
+def _read_cache(cache_path: Path, mtime: int, column: str) -> pd.DataFrame | None:
+    try:
+        with np.load(cache_path) as cached:
+            if int(cached["mtime"]) != mtime:
+                return None
+
+            return pd.DataFrame(
+                {"Year": cached["year"], column: cached["values"], "Date": cached["date"]}
+            )
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def _write_cache(cache_path: Path, mtime: int, df: pd.DataFrame, column: str):
+    temporary = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+
+    try:
+        with open(temporary, "wb") as f:
+            np.savez(
+                f,
+                mtime=np.int64(mtime),
+                year=df["Year"].to_numpy(),
+                values=df[column].to_numpy(),
+                date=df["Date"].to_numpy(),
+            )
+
+        # Atomic, so concurrently starting workers never read a partial file
+        os.replace(temporary, cache_path)
+    except OSError as e:
+        logger.warning("Could not write %s: %s", cache_path, e)
+        temporary.unlink(missing_ok=True)
+
+
+def load_series(csv_path: Path, column: str, cache_dir: Path = None) -> pd.DataFrame:
+    """
+    Returns the `Year` and `column` columns of `csv_path` plus a `Date`
+    column converted from `Year`, from the `.npz` cache (in `cache_dir`, or
+    next to the CSV) when it is current.
+    """
+    cache_path = Path(cache_dir or csv_path.parent) / f"{csv_path.stem}.npz"
+    mtime = csv_path.stat().st_mtime_ns
+    df = _read_cache(cache_path, mtime, column)
+
+    if df is None:
+        df = pd.read_csv(csv_path, usecols=["Year", column])
+        df["Date"] = decimal_years_to_datetime(df["Year"].to_numpy())
+        _write_cache(cache_path, mtime, df, column)
+
+    return df
+
+
+@lru_cache(maxsize=None)
+def load_sunspots() -> pd.DataFrame:
+    """Daily sunspot numbers. The frame is shared; do not modify it."""
+    return load_series(SUNSPOT_CSV, "Sunspot_Number", CACHE_DIR)
+
+
+@lru_cache(maxsize=None)
+def load_tsi() -> pd.DataFrame:
+    """Yearly total solar irradiance. The frame is shared; do not modify it."""
+    return load_series(TSI_CSV, "TSI", CACHE_DIR)
@@ -0,0 +1,60 @@
+"""
+Daily, monthly and yearly versions of the solar example series.
+
+Each aggregate holds the mean of the observations in each period, dated at
+the middle of the period, with empty periods left out. All of a dataset's
+resolutions are computed together on first use and kept for the life of the
+process, so switching between them in the page never recomputes anything.
+"""
+
+from functools import lru_cache
+
+import pandas as pd
+
+from .data import load_sunspots, load_tsi
+
+# From finest to coarsest, with the pandas period frequency of each
+RESOLUTIONS = {"daily": "D", "monthly": "M", "yearly": "Y"}
+
+
+def aggregate(df: pd.DataFrame, column: str, resolution: str) -> pd.DataFrame:
+    """Means of `column` per period of `resolution`, with a `Date` column."""
+    periods = pd.PeriodIndex(df["Date"], freq=RESOLUTIONS[resolution])
+    means = df[column].groupby(periods).mean().dropna()
+    start, end = means.index.start_time, means.index.end_time
+
+    return pd.DataFrame({"Date": start + (end - start) / 2, column: means.to_numpy()})
+
+
+def aggregates(df: pd.DataFrame, column: str, native: str) -> dict[str, pd.DataFrame]:
+    """
+    Every resolution of a series sampled at resolution `native`. Resolutions
+    as fine as that (or finer) are the series itself, since they cannot add
+    detail.
+    """
+    names = list(RESOLUTIONS)
+    series = df[["Date", column]]
+
+    return {
+        resolution: series if names.index(resolution) <= names.index(native)
+        else aggregate(df, column, resolution)
+        for resolution in names
+    }
+
+
+def effective_resolution(native: str, resolution: str) -> str:
+    """The resolution actually shown when `resolution` is requested."""
+    names = list(RESOLUTIONS)
+    return names[max(names.index(native), names.index(resolution))]
+
+
+@lru_cache(maxsize=None)
+def sunspot_aggregates() -> dict[str, pd.DataFrame]:
+    """Sunspot numbers per resolution. The frames are shared; do not modify them."""
+    return aggregates(load_sunspots(), "Sunspot_Number", "daily")
+
+
+@lru_cache(maxsize=None)
+def tsi_aggregates() -> dict[str, pd.DataFrame]:
+    """TSI per resolution. The frames are shared; do not modify them."""
+    return aggregates(load_tsi(), "TSI", "yearly")
@@ -0,0 +1,373 @@
+"""
+Startup profiler for the portal. Starts the app in a fresh interpreter, as a
+(re)started worker would, and records how long each module took to import
+and how much resident memory it added, then how long the first render of
+the home page (the root `Layout` and its `Page`) took:
+
+    cds-portal-startup-profile --repeat 5 --budget 4
+
+Cold start is importing the app (`cds_portal.pages`) plus that first render,
+i.e. what stands between a worker starting and it answering its first
+visitor. The page packages, which are imported on first visit or in the
+background (see `cds_portal.routing`), are profiled too but reported
+separately and not counted towards it.
+
+Two files are written: a report sorted by cumulative import time (also
+printed), and a flame graph of self time in the folded-stack format, which
+`flamegraph.pl` or https://www.speedscope.app render. With `--budget` (or
+`CDS_STARTUP_BUDGET`, in seconds), the command exits with status 1 when the
+median cold start over `--repeat` runs exceeds it, so it can be used as a
+benchmark check. It also exits with status 1 if the home page failed to
+render or a page package failed to import, since a cold start that skipped
+them is not a measurement of the app.
+"""
+
+import argparse
+import collections
+import contextlib
+import importlib
+import importlib.abc
+import importlib.machinery
+import json
+import os
+import pkgutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from .logger import setup_logger
+
+logger = setup_logger("STARTUP")
+
+_FILE_LOADERS = (
+    importlib.machinery.SourceFileLoader,
+    importlib.machinery.SourcelessFileLoader,
+    importlib.machinery.ExtensionFileLoader,
+)
+
+
+def _rss() -> int | None:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+class ImportRecorder(importlib.abc.MetaPathFinder):
+    """
+    Meta path finder that finds nothing itself, but times the execution of
+    every module loaded from a file by the finders after it.
+    """
+
+    def __init__(self):
+        self.phase = "startup"
+        self.imports = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def install(self):
+        sys.meta_path.insert(0, self)
+
+    def uninstall(self):
+        sys.meta_path.remove(self)
+
+    def find_spec(self, fullname, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+
+            spec = finder.find_spec(fullname, path, target)
+
+            if spec is None:
+                continue
+
+            # File loaders are created per module, so wrapping the instance's
+            # method only affects this import
+            if isinstance(spec.loader, _FILE_LOADERS):
+                exec_module = spec.loader.exec_module
+
+                def _exec_module(module, exec_module=exec_module):
+                    with self._measure(fullname):
+                        exec_module(module)
+
+                spec.loader.exec_module = _exec_module
+
+            return spec
+
+        return None
+
+    @contextlib.contextmanager
+    def _measure(self, name: str):
+        stack = getattr(self._local, "stack", None)
+
+        if stack is None:
+            stack = self._local.stack = []
+
+        # [name, time in nested imports, memory of nested imports]
+        frame = [name, 0.0, 0]
+        stack.append(frame)
+        rss = _rss()
+        start = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            cumulative = time.perf_counter() - start
+            memory = None if rss is None else _rss() - rss
+            stack.pop()
+
+            if stack:
+                stack[-1][1] += cumulative
+                stack[-1][2] += memory or 0
+
+            parents = [parent[0] for parent in stack]
+
+            if threading.current_thread() is not threading.main_thread():
+                parents.insert(0, f"<thread {threading.current_thread().name}>")
+
+            with self._lock:
+                self.imports.append(
+                    {
+                        "module": name,
+                        "phase": self.phase,
+                        "parents": parents,
+                        "cumulative": cumulative,
+                        "self": cumulative - frame[1],
+                        "memory": memory,
+                        "self_memory": None if memory is None else memory - frame[2],
+                    }
+                )
+
+
+def _render_home(app):
+    import solara
+    from solara.autorouting import RenderPage, generate_routes
+
+    routes = generate_routes(app)
+    solara.render(
+        solara.RoutingProvider(routes=routes, pathname="/", children=[RenderPage()]),
+        handle_error=False,
+    )
+
+
+def profile_startup(app_name: str, render: bool = True, pages: bool = True) -> dict:
+    """
+    Imports `app_name`, renders its home page and imports its page packages
+    in this process, recording each. Only meaningful in a fresh interpreter.
+    """
+    recorder = ImportRecorder()
+    recorder.install()
+    phases = {}
+    errors = []
+
+    try:
+        recorder.phase = "app"
+        start = time.perf_counter()
+        app = importlib.import_module(app_name)
+        phases["app"] = time.perf_counter() - start
+
+        if render:
+            recorder.phase = "render"
+            start = time.perf_counter()
+
+            try:
+                _render_home(app)
+            except Exception as e:
+                errors.append(f"render: {e!r}")
+
+            phases["render"] = time.perf_counter() - start
+
+        if pages and hasattr(app, "__path__"):
+            recorder.phase = "pages"
+            start = time.perf_counter()
+
+            for info in pkgutil.iter_modules(app.__path__):
+                try:
+                    importlib.import_module(f"{app_name}.{info.name}")
+                except Exception as e:
+                    errors.append(f"{info.name}: {e!r}")
+
+            phases["pages"] = time.perf_counter() - start
+    finally:
+        recorder.uninstall()
+
+    return {
+        "phases": phases,
+        "cold_start": phases["app"] + phases.get("render", 0.0),
+        "imports": recorder.imports,
+        "errors": errors,
+    }
+
+
+def _profile_in_subprocess(args) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        result_path = os.path.join(directory, "result.json")
+        command = [
+            sys.executable, "-m", "cds_portal.startup_profile",
+            "--child", result_path, "--app", args.app,
+        ]
+
+        if args.no_render:
+            command.append("--no-render")
+
+        # Pages are profiled in their own phase rather than preloaded in the
+        # background, where they would be attributed to whichever phase runs
+        env = {**os.environ, "CDS_PRELOAD_PAGES": "0"}
+        process = subprocess.run(
+            command, env=env, capture_output=True, text=True, timeout=args.timeout
+        )
+
+        if process.returncode != 0:
+            raise RuntimeError(f"Profiling failed:\n{process.stderr}")
+
+        with open(result_path) as f:
+            return json.load(f)
+
+
+def folded_stacks(result: dict) -> list:
+    """Flame graph lines: the import stack of each module and its self time (us)."""
+    totals = collections.Counter()
+
+    for entry in result["imports"]:
+        stack = ";".join([entry["phase"], *entry["parents"], entry["module"]])
+        totals[stack] += entry["self"]
+
+    return [f"{stack} {round(seconds * 1e6)}" for stack, seconds in sorted(totals.items())]
+
+
+def _megabytes(value) -> str:
+    return "" if value is None else f"{value / 2 ** 20:+.1f}MB"
+
+
+def format_report(result: dict, runs: list, budget: float = None, top: int = 50) -> str:
+    phases = result["phases"]
+    cold_starts = [run["cold_start"] for run in runs]
+    median = statistics.median(cold_starts)
+    lines = [
+        f"Cold start: {median:.3f}s median of {len(runs)} run(s)"
+        f" (min {min(cold_starts):.3f}s, max {max(cold_starts):.3f}s)",
+    ]
+
+    if budget is not None:
+        if any(run["errors"] for run in runs):
+            verdict = "FAILED (errors)"
+        else:
+            verdict = "OK" if median <= budget else "EXCEEDED"
+
+        lines.append(f"Budget: {budget:.3f}s, {verdict}")
+
+    lines.append(
+        "Profiled run: "
+        + ", ".join(f"{phase} {seconds:.3f}s" for phase, seconds in phases.items())
+    )
+
+    for error in result["errors"]:
+        lines.append(f"Error: {error}")
+
+    by_package = collections.defaultdict(lambda: [0.0, 0])
+
+    for entry in result["imports"]:
+        if entry["phase"] != "pages":
+            package = by_package[entry["module"].split(".")[0]]
+            package[0] += entry["self"]
+            package[1] += entry["self_memory"] or 0
+
+    lines += ["", "Self time by top-level package (cold start only):"]
+
+    for package, (seconds, memory) in sorted(by_package.items(), key=lambda item: -item[1][0])[:top]:
+        lines.append(f"  {seconds:8.3f}s {_megabytes(memory):>10}  {package}")
+
+    lines += [
+        "",
+        f"Slowest {top} imports by cumulative time:",
+        f"  {'phase':<7} {'cumulative':>10} {'self':>8} {'memory':>10}  module",
+    ]
+    imports = sorted(result["imports"], key=lambda entry: -entry["cumulative"])
+
+    for entry in imports[:top]:
+        lines.append(
+            f"  {entry['phase']:<7} {entry['cumulative']:9.3f}s {entry['self']:7.3f}s"
+            f" {_megabytes(entry['memory']):>10}  {entry['module']}"
+        )
+
+    return "\n".join(lines)
+
+
+def parse_args(args):
+    parser = argparse.ArgumentParser(description="Cold start profiler for the portal")
+    parser.add_argument("--app", default="cds_portal.pages", help="Solara app module")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs, each in a new interpreter")
+    parser.add_argument(
+        "--budget",
+        type=float,
+        default=float(os.environ["CDS_STARTUP_BUDGET"]) if os.getenv("CDS_STARTUP_BUDGET") else None,
+        help="Maximum median cold start (s); exceeding it exits with status 1",
+    )
+    parser.add_argument("--report", default="startup-profile.txt", help="Report file")
+    parser.add_argument(
+        "--flamegraph", default="startup-profile.folded", help="Flame graph (folded stacks) file"
+    )
+    parser.add_argument("--top", type=int, default=50, help="Rows per report section")
+    parser.add_argument("--no-render", action="store_true", help="Skip the first render")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Per-run timeout (s)")
+    parser.add_argument("--json", action="store_true", help="Print the profiled run as JSON")
+    parser.add_argument("--child", metavar="RESULT", help=argparse.SUPPRESS)
+    return parser.parse_args(args)
+
+
+def main(args) -> int:
+    args = parse_args(args)
+
+    if args.child:
+        result = profile_startup(args.app, render=not args.no_render)
+
+        with open(args.child, "w") as f:
+            json.dump(result, f)
+
+        return 0
+
+    runs = []
+
+    for index in range(args.repeat):
+        runs.append(_profile_in_subprocess(args))
+        logger.info("Run %d: cold start %.3fs.", index + 1, runs[-1]["cold_start"])
+
+    # Report the run closest to the median, not an outlier
+    median = statistics.median(run["cold_start"] for run in runs)
+    result = min(runs, key=lambda run: abs(run["cold_start"] - median))
+    report = format_report(result, runs, args.budget, args.top)
+
+    with open(args.report, "w") as f:
+        f.write(report + "\n")
+
+    with open(args.flamegraph, "w") as f:
+        f.write("\n".join(folded_stacks(result)) + "\n")
+
+    print(json.dumps(result, indent=2) if args.json else report)
+    logger.info("Wrote %s and %s.", args.report, args.flamegraph)
+
+    failed = [run for run in runs if run["errors"]]
+
+    if failed:
+        logger.error(
+            "%d of %d run(s) had errors: %s", len(failed), len(runs), "; ".join(failed[0]["errors"])
+        )
+        return 1
+
+    if args.budget is not None and median > args.budget:
+        logger.error("Cold start of %.3fs exceeds the budget of %.3fs.", median, args.budget)
+        return 1
+
+    return 0
+
+
+def run():
+    sys.exit(main(sys.argv[1:]))
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,5 @@
+"""
+The catalog of data stories shown on the data stories page
+(`pages/data_stories`), kept out of `pages` so that autorouting does not
+turn these modules into routes.
+"""
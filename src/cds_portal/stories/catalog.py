@@ -0,0 +1,129 @@
+"""
+Catalog of the data stories, loaded from `stories.json` once per process.
+
+Stories are indexed when the catalog is loaded: by tag, and by the words of
+their name, description and tags. Each index maps a tag or word to the
+stories that have it as a bitmask (bit i set for the i-th story), so a
+query is a handful of integer ANDs and ORs rather than a scan of every
+story. Words are matched by prefix, so results narrow as a visitor types.
+"""
+
+import bisect
+import dataclasses
+import json
+import operator
+import re
+import unicodedata
+from functools import lru_cache, reduce
+from pathlib import Path
+
+import markdown
+
+STORIES_JSON = Path(__file__).with_name("stories.json")
+
+_WORD = re.compile(r"\w+")
+
+# The target of a Markdown link, e.g. "(https://...)" in "[guide](https://...)"
+_LINK_TARGET = re.compile(r"\]\([^)]*\)")
+
+
+def tokenize(text: str) -> list:
+    """Returns the words of `text`, lower-cased and without accents."""
+    text = unicodedata.normalize("NFKD", text.casefold())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+
+    return _WORD.findall(text)
+
+
+@dataclasses.dataclass(frozen=True)
+class Story:
+    name: str
+    description: str  # Markdown
+    description_html: str
+    image_filename: str
+    url: str
+    tags: tuple = ()
+
+    @classmethod
+    def from_dict(cls, entry: dict) -> "Story":
+        return cls(
+            name=entry["name"],
+            description=entry["description"],
+            # Converted once here rather than on every render of its card
+            description_html=markdown.markdown(entry["description"]),
+            image_filename=entry["image_filename"],
+            url=entry["url"],
+            tags=tuple(entry.get("tags", ())),
+        )
+
+
+def _indices(mask: int):
+    while mask:
+        lowest = mask & -mask
+        yield lowest.bit_length() - 1
+        mask ^= lowest
+
+
+class Catalog:
+    def __init__(self, stories):
+        self.stories = tuple(stories)
+        self.tags = tuple(sorted({tag for story in self.stories for tag in story.tags}))
+        self._all = (1 << len(self.stories)) - 1
+        self._by_tag = {}
+        self._by_word = {}
+
+        for index, story in enumerate(self.stories):
+            bit = 1 << index
+
+            for tag in story.tags:
+                self._by_tag[tag] = self._by_tag.get(tag, 0) | bit
+
+            text = " ".join([story.name, _LINK_TARGET.sub("]", story.description), *story.tags])
+
+            for word in tokenize(text):
+                self._by_word[word] = self._by_word.get(word, 0) | bit
+
+        self._words = sorted(self._by_word)
+
+    def _prefix_mask(self, prefix: str) -> int:
+        """Returns the stories with a word that starts with `prefix`."""
+        mask = 0
+
+        for index in range(bisect.bisect_left(self._words, prefix), len(self._words)):
+            word = self._words[index]
+
+            if not word.startswith(prefix):
+                break
+
+            mask |= self._by_word[word]
+
+        return mask
+
+    def search(self, text: str = "", tags=(), match_all: bool = False) -> list:
+        """
+        Returns the stories, in catalog order, that have any of `tags` (all
+        of them with `match_all`) and, for every word of `text`, a word in
+        their name, description or tags that starts with it. Empty `tags` or
+        `text` match every story.
+        """
+        mask = self._all
+
+        if tags:
+            masks = (self._by_tag.get(tag, 0) for tag in tags)
+            mask &= reduce(operator.and_ if match_all else operator.or_, masks)
+
+        for word in tokenize(text):
+            if not mask:
+                break
+
+            mask &= self._prefix_mask(word)
+
+        return [self.stories[index] for index in _indices(mask)]
+
+
+@lru_cache(maxsize=None)
+def load_catalog(path: Path = STORIES_JSON) -> Catalog:
+    with open(path, encoding="utf-8") as f:
+        entries = json.load(f)
+
+    return Catalog(Story.from_dict(entry) for entry in entries)
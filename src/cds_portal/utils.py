@@ -1,9 +1,16 @@
+import inspect
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Any, Callable, Optional
 
 
 IMG_PATH = Path("static") / "public" / "images"
 
 import solara
+
+from . import call_tracking
+
+
 def use_router_search_params():
     router = solara.use_router()
     def get_param(param):
@@ -12,4 +19,61 @@ def use_router_search_params():
         search_params = router.search.split("&")
         if len(search_params) > 0:
             return {get_param(param)[0]: get_param(param)[1] for param in search_params}
-    return {}
\ No newline at end of file
+    return {}
+
+
+_NO_RESULT = object()
+
+
+@dataclass(frozen=True)
+class ApiResource:
+    data: Any
+    loading: bool
+    error: Optional[Exception]
+    refresh: Callable[[], None]
+
+
+def use_api_resource(fetch: Callable, dependencies: list = None, initial: Any = None) -> ApiResource:
+    """
+    Runs `fetch` (a function or coroutine function that calls the API) in the
+    background so that rendering never waits on the network, re-running it
+    whenever `dependencies` change.
+
+    Plain functions run on a worker thread; coroutine functions run as
+    asyncio tasks on the session's event loop. A run that is superseded by a
+    dependency change, or that is still going when the component unmounts, is
+    cancelled.
+
+    Returns an `ApiResource` whose `data` is `initial` until the first run
+    has finished, and the result of the last successful run after that, also
+    while a newer run is in progress or if it failed.
+    """
+    if dependencies is None:
+        dependencies = []
+
+    task = solara.lab.use_task(
+        call_tracking.tracked("task", fetch),
+        dependencies=dependencies,
+        raise_error=False,
+        prefer_threaded=not inspect.iscoroutinefunction(fetch),
+    )
+    last_result = solara.use_ref(_NO_RESULT)
+
+    if task.finished:
+        last_result.current = task.value
+
+    def _cancel_on_unmount():
+        def cleanup():
+            if task.pending:
+                task.cancel()
+
+        return cleanup
+
+    solara.use_effect(_cancel_on_unmount, [])
+
+    return ApiResource(
+        data=initial if last_result.current is _NO_RESULT else last_result.current,
+        loading=task.pending,
+        error=task.exception if task.error else None,
+        refresh=task,
+    )
@@ -0,0 +1,112 @@
+"""
+Sending widgets to a browser outside of the usual flow, where each widget
+announces itself with a `comm_open` message as it is created. Used to show
+a browser widgets rendered before it connected (`cds_portal.session_pool`)
+or in another session (`cds_portal.render_cache`).
+"""
+
+import contextlib
+
+_MODEL_PREFIX = "IPY_MODEL_"
+
+# Solara versions whose server internals (`app.solara_comm_target`,
+# `server.app_loop`, `kernel_context`) the render cache and the session pool
+# replace or rely on; both stay off on any other version.
+SUPPORTED_SOLARA_VERSIONS = ("1.44.1",)
+
+
+def solara_supported() -> bool:
+    """Returns whether the installed Solara is in `SUPPORTED_SOLARA_VERSIONS`."""
+    import solara
+
+    return solara.__version__ in SUPPORTED_SOLARA_VERSIONS
+
+
+def references(value):
+    """Yields the ids of the widgets referenced in a serialized widget state."""
+    if isinstance(value, str):
+        if value.startswith(_MODEL_PREFIX):
+            yield value[len(_MODEL_PREFIX):]
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from references(item)
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from references(item)
+
+
+def serialize(widgets: dict) -> dict:
+    """
+    Returns the state of each open widget of `widgets` (model id -> widget)
+    as `(state, buffer_paths, buffers)`, the parts of its `comm_open`.
+    """
+    from ipywidgets.widgets.widget import _remove_buffers
+
+    return {
+        model_id: _remove_buffers(widget.get_state())
+        for model_id, widget in list(widgets.items())
+        if widget.comm is not None
+    }
+
+
+def dependency_order(states: dict) -> list:
+    """
+    Returns the model ids of `states` ordered so that every widget comes
+    after the widgets its state references. The browser creates models in
+    the order their `comm_open` arrives, and a reference to one it has not
+    created yet fails.
+    """
+    ordered = []
+    seen = set()
+
+    def visit(model_id):
+        seen.add(model_id)
+
+        for reference in references(states[model_id][0]):
+            if reference in states and reference not in seen:
+                visit(reference)
+
+        ordered.append(model_id)
+
+    for model_id in states:
+        if model_id not in seen:
+            visit(model_id)
+
+    return ordered
+
+
+def send_open(kernel, model_id: str, state: dict, buffer_paths: list, buffers: list):
+    """Sends the `comm_open` that `Widget.open` sends for a new widget."""
+    from ipywidgets.widgets.widget import __protocol_version__
+
+    kernel.session.send(
+        kernel.iopub_socket,
+        "comm_open",
+        {
+            "data": {"state": state, "buffer_paths": buffer_paths},
+            "comm_id": model_id,
+            "target_name": "jupyter.widget",
+            "target_module": None,
+        },
+        metadata={"version": __protocol_version__},
+        parent=kernel.get_parent("shell"),
+        buffers=buffers,
+    )
+
+
+def open_all(kernel, states: dict):
+    """Sends the widgets of `states` (see `serialize`) in dependency order."""
+    for model_id in dependency_order(states):
+        send_open(kernel, model_id, *states[model_id])
+
+
+@contextlib.contextmanager
+def muted(kernel):
+    """Drops the messages `kernel` sends to the browser inside the block."""
+    websockets = set(kernel.session.websockets)
+    kernel.session.websockets.clear()
+
+    try:
+        yield
+    finally:
+        kernel.session.websockets.update(websockets)
@@ -7,4 +7,26 @@
     - https://docs.pytest.org/en/stable/writing_plugins.html
 """
 
-# import pytest
+import socket
+
+import pytest
+
+
+@pytest.fixture
+def free_port() -> int:
+    """A local TCP port nothing is listening on, for a test server."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture(autouse=True)
+def solar_cache_dir(tmp_path_factory, monkeypatch):
+    """Keeps the parsed solar data caches out of the source tree."""
+    from cds_portal.solar import data
+
+    cache_dir = tmp_path_factory.getbasetemp() / "solar-cache"
+    cache_dir.mkdir(exist_ok=True)
+    monkeypatch.setattr(data, "CACHE_DIR", cache_dir)
+
+    return cache_dir
@@ -0,0 +1,278 @@
+import threading
+import time
+
+import pytest
+
+from cds_portal.cache import SingleFlight, StaleWhileRevalidateCache, TTLCache
+
+
+def test_ttl_cache_get_and_set():
+    cache = TTLCache(ttl=60)
+
+    assert cache.get("key") is None
+    assert cache.get("key", default="default") == "default"
+
+    cache.set("key", "value")
+
+    assert cache.get("key") == "value"
+    assert "key" in cache
+    assert len(cache) == 1
+
+
+def test_ttl_cache_tells_cached_none_from_a_miss():
+    cache = TTLCache(ttl=60)
+    missing = object()
+    cache.set("key", None)
+
+    assert cache.get("key", default=missing) is None
+    assert cache.get("other", default=missing) is missing
+    assert "key" in cache
+
+
+def test_ttl_cache_entries_expire(monkeypatch):
+    now = 1000.0
+    monkeypatch.setattr(time, "monotonic", lambda: now)
+    cache = TTLCache(ttl=10)
+    cache.set("key", "value")
+    cache.set("longer", "value", ttl=30)
+
+    now += 11
+
+    assert cache.get("key") is None
+    assert cache.get("longer") == "value"
+    assert "key" not in cache
+
+
+def test_ttl_cache_pop_and_clear():
+    cache = TTLCache(ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+
+    assert cache.pop("a") == 1
+    assert cache.pop("a", default="gone") == "gone"
+
+    cache.clear()
+
+    assert len(cache) == 0
+
+
+def test_ttl_cache_evicts_expired_then_oldest(monkeypatch):
+    now = 1000.0
+    monkeypatch.setattr(time, "monotonic", lambda: now)
+    cache = TTLCache(ttl=60, maxsize=3)
+    cache.set("short", 1, ttl=1)
+    cache.set("old", 2)
+    cache.set("new", 3)
+
+    now += 2
+    cache.set("newer", 4)
+
+    # The expired entry made room
+    assert cache.get("old") == 2
+    assert cache.get("short") is None
+
+    cache.set("newest", 5)
+
+    # Nothing had expired, so the oldest insertion went
+    assert cache.get("old") is None
+    assert [cache.get(key) for key in ("new", "newer", "newest")] == [3, 4, 5]
+    assert len(cache) == 3
+
+
+def test_ttl_cache_stats():
+    cache = TTLCache(ttl=60)
+    cache.set("key", "value")
+    cache.get("key")
+    cache.get("key")
+    cache.get("other")
+
+    assert cache.stats() == {"hits": 2, "misses": 1, "size": 1}
+
+
+def _run_concurrently(flight: SingleFlight, key, fn, followers: int) -> list:
+    """
+    Calls `flight.do(key, fn)` from a leader thread and, while it is still
+    running, from `followers` more, returning each call's result or error.
+    """
+    started = threading.Event()
+    release = threading.Event()
+    results = [None] * (followers + 1)
+
+    def leader_fn():
+        started.set()
+        release.wait(5)
+        return fn()
+
+    def call(index, function):
+        try:
+            results[index] = flight.do(key, function)
+        except Exception as e:
+            results[index] = e
+
+    threads = [threading.Thread(target=call, args=(0, leader_fn))]
+    threads[0].start()
+    started.wait(5)
+
+    for index in range(1, followers + 1):
+        threads.append(threading.Thread(target=call, args=(index, fn)))
+        threads[-1].start()
+
+    deadline = time.monotonic() + 5
+
+    while flight.stats()["coalesced"] < followers and time.monotonic() < deadline:
+        time.sleep(0.001)
+
+    release.set()
+
+    for thread in threads:
+        thread.join(5)
+
+    return results
+
+
+def test_single_flight_shares_one_execution():
+    flight = SingleFlight()
+    executions = []
+
+    def fn():
+        executions.append(1)
+        return object()
+
+    results = _run_concurrently(flight, "key", fn, followers=4)
+
+    assert len(executions) == 1
+    assert all(result is results[0] for result in results)
+    assert flight.stats() == {"calls": 5, "coalesced": 4, "in_flight": 0}
+
+
+def test_single_flight_shares_errors():
+    flight = SingleFlight()
+
+    def fn():
+        raise ValueError("upstream failed")
+
+    results = _run_concurrently(flight, "key", fn, followers=2)
+
+    assert all(isinstance(result, ValueError) for result in results)
+
+    # The failure is not remembered
+    assert flight.do("key", lambda: "recovered") == "recovered"
+
+
+def test_single_flight_runs_again_once_done():
+    flight = SingleFlight()
+
+    assert flight.do("key", lambda: 1) == 1
+    assert flight.do("key", lambda: 2) == 2
+    assert flight.do("other", lambda: 3) == 3
+    assert flight.stats() == {"calls": 3, "coalesced": 0, "in_flight": 0}
+
+
+def test_single_flight_leader_error_is_raised():
+    flight = SingleFlight()
+
+    with pytest.raises(KeyError):
+        flight.do("key", lambda: {}["missing"])
+
+    assert flight.stats()["in_flight"] == 0
+
+
+class ManualExecutor:
+    """Holds submitted refreshes until the test runs them."""
+
+    def __init__(self):
+        self.pending = []
+
+    def submit(self, fn, *args):
+        self.pending.append((fn, args))
+
+    def run_pending(self):
+        pending, self.pending = self.pending, []
+
+        for fn, args in pending:
+            fn(*args)
+
+
+class Counter:
+    def __init__(self, *values):
+        self.values = list(values)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.values.pop(0)
+
+
+def test_swr_cache_fetches_on_miss_only(monkeypatch):
+    now = 1000.0
+    monkeypatch.setattr(time, "monotonic", lambda: now)
+    cache = StaleWhileRevalidateCache(max_age=15, executor=ManualExecutor())
+    fetch = Counter("first")
+
+    assert cache.get("key", fetch) == "first"
+    assert cache.get("key", fetch) == "first"
+    assert fetch.calls == 1
+    assert cache.get("other", fetch, block=False) is None
+
+
+def test_swr_cache_serves_stale_while_refreshing(monkeypatch):
+    now = 1000.0
+    monkeypatch.setattr(time, "monotonic", lambda: now)
+    executor = ManualExecutor()
+    cache = StaleWhileRevalidateCache(max_age=15, executor=executor)
+    fetch = Counter("old", "new")
+    cache.get("key", fetch)
+
+    now += 16
+
+    # Stale values are still served, with a single refresh started
+    assert cache.get("key", fetch) == "old"
+    assert cache.get("key", fetch) == "old"
+    assert len(executor.pending) == 1
+
+    executor.run_pending()
+
+    assert cache.get("key", fetch) == "new"
+    assert fetch.calls == 2
+
+
+def test_swr_cache_discards_refreshes_overtaken_by_invalidation(monkeypatch):
+    now = 1000.0
+    monkeypatch.setattr(time, "monotonic", lambda: now)
+    executor = ManualExecutor()
+    cache = StaleWhileRevalidateCache(max_age=15, executor=executor)
+    cache.set("key", "old")
+
+    now += 16
+    cache.get("key", Counter("refreshed before the write"))
+    cache.invalidate("key")
+    executor.run_pending()
+
+    assert cache.get("key", Counter("after the write")) == "after the write"
+
+
+def test_swr_cache_keeps_the_value_when_a_refresh_fails(monkeypatch):
+    now = 1000.0
+    monkeypatch.setattr(time, "monotonic", lambda: now)
+    executor = ManualExecutor()
+    logged = []
+
+    class Logger:
+        def exception(self, *args):
+            logged.append(args)
+
+    cache = StaleWhileRevalidateCache(max_age=15, executor=executor, logger=Logger())
+    cache.set("key", "old")
+
+    def fail():
+        raise ConnectionError("unreachable")
+
+    now += 16
+    cache.get("key", fail)
+    executor.run_pending()
+
+    assert len(logged) == 1
+    # and tries again on the next read
+    assert cache.get("key", Counter("new")) == "old"
+    executor.run_pending()
+    assert cache.get("key", fail) == "new"
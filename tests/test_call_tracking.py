@@ -0,0 +1,162 @@
+import asyncio
+import logging
+
+import ipywidgets
+import pytest
+import solara
+
+from cds_portal import call_tracking
+
+
+@pytest.fixture
+def enabled(monkeypatch):
+    monkeypatch.setattr(call_tracking, "ENABLED", True)
+    monkeypatch.setattr(call_tracking, "CALL_BUDGET", 2)
+
+
+@pytest.fixture
+def handle_msg(monkeypatch):
+    """Restores `Widget._handle_msg` after `install` patched it."""
+    monkeypatch.setattr(ipywidgets.Widget, "_handle_msg", ipywidgets.Widget._handle_msg)
+    monkeypatch.setattr(call_tracking, "_installed", False)
+
+    return ipywidgets.Widget._handle_msg
+
+
+def test_calls_are_recorded_in_the_innermost_scope(enabled):
+    with call_tracking.scope("task", "outer") as outer:
+        call_tracking.record("GET", "/classes/{class_id}")
+
+        with call_tracking.scope("task", "inner") as inner:
+            assert call_tracking.current_scope() is inner
+            call_tracking.record("GET", "/classes/roster/{class_id}")
+
+        assert call_tracking.current_scope() is outer
+        call_tracking.record("GET", "/classes/{class_id}")
+
+    assert call_tracking.current_scope() is None
+    assert outer.calls == {"GET /classes/{class_id}": 2}
+    assert inner.calls == {"GET /classes/roster/{class_id}": 1}
+
+
+def test_calls_outside_of_any_scope_are_not_recorded(enabled):
+    call_tracking.record("GET", "/classes/{class_id}")
+
+    assert call_tracking.current_scope() is None
+
+
+def test_exceeded_budgets_are_logged_and_counted_once(enabled, caplog):
+    exceeded = call_tracking.BUDGET_EXCEEDED.value("task", "loop")
+    caplog.set_level(logging.WARNING, logger=call_tracking.logger.name)
+
+    with call_tracking.scope("task", "loop") as loop:
+        for _ in range(4):
+            call_tracking.record("GET", "/classes/roster/{class_id}")
+
+    assert loop.exceeded
+    assert call_tracking.BUDGET_EXCEEDED.value("task", "loop") == exceeded + 1
+    (record,) = [r for r in caplog.records if r.name == call_tracking.logger.name]
+    assert "task loop exceeded its budget of 2 API calls" in record.getMessage()
+    assert "GET /classes/roster/{class_id} x3" in record.getMessage()
+
+
+def test_worker_threads_record_in_the_submitting_scope(enabled):
+    executor = call_tracking.ScopedThreadPoolExecutor(max_workers=2)
+
+    def call(endpoint):
+        call_tracking.record("GET", endpoint)
+        return call_tracking.current_scope()
+
+    try:
+        with call_tracking.scope("task", "fan out") as fan_out:
+            scopes = list(executor.map(call, ["/a", "/b", "/a"]))
+
+        # Work submitted outside of any scope stays outside
+        assert executor.submit(call, "/c").result() is None
+    finally:
+        executor.shutdown()
+
+    assert scopes == [fan_out] * 3
+    assert fan_out.calls == {"GET /a": 2, "GET /b": 1}
+
+
+def test_tracked_functions_run_in_a_scope_of_their_own(enabled):
+    def fetch():
+        call_tracking.record("GET", "/a")
+        return call_tracking.current_scope()
+
+    async def fetch_async():
+        return fetch()
+
+    scope = call_tracking.tracked("task", fetch)()
+    async_scope = asyncio.run(call_tracking.tracked("task", fetch_async)())
+
+    assert (scope.kind, scope.name) == ("task", f"{__name__}.{fetch.__qualname__}")
+    assert async_scope.name == f"{__name__}.{fetch_async.__qualname__}"
+    assert scope.calls == async_scope.calls == {"GET /a": 1}
+
+
+def test_renders_record_in_the_component_scope(enabled):
+    scopes = []
+
+    @solara.component
+    def Child():
+        call_tracking.record("GET", "/child")
+        scopes.append(call_tracking.current_scope())
+
+    @solara.component
+    def Parent():
+        call_tracking.record("GET", "/parent")
+        scopes.append(call_tracking.current_scope())
+        Child()
+
+    with call_tracking.scope("task", "outside") as outside:
+        box, rc = solara.render(Parent(), handle_error=False)
+        rc.close()
+
+    parent, child = scopes
+    assert parent.kind == child.kind == "render"
+    assert parent.name.endswith("Parent") and child.name.endswith("Child")
+    assert parent.calls == {"GET /parent": 1}
+    assert child.calls == {"GET /child": 1}
+    assert not outside.calls
+
+
+def test_widget_events_record_in_an_event_scope(enabled, handle_msg):
+    scopes = []
+    button = ipywidgets.Button()
+    button.on_click(lambda button: scopes.append(call_tracking.current_scope()))
+
+    call_tracking.install()
+
+    assert ipywidgets.Widget._handle_msg is not handle_msg
+
+    button._handle_msg(
+        {
+            "content": {"data": {"method": "custom", "content": {"event": "click"}}},
+            "buffers": [],
+        }
+    )
+
+    (event,) = scopes
+    assert (event.kind, event.name) == ("event", "Button click")
+    assert call_tracking.current_scope() is None
+
+
+def test_disabled_tracking_changes_nothing(handle_msg, monkeypatch):
+    monkeypatch.setattr(call_tracking, "ENABLED", False)
+
+    call_tracking.install()
+
+    assert ipywidgets.Widget._handle_msg is handle_msg
+
+    def fetch():
+        return call_tracking.current_scope()
+
+    assert call_tracking.tracked("task", fetch) is fetch
+
+    with call_tracking.scope("task", "ignored") as scope:
+        call_tracking.record("GET", "/a")
+
+        assert scope is None
+        assert fetch() is None
@@ -0,0 +1,101 @@
+import base64
+import json
+import math
+
+import pytest
+
+from cds_portal import loadtest
+
+
+def test_percentile_is_nearest_rank():
+    values = [0.5, 0.1, 0.4, 0.2, 0.3]
+
+    assert loadtest._percentile(values, 50) == 0.3
+    assert loadtest._percentile(values, 95) == 0.5
+    assert loadtest._percentile(values, 100) == 0.5
+    assert loadtest._percentile(values, 1) == 0.1
+    assert loadtest._percentile([0.7], 99) == 0.7
+    assert math.isnan(loadtest._percentile([], 50))
+
+
+MESSAGE = {
+    "header": {"msg_type": "comm_msg"},
+    "content": {"comm_id": "comm", "data": {"method": "update", "state": {}}},
+}
+
+
+def test_decode_text_frames():
+    assert loadtest._decode(json.dumps(MESSAGE)) == MESSAGE
+
+
+@pytest.mark.parametrize("buffers", [[], [b"\x00\x01"], [b"\x00\x01", b"\x02" * 7]])
+def test_decode_binary_frames(buffers):
+    kernel = pytest.importorskip("solara.server.kernel")
+    frame = kernel.serialize_binary_message({**MESSAGE, "buffers": buffers})
+
+    assert loadtest._decode(frame) == MESSAGE
+
+
+def test_login_cookie_is_a_signed_session():
+    itsdangerous = pytest.importorskip("itsdangerous")
+    userinfo = {"cds/email": "educator@example.org", "cds/name": "Educator"}
+
+    cookie = loadtest.login_cookie("secret", "client", userinfo)
+
+    # As `starlette.middleware.sessions.SessionMiddleware` reads it
+    data = itsdangerous.TimestampSigner("secret").unsign(cookie.encode(), max_age=60)
+    session = json.loads(base64.b64decode(data))
+
+    assert session["client_id"] == "client"
+    assert json.loads(session["user"]) == userinfo
+    assert json.loads(session["token"]) == {}
+
+    with pytest.raises(itsdangerous.BadSignature):
+        itsdangerous.TimestampSigner("other").unsign(cookie.encode())
+
+
+def test_format_report():
+    results = loadtest.Results(sessions=3, duration=12.34)
+    results.upstream = {
+        "requests": 30,
+        "per_session": 10.0,
+        "endpoints": {
+            "GET /educators/{key}": 3,
+            "GET /classes/roster/{class_id:int}": 27,
+        },
+    }
+    results.rss = [100 * 2**20, 300 * 2**20, 200 * 2**20]
+
+    for latency in (0.1, 0.2, 0.3):
+        results.record("login", latency)
+
+    results.record("manage_classes", 1.5)
+    results.fail("manage_classes", TimeoutError("The session did not settle"))
+    results.fail("connect", ConnectionError("refused"))
+
+    assert loadtest.format_report(results.summary()).splitlines() == [
+        "3 sessions in 12.3s",
+        "",
+        "step                   n    p50 ms    p95 ms    p99 ms    max ms  errors",
+        "connect                0         0         0         0         0       1",
+        "login                  3       200       300       300       300       0",
+        "manage_classes         1      1500      1500      1500      1500       1",
+        "",
+        "upstream requests: 30 (10.0 per session)",
+        "      27  GET /classes/roster/{class_id:int}",
+        "       3  GET /educators/{key}",
+        "",
+        "portal RSS: start 100 MiB, peak 300 MiB, end 200 MiB",
+    ]
+
+
+def test_format_report_leaves_out_what_was_not_measured():
+    results = loadtest.Results(sessions=1, duration=1)
+    results.record("login", 0.05)
+
+    assert loadtest.format_report(results.summary()).splitlines() == [
+        "1 sessions in 1.0s",
+        "",
+        "step                   n    p50 ms    p95 ms    p99 ms    max ms  errors",
+        "login                  1        50        50        50        50       0",
+    ]
@@ -0,0 +1,174 @@
+import json
+import logging
+import sys
+import time
+import types
+
+import pytest
+
+from cds_portal import logger as cds_logger
+
+
+def _record(level=logging.INFO, msg="Loaded %d classes", args=(3,), exc_info=None):
+    return logging.LogRecord(
+        "API", level, __file__, 1, msg, args, exc_info, func="load"
+    )
+
+
+def _exc_info():
+    try:
+        raise ValueError("bad roster")
+    except ValueError:
+        return sys.exc_info()
+
+
+def test_json_formatter_writes_one_object_per_record():
+    record = _record()
+    record.session_id = "session"
+    record.kernel_id = None
+
+    entry = json.loads(cds_logger.JsonFormatter().format(record))
+
+    assert entry == {
+        "time": entry["time"],
+        "level": "INFO",
+        "logger": "API",
+        "message": "Loaded 3 classes",
+        "thread": record.threadName,
+        "session_id": "session",
+    }
+    assert entry["time"].endswith("+00:00")
+
+
+def test_queued_records_keep_their_traceback_in_a_field():
+    record = _record(logging.ERROR, "Failed to load %s", ("rosters",), _exc_info())
+
+    prepared = cds_logger._QueueHandler(None).prepare(record)
+    entry = json.loads(cds_logger.JsonFormatter().format(prepared))
+
+    assert prepared.args is None and prepared.exc_info is None
+    assert entry["message"] == "Failed to load rosters"
+    assert entry["exception"].startswith("Traceback")
+    assert entry["exception"].endswith("ValueError: bad roster")
+    # The original record is left alone for other handlers
+    assert record.exc_info is not None
+
+
+def _in_session(monkeypatch):
+    """Makes a stand-in for a Solara kernel context the current one."""
+    pytest.importorskip("solara")
+    from solara.server import kernel_context
+
+    context = types.SimpleNamespace(
+        session_id="session",
+        id="kernel",
+        kernel=types.SimpleNamespace(
+            get_parent=lambda channel: {"header": {"msg_id": f"{channel}-message"}}
+        ),
+    )
+    monkeypatch.setattr(kernel_context, "has_current_context", lambda: True)
+    monkeypatch.setattr(kernel_context, "get_current_context", lambda: context)
+
+
+def test_records_are_tagged_with_their_session_and_message(monkeypatch):
+    _in_session(monkeypatch)
+    record = _record()
+
+    assert cds_logger.CorrelationFilter().filter(record)
+    assert record.session_id == "session"
+    assert record.kernel_id == "kernel"
+    assert record.request_id == "shell-message"
+
+
+def test_records_outside_of_a_session_are_not_tagged():
+    record = _record()
+
+    assert cds_logger.CorrelationFilter().filter(record)
+    assert not hasattr(record, "session_id")
+
+
+def test_debug_records_are_sampled(monkeypatch):
+    monkeypatch.setattr(cds_logger.random, "random", lambda: 0.4)
+
+    assert not cds_logger.DebugSampler(0.25).filter(_record(logging.DEBUG))
+    assert cds_logger.DebugSampler(0.5).filter(_record(logging.DEBUG))
+    # Other levels are always kept
+    assert cds_logger.DebugSampler(0).filter(_record(logging.INFO))
+
+
+@pytest.fixture
+def fresh_logger():
+    names = []
+
+    def fresh_logger(name):
+        names.append(f"test-{name}")
+        # `setup_logger` adds no handler to a logger whose records already
+        # reach one, such as pytest's on the root logger
+        logging.getLogger(names[-1]).propagate = False
+
+        return names[-1]
+
+    yield fresh_logger
+
+    for name in names:
+        logging.getLogger(name).handlers.clear()
+        logging.getLogger(name).propagate = True
+
+
+def test_log_level_override(fresh_logger, monkeypatch):
+    monkeypatch.setattr(cds_logger, "LOG_LEVEL", "warning")
+
+    logger = cds_logger.setup_logger(fresh_logger("override"), logging.DEBUG)
+
+    assert logger.level == logging.WARNING
+    assert logger.handlers[0].level == logging.WARNING
+
+    monkeypatch.setattr(cds_logger, "LOG_LEVEL", None)
+
+    logger = cds_logger.setup_logger(fresh_logger("default"), logging.INFO)
+
+    assert logger.level == logging.INFO
+
+
+def test_json_mode_logs_from_a_background_thread(fresh_logger, monkeypatch, capsys):
+    listeners = []
+    monkeypatch.setattr(cds_logger, "LOG_FORMAT", "json")
+    monkeypatch.setattr(cds_logger, "DEBUG_SAMPLE_RATE", 0)
+    monkeypatch.setattr(cds_logger, "_queue_handler", None)
+    monkeypatch.setattr(
+        cds_logger.atexit, "register", lambda stop: listeners.append(stop)
+    )
+
+    logger = cds_logger.setup_logger(fresh_logger("json"))
+    other = cds_logger.setup_logger(fresh_logger("json-other"))
+    # Only now, as Solara runs the threads started in a session in its context
+    _in_session(monkeypatch)
+
+    try:
+        assert logger.handlers == other.handlers == [cds_logger._queue_handler]
+
+        logger.debug("Sampled out")
+        logger.info("Loaded %d classes", 3)
+        other.warning("Slow request")
+
+        deadline = time.monotonic() + 5
+        lines = []
+
+        while len(lines) < 2:
+            assert time.monotonic() < deadline, "Nothing was logged"
+            lines += capsys.readouterr().err.splitlines()
+            time.sleep(0.01)
+    finally:
+        for stop in listeners:
+            stop()
+
+    lines += capsys.readouterr().err.splitlines()
+    entries = [json.loads(line) for line in lines]
+
+    assert [entry["message"] for entry in entries] == [
+        "Loaded 3 classes",
+        "Slow request",
+    ]
+    assert [entry["level"] for entry in entries] == ["INFO", "WARNING"]
+    assert {entry["request_id"] for entry in entries} == {"shell-message"}
+    assert {entry["thread"] for entry in entries} == {"MainThread"}
@@ -0,0 +1,107 @@
+import pytest
+from starlette.requests import Request
+
+from cds_portal import metrics
+
+
+@pytest.fixture
+def registry():
+    registry = metrics.Registry()
+    requests = registry.register(
+        metrics.Counter("test_requests_total", "Requests.", ("endpoint", "status"))
+    )
+    duration = registry.register(
+        metrics.Histogram(
+            "test_duration_seconds", "Durations.", ("endpoint",), buckets=(0.1, 1)
+        )
+    )
+    registry.add_collector(
+        lambda: metrics.samples("test_state", "State.", "gauge", {"open": 1}, "state")
+    )
+
+    requests.inc("/classes/{class_id}", "200")
+    requests.inc("/classes/{class_id}", "200")
+    requests.inc('/odd "path"\\', "error")
+    duration.observe(0.05, "/classes/{class_id}")
+    duration.observe(0.5, "/classes/{class_id}")
+    duration.observe(0.1, "/classes/{class_id}")
+    duration.observe(3, "/classes/{class_id}")
+
+    return registry
+
+
+def test_render_text_format(registry):
+    assert registry.render() == "\n".join(
+        [
+            "# HELP test_requests_total Requests.",
+            "# TYPE test_requests_total counter",
+            'test_requests_total{endpoint="/classes/{class_id}",status="200"} 2',
+            'test_requests_total{endpoint="/odd \\"path\\"\\\\",status="error"} 1',
+            "# HELP test_duration_seconds Durations.",
+            "# TYPE test_duration_seconds histogram",
+            'test_duration_seconds_bucket{endpoint="/classes/{class_id}",le="0.1"} 2',
+            'test_duration_seconds_bucket{endpoint="/classes/{class_id}",le="1"} 3',
+            'test_duration_seconds_bucket{endpoint="/classes/{class_id}",le="+Inf"} 4',
+            'test_duration_seconds_count{endpoint="/classes/{class_id}"} 4',
+            'test_duration_seconds_sum{endpoint="/classes/{class_id}"} 3.65',
+            "# HELP test_state State.",
+            "# TYPE test_state gauge",
+            'test_state{state="open"} 1',
+            "",
+        ]
+    )
+
+
+def test_samples_without_labels():
+    assert metrics.samples("test_total", "Things.", "counter", {None: 1.5}) == [
+        "# HELP test_total Things.",
+        "# TYPE test_total counter",
+        "test_total 1.5",
+    ]
+
+
+def test_histogram_count(registry):
+    histogram = metrics.Histogram("test", "Test.", ("endpoint",), (1,))
+    histogram.observe(0.5, "a")
+    histogram.observe(5, "a")
+
+    assert histogram.count("a") == 2
+    assert histogram.count("b") == 0
+
+
+@pytest.fixture
+def asgi(registry, monkeypatch):
+    asgi = pytest.importorskip("cds_portal.asgi")
+    monkeypatch.setattr(metrics, "REGISTRY", registry)
+
+    return asgi
+
+
+def _get(asgi, authorization: str = None):
+    headers = [(b"authorization", authorization.encode())] if authorization else []
+
+    scope = {"type": "http", "method": "GET", "path": "/metrics", "headers": headers}
+
+    return asgi.metrics_endpoint(Request(scope))
+
+
+def test_metrics_endpoint(asgi, registry, monkeypatch):
+    monkeypatch.setattr(asgi, "METRICS_TOKEN", None)
+    response = _get(asgi)
+
+    assert response.status_code == 200
+    assert response.media_type == "text/plain; version=0.0.4; charset=utf-8"
+    assert response.body.decode() == registry.render()
+
+
+def test_metrics_endpoint_checks_the_bearer_token(asgi, registry, monkeypatch):
+    monkeypatch.setattr(asgi, "METRICS_TOKEN", "secret")
+
+    assert _get(asgi).status_code == 401
+    assert _get(asgi, "secret").status_code == 401
+    assert _get(asgi, "Bearer wrong").status_code == 401
+
+    response = _get(asgi, "Bearer secret")
+
+    assert response.status_code == 200
+    assert response.body.decode() == registry.render()
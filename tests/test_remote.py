@@ -0,0 +1,442 @@
+"""
+`BaseAPI` against the local mock API server (`cds_portal.mock_api`), counting
+the requests that reach it.
+"""
+
+import asyncio
+import threading
+import time
+
+import httpx
+import pytest
+import requests
+
+uvicorn = pytest.importorskip("uvicorn")
+
+from solara_enterprise import auth  # noqa: E402
+
+from cds_portal import metrics, remote  # noqa: E402
+from cds_portal.mock_api import MockState, create_app  # noqa: E402
+
+EDUCATOR_EMAIL = "educator@example.org"
+
+
+class MockServer:
+    def __init__(self, state: MockState, port: int, **options):
+        self.state = state
+        self.port = port
+        self.url = f"http://127.0.0.1:{self.port}"
+        self._server = uvicorn.Server(
+            uvicorn.Config(
+                create_app(state, **options),
+                host="127.0.0.1",
+                port=self.port,
+                log_level="warning",
+            )
+        )
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+        while not self._server.started:
+            if not self._thread.is_alive():
+                raise RuntimeError("The mock API server failed to start.")
+            time.sleep(0.01)
+
+    def stop(self):
+        self._server.should_exit = True
+        self._thread.join()
+
+    def requests(self, endpoint: str = None) -> int:
+        """Requests served so far, in total or for `endpoint` ("METHOD /route")."""
+        with self.state.lock:
+            if endpoint is None:
+                return self.state.requests
+
+            return self.state.endpoint_requests[endpoint]
+
+
+@pytest.fixture
+def mock_server(request, free_port):
+    # Options of `create_app`, with indirect parametrization
+    options = getattr(request, "param", {})
+    server = MockServer(
+        MockState(educators=1, classes_per_educator=3, students_per_class=5),
+        free_port,
+        **options,
+    )
+    server.start()
+
+    yield server
+
+    server.stop()
+
+
+@pytest.fixture
+def api(mock_server, monkeypatch):
+    monkeypatch.setenv("SOLARA_SESSION_SECRET_KEY", "test-secret")
+    api = remote.BaseAPI()
+    api.API_URL = mock_server.url
+
+    yield api
+
+    api.executor.shutdown()
+
+
+@pytest.fixture
+def async_api(api):
+    async_api = remote.AsyncBaseAPI(api)
+
+    yield async_api
+
+    async_api.close()
+
+
+@pytest.fixture
+def educator():
+    auth.user.set({"userinfo": {"cds/email": EDUCATOR_EMAIL, "cds/name": "Educator"}})
+
+    yield
+
+    auth.user.set(None)
+
+
+def test_profiles_are_cached(api, mock_server, educator):
+    educator_info = api.educator_info
+
+    assert educator_info["username"] == api.hashed_user
+    assert api.student_info is None
+
+    for _ in range(3):
+        assert api.educator_info == educator_info
+        assert api.student_info is None
+
+    # One lookup per role, including the role the user does not have
+    assert mock_server.requests("GET /educators/{key}") == 1
+    assert mock_server.requests("GET /students/{username}") == 1
+    assert api.identity_cache.stats()["hits"] == 6
+
+
+def test_invalidated_profiles_are_fetched_again(api, mock_server, educator):
+    api.educator_info
+    api.invalidate_identity()
+    api.educator_info
+
+    assert mock_server.requests("GET /educators/{key}") == 2
+
+
+def _new_educators(mock_server, count: int) -> list[str]:
+    with mock_server.state.lock:
+        return [
+            str(mock_server.state._new_educator(f"other-educator-{i}")["id"])
+            for i in range(count)
+        ]
+
+
+def test_educators_are_looked_up_in_one_batch(api, mock_server, educator):
+    first, second = _new_educators(mock_server, 2)
+    edu_ids = [first, api.hashed_user, second, first]
+
+    educators = api.load_educators_info(edu_ids)
+
+    assert list(educators) == [first, api.hashed_user, second]
+    assert educators[first]["id"] == int(first)
+    assert educators[second]["id"] == int(second)
+    assert educators[api.hashed_user] == api.educator_info
+    # One request per distinct educator, own profile included
+    assert mock_server.requests("GET /educators/{key}") == 3
+
+    assert api.load_educators_info(edu_ids) == educators
+    assert mock_server.requests("GET /educators/{key}") == 3
+
+
+@pytest.mark.parametrize("mock_server", [{"latency": 200}], indirect=True)
+def test_concurrent_async_educator_lookups_are_coalesced(api, async_api, mock_server):
+    (edu_id,) = _new_educators(mock_server, 1)
+
+    async def main():
+        return await asyncio.gather(
+            *(async_api.load_educator_info(edu_id) for _ in range(3))
+        )
+
+    educators = asyncio.run(main())
+
+    assert [educator["id"] for educator in educators] == [int(edu_id)] * 3
+    assert mock_server.requests("GET /educators/{key}") == 1
+    assert api.profile_flight.stats()["coalesced"] == 2
+
+    # and share the profile cache of `BaseAPI`
+    assert api.load_educator_info(edu_id) == educators[0]
+    assert asyncio.run(async_api.load_educator_info(edu_id)) == educators[0]
+    assert mock_server.requests("GET /educators/{key}") == 1
+
+
+def test_creating_or_deleting_a_class_drops_the_cached_class_list(
+    api, mock_server, educator
+):
+    endpoint = "GET /educator-classes/{educator_id:int}"
+    classes = api.load_educator_classes()["classes"]
+
+    assert api.load_educator_classes()["classes"] == classes
+    assert mock_server.requests(endpoint) == 1
+
+    new_class = api.create_new_class(
+        {
+            "name": "New",
+            "expected_size": 10,
+            "asynchronous": True,
+            "story_name": "hubbles_law",
+        }
+    )["class"]
+
+    assert api.load_educator_classes()["classes"] == [*classes, new_class]
+
+    api.delete_class(new_class["id"])
+
+    assert api.load_educator_classes()["classes"] == classes
+    assert mock_server.requests(endpoint) == 3
+
+
+def test_class_activation_is_fetched_in_bulk(api, mock_server):
+    class_ids = list(mock_server.state.classes)
+    expected = {
+        class_id: mock_server.state.active[(class_id, "hubbles_law")] for class_id in class_ids
+    }
+
+    assert api.get_classes_active(class_ids, "hubbles_law") == expected
+    assert mock_server.requests("GET /classes/active/{story_name}") == 1
+    assert mock_server.requests() == 1
+
+    # Answered from the cache
+    assert api.get_classes_active(class_ids, "hubbles_law") == expected
+    assert api.get_class_active(class_ids[0], "hubbles_law") == expected[class_ids[0]]
+    assert mock_server.requests() == 1
+
+
+@pytest.mark.parametrize("mock_server", [{"bulk_active": False}], indirect=True)
+def test_class_activation_falls_back_to_per_class_requests(api, mock_server):
+    class_ids = list(mock_server.state.classes)
+    states = api.get_classes_active(class_ids, "hubbles_law")
+
+    assert states == {
+        class_id: mock_server.state.active[(class_id, "hubbles_law")] for class_id in class_ids
+    }
+    assert not api.bulk_class_active_supported
+    assert mock_server.requests("GET /classes/active/{class_id:int}/{story_name}") == len(class_ids)
+
+    # The bulk endpoint is not tried again
+    api.class_active_cache.clear()
+    api.get_classes_active(class_ids, "hubbles_law")
+
+    assert mock_server.requests("GET /classes/active/{story_name}") == 1
+
+
+def test_async_requests_share_the_retries_breaker_and_stale_responses(monkeypatch):
+    monkeypatch.setattr(remote, "backoff_delay", lambda attempt: 0)
+    monkeypatch.setattr(remote, "BREAKER_FAILURE_THRESHOLD", 3)
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.path)
+
+        if len(calls) == 1:
+            return httpx.Response(200, json={"students": []})
+
+        raise httpx.ConnectError("unreachable", request=request)
+
+    base_api = remote.BaseAPI()
+    async_api = remote.AsyncBaseAPI(base_api, transport=httpx.MockTransport(handler))
+
+    async def main():
+        fresh = await async_api._get("/classes/roster/{class_id}", class_id=1)
+        # Retried, then answered with the last good response
+        stale = await async_api._get("/classes/roster/{class_id}", class_id=1)
+
+        return fresh, stale
+
+    fresh, stale = asyncio.run(main())
+    async_api.close()
+
+    assert stale is fresh
+    assert len(calls) == 1 + 1 + remote.API_RETRIES
+    # The failures count against the breaker the blocking client uses
+    assert base_api.circuit_breaker.state == remote.CircuitBreaker.OPEN
+
+    with pytest.raises(remote.CircuitOpenError):
+        base_api.circuit_breaker.before_request()
+
+
+def test_async_client_is_shared_across_event_loops(async_api, mock_server):
+    code = next(iter(mock_server.state.classes.values()))["code"]
+    clients = []
+
+    def session():
+        # Like a Solara connection, with an event loop of its own
+        assert asyncio.run(async_api.validate_class_code(code))
+        clients.append(async_api.client)
+
+    threads = [threading.Thread(target=session) for _ in range(3)]
+
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    client = clients[0]
+
+    assert clients == [client] * 3
+    assert mock_server.requests("GET /validate-classroom-code/{code}") == 3
+
+    async_api.close()
+
+    assert client.is_closed
+    assert not any(thread.name == "async-api" for thread in threading.enumerate())
+
+    # Started again on demand
+    assert asyncio.run(async_api.validate_class_code(code))
+    assert async_api.client is not client
+
+
+def test_async_api_manages_classes(api, async_api, mock_server, educator):
+    state = mock_server.state
+    expected_active = {
+        class_id: state.active[(class_id, "hubbles_law")] for class_id in state.classes
+    }
+    seen = {}
+
+    async def main():
+        seen["educator"] = await async_api.educator_info()
+        classes = seen["classes"] = (await async_api.load_educator_classes())["classes"]
+        seen["rosters"] = {
+            cls["id"]: students
+            async for cls, students in async_api.iter_class_rosters(classes)
+        }
+        class_ids = [cls["id"] for cls in classes]
+        seen["active"] = await async_api.get_classes_active(class_ids, "hubbles_law")
+        assert await async_api.set_class_active(class_ids[0], "hubbles_law", True)
+
+        seen["new_class"] = await async_api.create_new_class(
+            {
+                "name": "New",
+                "expected_size": 10,
+                "asynchronous": True,
+                "story_name": "hubbles_law",
+            }
+        )
+        seen["after_create"] = (await async_api.load_educator_classes())["classes"]
+        await async_api.delete_class(seen["new_class"]["class"]["id"])
+        seen["after_delete"] = (await async_api.load_educator_classes())["classes"]
+
+    asyncio.run(main())
+    classes = seen["classes"]
+
+    assert seen["educator"]["username"] == async_api.hashed_user
+    assert [cls["id"] for cls in classes] == list(state.classes)
+    assert sorted(seen["rosters"]) == sorted(state.classes)
+    assert all(len(students) == 5 for students in seen["rosters"].values())
+    assert seen["active"] == expected_active
+    assert state.active[(classes[0]["id"], "hubbles_law")] is True
+    assert api.class_active_cache.get((classes[0]["id"], "hubbles_law")) is True
+    # Creating and deleting a class drop the cached class list
+    assert seen["after_create"] == [*classes, seen["new_class"]["class"]]
+    assert seen["after_delete"] == classes
+
+
+def _half_open_api() -> remote.BaseAPI:
+    """A `BaseAPI` whose circuit breaker is waiting for its trial request."""
+    base_api = remote.BaseAPI()
+    base_api.circuit_breaker = remote.CircuitBreaker(failure_threshold=1, cooldown=0)
+    base_api.circuit_breaker.record_failure()
+
+    assert base_api.circuit_breaker.state == remote.CircuitBreaker.HALF_OPEN
+
+    return base_api
+
+
+def test_a_trial_request_failing_unexpectedly_ends_the_trial(monkeypatch):
+    base_api = _half_open_api()
+    calls = []
+
+    def request(*args, **kwargs):
+        calls.append(args)
+
+        if len(calls) == 1:
+            raise requests.exceptions.ChunkedEncodingError("connection broken")
+
+        r = requests.Response()
+        r.status_code = 200
+        r._content = b"{}"
+        return r
+
+    monkeypatch.setattr(base_api.request_session, "request", request)
+
+    with pytest.raises(requests.exceptions.ChunkedEncodingError):
+        base_api._request("GET", "/classes/roster/{class_id}", class_id=1)
+
+    # Not retried, but counted as a failure; the next request is a new trial
+    assert len(calls) == 1
+    assert base_api._request("GET", "/classes/roster/{class_id}", class_id=1).ok
+    assert base_api.circuit_breaker.state == remote.CircuitBreaker.CLOSED
+
+
+def test_an_async_trial_request_failing_or_cancelled_ends_the_trial():
+    base_api = _half_open_api()
+    calls = []
+
+    async def handler(request):
+        calls.append(request.url.path)
+
+        if len(calls) == 1:
+            raise httpx.DecodingError("garbled", request=request)
+        if len(calls) == 2:
+            await asyncio.Event().wait()
+
+        return httpx.Response(200, json={})
+
+    async_api = remote.AsyncBaseAPI(base_api, transport=httpx.MockTransport(handler))
+
+    async def main():
+        with pytest.raises(httpx.DecodingError):
+            await async_api._request("GET", "/classes/{class_id}", class_id=1)
+
+        trial = asyncio.ensure_future(
+            async_api._request("GET", "/classes/{class_id}", class_id=1)
+        )
+
+        while len(calls) < 2 and not trial.done():
+            await asyncio.sleep(0)
+
+        trial.cancel()
+
+        with pytest.raises(asyncio.CancelledError):
+            await trial
+
+        return await async_api._request("GET", "/classes/{class_id}", class_id=1)
+
+    assert asyncio.run(main()).status_code == 200
+    async_api.close()
+    assert base_api.circuit_breaker.state == remote.CircuitBreaker.CLOSED
+
+
+def test_rosters_are_revalidated_with_their_etag(api, mock_server):
+    class_id = next(iter(mock_server.state.classes))
+    endpoint = "/classes/roster/{class_id}"
+    revalidated = metrics.API_CACHE.value(endpoint, "revalidated")
+
+    students = api.load_students_for_class(class_id)
+    unchanged = api.load_students_for_class(class_id)
+
+    # Both reached the server, and the second got a 304 and the decoded body
+    assert mock_server.requests("GET /classes/roster/{class_id:int}") == 2
+    assert unchanged is students
+    assert metrics.API_CACHE.value(endpoint, "revalidated") == revalidated + 1
+
+    with mock_server.state.lock:
+        student = mock_server.state._new_student("late-joiner")
+        mock_server.state.rosters[class_id].append(student["username"])
+
+    changed = api.load_students_for_class(class_id)
+
+    assert changed == [*students, student]
+    assert metrics.API_CACHE.value(endpoint, "revalidated") == revalidated + 1
@@ -0,0 +1,240 @@
+import json
+import uuid
+
+import pytest
+
+solara = pytest.importorskip("solara")
+
+# Imported for its side effect: Solara keeps state (such as the theme) per
+# session only when it knows it runs as a server
+import solara.server.starlette  # noqa: E402, F401
+from solara.server import app as appmodule  # noqa: E402
+from solara.server import kernel, kernel_context  # noqa: E402
+
+from cds_portal import render_cache, widget_messages  # noqa: E402
+
+APP_NAME = "render-cache-test"
+PATH = "/"
+
+clicks = solara.reactive(0)
+
+
+@solara.component
+def Page():
+    solara.Markdown("A page every anonymous visitor sees the same way")
+    solara.Button("Click", on_click=lambda: clicks.set(clicks.value + 1))
+    solara.Text(f"clicks {clicks.value}")
+
+
+class RecordingWebsocket:
+    """Stands in for a browser, keeping the messages sent to it."""
+
+    def __init__(self):
+        self.messages = []
+
+    def send(self, message):
+        self.messages.append(json.loads(message))
+
+    def opened(self) -> list:
+        """Returns the ids of the widgets opened, in order."""
+        return [
+            message["content"]["comm_id"]
+            for message in self.messages
+            if message["msg_type"] == "comm_open"
+        ]
+
+    def models(self) -> dict:
+        """Returns the state of each widget, as the browser would have it."""
+        models = {}
+
+        for message in self.messages:
+            content = message["content"]
+
+            if message["msg_type"] == "comm_open":
+                models[content["comm_id"]] = dict(content["data"]["state"])
+            elif message["msg_type"] == "comm_msg" and content["data"].get("method") == "update":
+                models[content["comm_id"]].update(content["data"]["state"])
+
+        return models
+
+
+class RecordingComm:
+    def __init__(self):
+        self.sent = []
+
+    def send(self, data):
+        self.sent.append(data)
+
+
+def _tree(states: dict, model_id: str):
+    """
+    Returns the state of `model_id` with the widgets of `states` it references
+    inlined. References to other widgets (shared ones the browser already
+    has) are kept as they are.
+    """
+
+    def expand(value):
+        if isinstance(value, str) and value.startswith("IPY_MODEL_") and value[10:] in states:
+            return _tree(states, value[10:])
+        if isinstance(value, (list, tuple)):
+            return [expand(item) for item in value]
+        if isinstance(value, dict):
+            return {key: expand(item) for key, item in value.items()}
+        return value
+
+    return expand(states[model_id])
+
+
+def _trees(states: dict) -> list:
+    """Returns `_tree` of every widget that no other widget references."""
+    referenced = {
+        reference for state in states.values() for reference in widget_messages.references(state)
+    }
+
+    return sorted(
+        json.dumps(_tree(states, model_id), sort_keys=True)
+        for model_id in states
+        if model_id not in referenced
+    )
+
+
+def _context() -> kernel_context.VirtualKernelContext:
+    context = kernel_context.VirtualKernelContext(
+        id=f"test-{uuid.uuid4()}",
+        session_id="",
+        kernel=kernel.Kernel(),
+        control_sockets=[],
+        widgets={},
+        templates={},
+    )
+    context.kernel.session.websockets.add(RecordingWebsocket())
+
+    return context
+
+
+def _websocket(context) -> RecordingWebsocket:
+    return next(iter(context.kernel.session.websockets))
+
+
+@pytest.fixture
+def app():
+    appmodule.apps[APP_NAME] = appmodule.AppScript(f"{__name__}:Page")
+    # Done by the server at startup, outside of any session
+    appmodule.apps[APP_NAME].init()
+    clicks.set(0)
+
+    yield APP_NAME
+
+    appmodule.apps.pop(APP_NAME).close()
+
+
+def _render_uncached(app_name: str):
+    """Renders the page the way Solara does for a session without the cache."""
+    import ipyvuetify
+    import ipywidgets
+
+    context = _context()
+
+    with context:
+        ipywidgets.register_comm_target(context.kernel)
+        appmodule.load_themes(None, False)
+        context.container = ipyvuetify.Html(tag="div")
+        appmodule.load_app_widget(None, appmodule.apps[app_name], PATH)
+
+    return context, context.container.model_id
+
+
+def _serve_cached(cache: render_cache.RenderCache, app_name: str):
+    import ipywidgets
+
+    context = _context()
+    comm = RecordingComm()
+
+    with context:
+        ipywidgets.register_comm_target(context.kernel)
+        args = {"path": PATH, "appName": app_name, "themes": None, "dark": False}
+        assert cache._serve(context, comm, args)
+
+    (finished,) = comm.sent
+    assert finished["method"] == "finished"
+
+    return context, finished["widget_id"]
+
+
+def test_cached_page_matches_uncached_render(app):
+    cache = render_cache.RenderCache(paths=[PATH])
+    uncached, uncached_root = _render_uncached(app)
+    cached, cached_root = _serve_cached(cache, app)
+
+    try:
+        uncached_states = _websocket(uncached).models()
+        cached_states = _websocket(cached).models()
+
+        # The browser is sent the same widgets, under different ids
+        assert _tree(cached_states, cached_root) == _tree(uncached_states, uncached_root)
+        assert _trees(cached_states) == _trees(uncached_states)
+        assert len(cached_states) == len(uncached_states)
+        assert not cached_states.keys() & uncached_states.keys()
+        # and nothing is rendered in the session until it is interacted with
+        assert cached.widgets == {}
+    finally:
+        uncached.close()
+        cached.close()
+
+
+def test_hydrated_session_adopts_the_cached_comm_ids(app):
+    cache = render_cache.RenderCache(paths=[PATH])
+    context, root = _serve_cached(cache, app)
+    websocket = _websocket(context)
+    sent = websocket.models()
+    button_id = next(
+        model_id for model_id, state in sent.items() if state["_model_name"] == "BtnModel"
+    )
+    websocket.messages.clear()
+
+    try:
+        with context:
+            context.kernel.comm_manager.comm_msg(
+                None,
+                None,
+                {
+                    "header": {},
+                    "buffers": [],
+                    "content": {
+                        "comm_id": button_id,
+                        "data": {"method": "custom", "content": {"event": "click", "data": {}}},
+                    },
+                },
+            )
+
+        assert cache.hydrated == 1
+        assert context.container.model_id == root
+
+        # Every live widget took over the id, and the comm, of a cached one
+        assert context.widgets.keys() <= sent.keys()
+        for model_id, widget in context.widgets.items():
+            assert widget.comm.comm_id == model_id
+            assert context.kernel.comm_manager.get_comm(model_id) is widget.comm
+
+        # so the browser is sent no new widgets, only the changed text
+        assert websocket.opened() == []
+        assert "clicks 1" in json.dumps(websocket.messages)
+        live = widget_messages.serialize(context.widgets)
+        texts = [state for state, _, _ in live.values() if state.get("children") == ["clicks 1"]]
+        assert len(texts) == 1
+    finally:
+        context.close()
+
+
+def test_install_is_opt_in(monkeypatch):
+    monkeypatch.setattr(appmodule, "solara_comm_target", appmodule.solara_comm_target)
+    monkeypatch.setattr(render_cache.metrics, "REGISTRY", render_cache.metrics.Registry())
+    monkeypatch.setattr(solara.server.settings.main, "mode", "production")
+
+    assert render_cache.install(paths=[PATH], enabled=False) is None
+
+    monkeypatch.setattr(solara, "__version__", "0.0.1")
+    assert render_cache.install(paths=[PATH], enabled=True) is None
+
+    monkeypatch.setattr(solara, "__version__", widget_messages.SUPPORTED_SOLARA_VERSIONS[0])
+    assert render_cache.install(paths=[PATH], enabled=True) is not None
@@ -0,0 +1,117 @@
+import time
+
+import pytest
+
+from cds_portal.resilience import CircuitBreaker, CircuitOpenError, backoff_delay
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A `time.monotonic` that only moves when the test advances it."""
+
+    class Clock:
+        now = 1000.0
+
+        def advance(self, seconds):
+            self.now += seconds
+
+    clock = Clock()
+    monkeypatch.setattr(time, "monotonic", lambda: clock.now)
+
+    return clock
+
+
+def test_breaker_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=3, cooldown=30)
+
+    for _ in range(2):
+        breaker.before_request()
+        breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.OPEN
+
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+
+    assert breaker.stats() == {
+        "state": CircuitBreaker.OPEN,
+        "consecutive_failures": 3,
+        "times_opened": 1,
+        "rejected": 1,
+    }
+
+
+def test_breaker_success_resets_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=3, cooldown=30)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_breaker_lets_one_trial_through_after_cooldown(clock):
+    breaker = CircuitBreaker(failure_threshold=1, cooldown=30)
+    breaker.record_failure()
+    clock.advance(29)
+
+    assert breaker.state == CircuitBreaker.OPEN
+
+    clock.advance(1)
+
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+    breaker.before_request()
+
+    # Only one request at a time while half-open
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+
+    breaker.record_success()
+
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.before_request()
+
+
+def test_breaker_failed_trial_opens_again(clock):
+    breaker = CircuitBreaker(failure_threshold=2, cooldown=30)
+    breaker.record_failure()
+    breaker.record_failure()
+    clock.advance(30)
+    breaker.before_request()
+    breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.stats()["times_opened"] == 2
+
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+
+
+def test_backoff_delay_is_capped():
+    for attempt in range(10):
+        delay = backoff_delay(attempt, base=0.2, cap=2.0)
+        assert 0 <= delay <= min(2.0, 0.2 * 2**attempt)
+
+
+def test_breaker_trial_can_be_released(clock):
+    breaker = CircuitBreaker(failure_threshold=1, cooldown=30)
+    breaker.record_failure()
+    clock.advance(30)
+
+    assert breaker.before_request()
+
+    # e.g. the trial request was cancelled before it had an outcome
+    breaker.release_trial()
+
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.before_request()
+    breaker.record_success()
+
+    assert not breaker.before_request()
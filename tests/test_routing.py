@@ -0,0 +1,156 @@
+import sys
+import textwrap
+
+import ipyvuetify as v
+import pytest
+import solara
+from solara.components.title import TitleWidget
+
+from cds_portal import routing
+
+PAGES = {
+    "plain": """
+        import solara
+
+        @solara.component
+        def Page():
+            solara.Text("plain page")
+    """,
+    "titled": """
+        import solara
+
+        title = "Custom Title"
+
+        @solara.component
+        def Layout(children=[]):
+            return solara.Column(children=[solara.Text("titled layout"), *children])
+
+        @solara.component
+        def Page():
+            solara.Text("titled page")
+    """,
+    "nested": """
+        import solara
+
+        @solara.component
+        def Page():
+            solara.Text("nested page")
+    """,
+    "nested/child": """
+        import solara
+
+        @solara.component
+        def Page():
+            solara.Text("child page")
+    """,
+}
+
+
+@pytest.fixture
+def pages(tmp_path, monkeypatch):
+    """A package of page packages, like `cds_portal.pages`."""
+    root = tmp_path / "lazy_pages"
+    root.mkdir()
+    (root / "__init__.py").write_text("")
+
+    for name, source in PAGES.items():
+        (root / name).mkdir()
+        (root / name / "__init__.py").write_text(textwrap.dedent(source))
+
+    monkeypatch.syspath_prepend(str(tmp_path))
+
+    yield "lazy_pages", [str(root)]
+
+    for module_name in list(sys.modules):
+        if module_name.split(".")[0] == "lazy_pages":
+            del sys.modules[module_name]
+
+
+@solara.component
+def App(path, routes):
+    solara.routing.router_context.provide(solara.routing.Router(path, routes))
+
+    return solara.autorouting.RenderPage()
+
+
+def _text(rc, text):
+    return rc.find(v.Html, children=[text])
+
+
+def test_routes_are_shaped_like_autorouting_without_importing(pages):
+    routes = routing.lazy_routes(*pages)
+
+    assert [route.path for route in routes] == ["nested", "plain", "titled"]
+    assert [route.label for route in routes] == ["Nested", "Plain", "Titled"]
+    assert [child.path for child in routes[0].children] == ["/", "child"]
+    assert [child.path for child in routes[0].children[1].children] == ["/"]
+    assert not any(module_name.startswith("lazy_pages.") for module_name in sys.modules)
+
+
+@pytest.mark.parametrize(
+    "path, text",
+    [
+        ("/plain", "plain page"),
+        ("/titled", "titled page"),
+        ("/nested", "nested page"),
+        ("/nested/child", "child page"),
+    ],
+)
+def test_every_page_package_resolves_and_renders(pages, path, text):
+    routes = routing.lazy_routes(*pages)
+    box, rc = solara.render(App(path, routes), handle_error=False)
+
+    _text(rc, text).assert_single()
+
+
+def test_page_layout_and_title_are_used(pages):
+    routes = routing.lazy_routes(*pages)
+    box, rc = solara.render(App("/titled", routes), handle_error=False)
+
+    _text(rc, "titled layout").assert_single()
+    _text(rc, "titled page").assert_single()
+    assert {widget.title for widget in rc.find(TitleWidget).widgets} == {
+        "Titled",
+        "Custom Title",
+    }
+
+    # Pages without a layout of their own are not wrapped in one
+    box, rc = solara.render(App("/plain", routes), handle_error=False)
+
+    _text(rc, "titled layout").assert_empty()
+
+
+def test_page_modules_include_nested_packages(pages):
+    assert routing.page_modules(*pages) == [
+        "lazy_pages.nested",
+        "lazy_pages.nested.child",
+        "lazy_pages.plain",
+        "lazy_pages.titled",
+    ]
+
+
+def test_preload_imports_every_page(pages, monkeypatch):
+    monkeypatch.setattr(routing, "PRELOAD", True)
+    routing.preload(*pages, delay=0)
+
+    for thread in routing.threading.enumerate():
+        if thread.name == "preload-pages":
+            thread.join()
+
+    assert set(routing.page_modules(*pages)) <= set(sys.modules)
+
+
+def test_every_portal_page_package_has_a_route():
+    pytest.importorskip("cosmicds")
+    pytest.importorskip("educator_dashboard")
+
+    from cds_portal import pages
+
+    for name in routing._page_names(pages.__path__):
+        router = solara.routing.Router(f"/{name}", pages.routes)
+        page = router.path_routes[-1]
+
+        assert [route.path for route in router.path_routes] == [name, "/"]
+        assert page.component is not None
+        module = routing.import_page(f"{pages.__name__}.{name}")
+        assert callable(module.Page)
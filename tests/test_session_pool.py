@@ -0,0 +1,259 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+solara = pytest.importorskip("solara")
+
+# Imported for its side effect: Solara keeps state (such as the theme) per
+# session only when it knows it runs as a server
+import solara.server.starlette  # noqa: E402, F401
+from solara.server import app as appmodule  # noqa: E402
+from solara.server import kernel_context, server  # noqa: E402
+
+from cds_portal import metrics, session_pool, widget_messages  # noqa: E402
+from cds_portal.widget_messages import SUPPORTED_SOLARA_VERSIONS  # noqa: E402
+
+PATH = "/"
+
+
+@solara.component
+def Page():
+    solara.Markdown("A page every anonymous visitor sees the same way")
+    solara.Button("Click")
+
+
+class RecordingWebsocket:
+    """Stands in for a browser, keeping the messages sent to it."""
+
+    def __init__(self):
+        self.messages = []
+
+    def send(self, message):
+        self.messages.append(json.loads(message))
+
+    def opened(self) -> list:
+        return [
+            message["content"]["comm_id"]
+            for message in self.messages
+            if message["msg_type"] == "comm_open"
+        ]
+
+
+class RecordingComm:
+    """The browser's end of the `solara.control` comm."""
+
+    def __init__(self):
+        self.sent = []
+        self._msg_callback = None
+
+    def send(self, data):
+        self.sent.append(data)
+
+    def on_msg(self, callback):
+        self._msg_callback = callback
+
+
+@pytest.fixture
+def app():
+    # Pooled sessions render the default app
+    previous = appmodule.apps.get("__default__")
+    appmodule.apps["__default__"] = appmodule.AppScript(f"{__name__}:Page")
+    # Done by the server at startup, outside of any session
+    appmodule.apps["__default__"].init()
+
+    yield
+
+    appmodule.apps.pop("__default__").close()
+
+    if previous is not None:
+        appmodule.apps["__default__"] = previous
+
+
+@pytest.fixture
+def pool(app):
+    pool = session_pool.SessionPool(size=1, path=PATH)
+    pool.refills = 0
+
+    def refill():
+        pool.refills += 1
+
+    # Filled by the tests themselves, rather than by a background thread
+    pool._refill = refill
+
+    yield pool
+
+    for context in pool._warm:
+        context.close()
+
+
+def _run(pool, context, path=PATH) -> RecordingComm:
+    """Sends the `run` message a browser sends once it has connected."""
+    comm = RecordingComm()
+
+    with context:
+        pool._comm_target(comm, {})
+        comm._msg_callback(
+            {
+                "content": {
+                    "data": {
+                        "method": "run",
+                        "args": {
+                            "path": path,
+                            "appName": None,
+                            "themes": None,
+                            "dark": False,
+                        },
+                    }
+                }
+            }
+        )
+
+    return comm
+
+
+def test_claimed_session_sends_its_prerendered_widgets(pool):
+    context = pool._prepare()
+    pool._warm.append(context)
+    container_id = context.container.model_id
+    websocket = RecordingWebsocket()
+
+    assert pool.claim("session", "kernel")
+
+    try:
+        assert kernel_context.contexts["kernel"] is context
+        assert context.session_id == "session"
+        assert pool.claimed == 1 and pool.refills == 1
+        assert not pool._warm
+
+        context.kernel.session.websockets.add(websocket)
+        comm = _run(pool, context)
+
+        # The widgets rendered in the background, not a new render
+        assert comm.sent == [{"method": "finished", "widget_id": container_id}]
+        assert context.container.model_id == container_id
+        sent = widget_messages.serialize(context.widgets)
+        assert set(websocket.opened()) == set(sent)
+        assert container_id in websocket.opened()
+        assert "every anonymous visitor" in json.dumps(websocket.messages)
+    finally:
+        context.close()
+
+    # Closing the session drops the kernel's alias to it
+    assert "kernel" not in kernel_context.contexts
+
+
+def test_claimed_session_renders_another_path_from_scratch(pool):
+    context = pool._prepare()
+    pool._warm.append(context)
+    container_id = context.container.model_id
+
+    assert pool.claim("session", "kernel")
+
+    try:
+        comm = _run(pool, context, path="/elsewhere")
+        (finished,) = comm.sent
+
+        assert finished["method"] == "finished"
+        assert finished["widget_id"] == context.container.model_id != container_id
+    finally:
+        context.close()
+
+
+def test_claim_misses_when_the_pool_is_empty(pool):
+    assert not pool.claim("session", "kernel")
+    assert "kernel" not in kernel_context.contexts
+    assert pool.missed == 1 and pool.claimed == 0
+    # Asks for the pool to be filled
+    assert pool.refills == 1
+
+
+def test_claim_leaves_existing_kernels_alone(pool):
+    existing = object()
+    kernel_context.contexts["kernel"] = existing
+    pool._warm.append(pool._prepare())
+
+    try:
+        assert not pool.claim("session", "kernel")
+        assert kernel_context.contexts["kernel"] is existing
+        assert len(pool._warm) == 1
+        assert pool.missed == 0
+    finally:
+        # Gone before the app closes the contexts it knows of
+        del kernel_context.contexts["kernel"]
+
+
+def _wait_until_full(pool):
+    deadline = time.monotonic() + 30
+
+    while len(pool._warm) < pool.size or pool._wanted.is_set():
+        assert time.monotonic() < deadline, "The pool was not filled"
+        time.sleep(0.05)
+
+
+def test_pool_fills_in_the_background(app):
+    pool = session_pool.SessionPool(size=2, path=PATH)
+
+    assert not pool.claim("session", "kernel")
+
+    _wait_until_full(pool)
+
+    assert pool.claim("session", "kernel")
+
+    # and is topped up again
+    _wait_until_full(pool)
+
+    assert len(pool._warm) == 2
+    kernel_context.contexts["kernel"].close()
+
+    for context in list(pool._warm):
+        context.close()
+
+
+@pytest.fixture
+def installable(monkeypatch):
+    monkeypatch.setattr(server, "app_loop", server.app_loop)
+    monkeypatch.setattr(session_pool.metrics, "REGISTRY", metrics.Registry())
+    monkeypatch.setattr(solara.server.settings.main, "mode", "production")
+    monkeypatch.setattr(solara, "__version__", SUPPORTED_SOLARA_VERSIONS[0])
+
+
+def test_install_bails_out(installable, monkeypatch):
+    app_loop = server.app_loop
+
+    assert session_pool.install(size=0) is None
+
+    monkeypatch.setattr(solara.server.settings.main, "mode", "development")
+    assert session_pool.install(size=1) is None
+
+    monkeypatch.setattr(solara.server.settings.main, "mode", "production")
+    monkeypatch.setattr(solara, "__version__", "0.0.1")
+    assert session_pool.install(size=1) is None
+
+    assert server.app_loop is app_loop
+
+
+def test_install_claims_for_anonymous_connections(installable, monkeypatch):
+    connected = []
+    claims = []
+
+    async def app_loop(ws, cookies, headers, session_id, kernel_id, page_id, user=None):
+        connected.append(kernel_id)
+
+    monkeypatch.setattr(server, "app_loop", app_loop)
+    monkeypatch.setattr(
+        session_pool.SessionPool, "claim", lambda self, *ids: claims.append(ids)
+    )
+    pool = session_pool.install(size=1)
+
+    assert pool is not None
+
+    asyncio.run(server.app_loop(None, {}, {}, "session-1", "kernel-1", "page"))
+    asyncio.run(
+        server.app_loop(None, {}, {}, "session-2", "kernel-2", "page", user={})
+    )
+
+    assert connected == ["kernel-1", "kernel-2"]
+    # Signed in visitors get a session of their own
+    assert claims == [("session-1", "kernel-1")]
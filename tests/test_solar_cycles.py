@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+
+from cds_portal.solar import cycles
+from cds_portal.solar.data import decimal_years_to_datetime
+
+# Start years of cycles 19 to 24 as published by SILSO
+PUBLISHED_STARTS = [1954.3, 1964.8, 1976.2, 1986.7, 1996.4, 2008.9]
+
+
+def _synthetic(first_minimum: float, period: float = 11.0):
+    """Daily sunspot numbers and yearly TSI with minima every `period` years."""
+    years = np.arange(1945, 2018, 1 / 365.25)
+    phase = 2 * np.pi * (years - first_minimum) / period
+    sunspots = 100 * (1 - np.cos(phase)) / 2
+    sunspot_df = pd.DataFrame(
+        {
+            "Year": years,
+            "Sunspot_Number": sunspots,
+            "Date": decimal_years_to_datetime(years),
+        }
+    )
+    tsi_years = np.arange(1945, 2018) + 0.5
+    tsi = 1360.5 + (1 - np.cos(2 * np.pi * (tsi_years - first_minimum) / period)) / 2
+    tsi_df = pd.DataFrame(
+        {"Year": tsi_years, "TSI": tsi, "Date": decimal_years_to_datetime(tsi_years)}
+    )
+
+    return sunspot_df, tsi_df
+
+
+def test_cycle_numbers():
+    assert cycles.cycle_numbers(PUBLISHED_STARTS).tolist() == [19, 20, 21, 22, 23, 24]
+
+
+def test_compute_cycles_finds_the_minima():
+    sunspot_df, tsi_df = _synthetic(first_minimum=1954.3)
+    found = cycles.compute_cycles(sunspot_df, tsi_df)
+    expected_starts = [1954.3, 1965.3, 1976.3, 1987.3, 1998.3, 2009.3]
+
+    assert found["number"].tolist() == [18, 19, 20, 21, 22, 23, 24]
+    # The cycle in progress when the data starts has no start
+    assert pd.isna(found["start"].iloc[0])
+    np.testing.assert_allclose(found["start_year"].iloc[1:], expected_starts, atol=0.1)
+    np.testing.assert_allclose(found["amplitude"].iloc[1:], 100, rtol=0.01)
+
+    # TSI follows the sunspot number exactly
+    np.testing.assert_allclose(found["tsi_correlation"].iloc[1:], 1, atol=1e-3)
+
+
+def test_compute_cycles_without_a_minimum():
+    sunspot_df, tsi_df = _synthetic(first_minimum=1900, period=300)
+    found = cycles.compute_cycles(sunspot_df, tsi_df)
+
+    assert len(found) == 1
+    assert pd.isna(found["start"].iloc[0])
+    # Numbered from when the smoothed series starts, in mid-1945
+    assert found["number"].iloc[0] == 18
+
+
+def test_bundled_cycles_match_published_dates():
+    found = cycles.solar_cycles()
+
+    assert found["number"].tolist() == [18, 19, 20, 21, 22, 23, 24]
+    np.testing.assert_allclose(found["start_year"].iloc[1:], PUBLISHED_STARTS, atol=0.5)
+    assert (found["tsi_correlation"] > 0.8).all()
@@ -0,0 +1,92 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from cds_portal.solar import data
+
+
+def test_decimal_years_to_datetime():
+    dates = data.decimal_years_to_datetime([2000.0, 2001.5, 2000.5, 1969.0])
+
+    assert list(dates) == [
+        np.datetime64("2000-01-01T00:00", "ns"),
+        np.datetime64("2001-07-02T12:00", "ns"),
+        # 2000 is a leap year, so its middle is a day earlier in the calendar
+        np.datetime64("2000-07-02T00:00", "ns"),
+        np.datetime64("1969-01-01T00:00", "ns"),
+    ]
+
+
+def test_decimal_years_round_trip():
+    years = np.linspace(1945, 2018, 1001)
+
+    np.testing.assert_allclose(
+        data.datetime_to_decimal_years(data.decimal_years_to_datetime(years)), years, atol=1e-9
+    )
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / "series.csv"
+    pd.DataFrame({"Year": [2000.0, 2000.5, 2001.0], "TSI": [1.0, 2.0, 3.0], "Other": 0}).to_csv(
+        path, index=False
+    )
+
+    return path
+
+
+def test_load_series_parses_and_caches(csv_path, monkeypatch):
+    df = data.load_series(csv_path, "TSI")
+
+    assert list(df.columns) == ["Year", "TSI", "Date"]
+    assert df["Date"].iloc[0] == pd.Timestamp("2000-01-01")
+    assert csv_path.with_suffix(".npz").exists()
+
+    def read_csv(*args, **kwargs):
+        raise AssertionError("The CSV should not be parsed again")
+
+    monkeypatch.setattr(pd, "read_csv", read_csv)
+
+    pd.testing.assert_frame_equal(data.load_series(csv_path, "TSI"), df)
+
+
+def test_load_series_caches_in_a_directory(csv_path, tmp_path):
+    cache_dir = tmp_path / "cache"
+    cache_dir.mkdir()
+
+    df = data.load_series(csv_path, "TSI", cache_dir)
+
+    assert (cache_dir / "series.npz").exists()
+    assert not csv_path.with_suffix(".npz").exists()
+    pd.testing.assert_frame_equal(data.load_series(csv_path, "TSI", cache_dir), df)
+
+
+def test_load_series_reparses_a_changed_csv(csv_path):
+    data.load_series(csv_path, "TSI")
+    pd.DataFrame({"Year": [2010.0], "TSI": [4.0]}).to_csv(csv_path, index=False)
+    stat = csv_path.stat()
+    os.utime(csv_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    df = data.load_series(csv_path, "TSI")
+
+    assert df["TSI"].tolist() == [4.0]
+    assert df["Date"].iloc[0] == pd.Timestamp("2010-01-01")
+
+
+def test_bundled_series_load(solar_cache_dir):
+    data.load_sunspots.cache_clear()
+    data.load_tsi.cache_clear()
+
+    sunspots = data.load_sunspots()
+    tsi = data.load_tsi()
+
+    assert sunspots["Date"].is_monotonic_increasing
+    assert tsi["Date"].is_monotonic_increasing
+    assert sunspots["Date"].iloc[0].year == 1945
+
+    for csv_path in (data.SUNSPOT_CSV, data.TSI_CSV):
+        assert (solar_cache_dir / csv_path.with_suffix(".npz").name).exists()
+        # Not written into the package
+        assert not csv_path.with_suffix(".npz").exists()
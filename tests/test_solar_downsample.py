@@ -0,0 +1,76 @@
+import numpy as np
+
+from cds_portal.solar.downsample import downsample, lttb
+
+
+def test_lttb_keeps_short_series():
+    x = np.arange(10)
+
+    assert lttb(x, x, 10).tolist() == list(range(10))
+    assert lttb(x, x, 20).tolist() == list(range(10))
+    assert lttb(x, x, 2).tolist() == list(range(10))
+
+
+def test_lttb_keeps_endpoints_and_one_point_per_bucket():
+    rng = np.random.default_rng(0)
+    x = np.arange(1000)
+    y = rng.normal(size=1000)
+    indices = lttb(x, y, 100)
+
+    assert len(indices) == 100
+    assert indices[0] == 0 and indices[-1] == 999
+    assert np.all(np.diff(indices) > 0)
+
+    # Each kept point comes from its own bucket
+    edges = np.linspace(1, 999, 99).astype(int)
+    assert np.all((indices[1:-1] >= edges[:-1]) & (indices[1:-1] < edges[1:]))
+
+
+def test_lttb_preserves_peaks():
+    x = np.arange(10_000)
+    y = np.zeros(10_000)
+    peaks = [1234, 5678, 9000]
+    y[peaks] = [50, -80, 120]
+
+    assert set(peaks) <= set(lttb(x, y, 200).tolist())
+
+
+def test_lttb_accepts_datetimes():
+    x = np.arange("2000-01-01", "2010-01-01", dtype="datetime64[D]").astype("datetime64[ns]")
+    y = np.sin(np.arange(len(x)) / 50)
+    y[1500] = 10
+
+    indices = lttb(x, y, 300)
+
+    assert len(indices) == 300
+    assert 1500 in indices
+
+
+def test_downsample_drops_nans():
+    x = np.arange(10)
+    y = np.array([0, 1, np.nan, 3, 4, np.nan, 6, 7, 8, 9], dtype=float)
+
+    xs, ys = downsample(x, y, n_out=100)
+
+    assert xs.tolist() == [0, 1, 3, 4, 6, 7, 8, 9]
+    assert not np.isnan(ys).any()
+
+
+def test_downsample_window_reaches_the_edges():
+    x = np.arange(100)
+    y = x * 2.0
+
+    xs, ys = downsample(x, y, n_out=1000, x_range=(10.5, 20.5))
+
+    # The points inside the window plus one on either side
+    assert xs.tolist() == list(range(10, 22))
+    assert ys.tolist() == [value * 2.0 for value in range(10, 22)]
+
+
+def test_downsample_limits_points():
+    x = np.arange(26_000)
+    y = np.sin(x / 100)
+
+    xs, ys = downsample(x, y, n_out=2000)
+
+    assert len(xs) == len(ys) == 2000
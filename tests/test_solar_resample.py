@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+
+from cds_portal.solar import resample
+
+
+def _daily(start: str, days: int, values=None) -> pd.DataFrame:
+    dates = pd.date_range(start, periods=days, freq="D")
+    values = np.arange(days, dtype=float) if values is None else values
+
+    return pd.DataFrame({"Date": dates, "Sunspot_Number": values})
+
+
+def test_aggregate_means_per_period_dated_at_the_middle():
+    df = _daily("2001-01-01", 59)  # January and February
+    monthly = resample.aggregate(df, "Sunspot_Number", "monthly")
+
+    assert monthly["Sunspot_Number"].tolist() == [15.0, 44.5]
+    assert monthly["Date"].dt.floor("D").tolist() == [
+        pd.Timestamp("2001-01-16"),
+        pd.Timestamp("2001-02-14"),
+    ]
+
+
+def test_aggregate_leaves_out_empty_periods():
+    values = np.r_[np.ones(31), np.full(28, np.nan), np.full(31, 3.0)]
+    monthly = resample.aggregate(_daily("2001-01-01", 90, values), "Sunspot_Number", "monthly")
+
+    assert monthly["Sunspot_Number"].tolist() == [1.0, 3.0]
+    assert [date.month for date in monthly["Date"]] == [1, 3]
+
+
+def test_aggregates_reuse_the_series_at_or_below_its_resolution():
+    df = _daily("2001-01-01", 730)
+    yearly_df = resample.aggregate(df, "Sunspot_Number", "yearly")
+    daily = resample.aggregates(df, "Sunspot_Number", "daily")
+    yearly = resample.aggregates(yearly_df, "Sunspot_Number", "yearly")
+
+    assert list(daily) == list(resample.RESOLUTIONS)
+    assert len(daily["daily"]) == 730
+    assert len(daily["monthly"]) == 24
+    assert len(daily["yearly"]) == 2
+    # A yearly series has nothing finer to show
+    assert all(frame is yearly["daily"] for frame in yearly.values())
+
+
+def test_effective_resolution():
+    assert resample.effective_resolution("daily", "monthly") == "monthly"
+    assert resample.effective_resolution("yearly", "daily") == "yearly"
+    assert resample.effective_resolution("yearly", "yearly") == "yearly"
+
+
+def test_bundled_aggregates_are_computed_once():
+    assert resample.sunspot_aggregates() is resample.sunspot_aggregates()
+    assert len(resample.tsi_aggregates()["daily"]) == len(resample.tsi_aggregates()["yearly"])
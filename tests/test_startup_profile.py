@@ -0,0 +1,192 @@
+import os
+import sys
+import textwrap
+
+import pytest
+
+from cds_portal import startup_profile
+
+MODULES = {
+    "__init__": """
+        from . import child
+    """,
+    "child": """
+        from . import leaf
+    """,
+    "leaf": """
+        import time
+
+        time.sleep(0.05)
+    """,
+    "broken/__init__": """
+        raise ImportError("missing dependency")
+    """,
+}
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """A package importing a child that imports a slow leaf module."""
+    root = tmp_path / "profiled_app"
+
+    for name, source in MODULES.items():
+        path = root / f"{name}.py"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(textwrap.dedent(source))
+
+    monkeypatch.syspath_prepend(str(tmp_path))
+
+    yield "profiled_app"
+
+    for module_name in list(sys.modules):
+        if module_name.split(".")[0] == "profiled_app":
+            del sys.modules[module_name]
+
+
+def test_import_recorder_times_nested_imports(app):
+    recorder = startup_profile.ImportRecorder()
+    recorder.install()
+
+    try:
+        import profiled_app  # noqa: F401
+    finally:
+        recorder.uninstall()
+
+    assert recorder not in sys.meta_path
+    imports = {entry["module"]: entry for entry in recorder.imports}
+
+    # Recorded as each import finishes, innermost first
+    assert [entry["module"] for entry in recorder.imports] == [
+        "profiled_app.leaf",
+        "profiled_app.child",
+        "profiled_app",
+    ]
+    assert imports["profiled_app.leaf"]["parents"] == [
+        "profiled_app",
+        "profiled_app.child",
+    ]
+    assert imports["profiled_app"]["parents"] == []
+    assert {entry["phase"] for entry in recorder.imports} == {"startup"}
+
+    leaf, child = imports["profiled_app.leaf"], imports["profiled_app.child"]
+    assert leaf["self"] == leaf["cumulative"] >= 0.05
+    # The leaf's time is not the child's own
+    assert child["cumulative"] >= leaf["cumulative"] > child["self"]
+
+
+def test_profile_startup_phases_and_errors(app):
+    result = startup_profile.profile_startup(app, render=False)
+
+    assert list(result["phases"]) == ["app", "pages"]
+    assert result["cold_start"] == result["phases"]["app"]
+    assert result["errors"] == ["broken: ImportError('missing dependency')"]
+    assert {entry["module"]: entry["phase"] for entry in result["imports"]} == {
+        "profiled_app.leaf": "app",
+        "profiled_app.child": "app",
+        "profiled_app": "app",
+        "profiled_app.broken": "pages",
+    }
+
+
+def test_folded_stacks():
+    entry = {"memory": None, "self_memory": None, "cumulative": 0}
+    result = {
+        "imports": [
+            {**entry, "module": "b", "phase": "app", "parents": ["a"], "self": 0.25},
+            {**entry, "module": "a", "phase": "app", "parents": [], "self": 0.5},
+            {**entry, "module": "b", "phase": "app", "parents": ["a"], "self": 1e-6},
+            {
+                **entry,
+                "module": "c",
+                "phase": "pages",
+                "parents": ["<thread preload-pages>"],
+                "self": 0.1,
+            },
+        ]
+    }
+
+    assert startup_profile.folded_stacks(result) == [
+        "app;a 500000",
+        "app;a;b 250001",
+        "pages;<thread preload-pages>;c 100000",
+    ]
+
+
+def _run(cold_start: float, errors: list = ()) -> dict:
+    return {
+        "phases": {"app": cold_start},
+        "cold_start": cold_start,
+        "imports": [
+            {
+                "module": "app",
+                "phase": "app",
+                "parents": [],
+                "cumulative": cold_start,
+                "self": cold_start,
+                "memory": None,
+                "self_memory": None,
+            }
+        ],
+        "errors": list(errors),
+    }
+
+
+@pytest.fixture
+def runs(monkeypatch, tmp_path):
+    """Stands in for the profiled subprocesses, returning canned runs."""
+    runs = []
+    monkeypatch.setattr(
+        startup_profile, "_profile_in_subprocess", lambda args: runs.pop(0)
+    )
+    monkeypatch.chdir(tmp_path)
+
+    return runs
+
+
+@pytest.mark.parametrize(
+    "budget, status", [(None, 0), ("2.5", 0), ("2", 0), ("1.5", 1)]
+)
+def test_budget_exit_status(runs, budget, status):
+    runs += [_run(1), _run(2), _run(3)]
+    args = ["--repeat", "3"] + (["--budget", budget] if budget else [])
+
+    assert startup_profile.main(args) == status
+    assert not runs
+
+    report = open("startup-profile.txt").read()
+    assert report.startswith("Cold start: 2.000s median of 3 run(s)")
+
+    if budget:
+        verdict = "OK" if status == 0 else "EXCEEDED"
+        assert f"Budget: {float(budget):.3f}s, {verdict}" in report
+
+    assert open("startup-profile.folded").read() == "app;app 2000000\n"
+
+
+def test_errors_fail_within_the_budget(runs):
+    runs += [_run(1), _run(1, ["broken: ImportError()"])]
+
+    assert startup_profile.main(["--repeat", "2", "--budget", "10"]) == 1
+    assert "Budget: 10.000s, FAILED (errors)" in open("startup-profile.txt").read()
+
+
+def test_profiles_in_a_fresh_interpreter(app, tmp_path, monkeypatch, capsys):
+    # The child interpreter finds the app and `cds_portal` the way this one did
+    monkeypatch.setenv("PYTHONPATH", os.pathsep.join(sys.path))
+    monkeypatch.chdir(tmp_path)
+
+    status = startup_profile.main(
+        ["--app", app, "--no-render", "--budget", "60", "--report", "report.txt"]
+    )
+
+    # The broken page package fails the run
+    assert status == 1
+    report = (tmp_path / "report.txt").read_text()
+    assert "Error: broken: ImportError('missing dependency')" in report
+    assert "profiled_app.leaf" in report
+    assert report in capsys.readouterr().out
+    folded = (tmp_path / "startup-profile.folded").read_text().splitlines()
+    assert any(
+        line.startswith("app;profiled_app;profiled_app.child;profiled_app.leaf ")
+        for line in folded
+    )
@@ -0,0 +1,101 @@
+import json
+
+import pytest
+
+from cds_portal.stories.catalog import Catalog, Story, load_catalog, tokenize
+
+
+def _story(name, description="", tags=()):
+    return Story.from_dict(
+        {
+            "name": name,
+            "description": description,
+            "image_filename": "image.png",
+            "url": f"https://example.org/{name}",
+            "tags": list(tags),
+        }
+    )
+
+
+@pytest.fixture
+def catalog():
+    return Catalog(
+        [
+            _story("Hubble's Law", "Measure the *expansion* of the universe.", ["data science"]),
+            _story("Nova", "A star flares up. See the [guide](https://nova.example.org).", ["nova"]),
+            _story("Supernova", "An exploding star in the Pinwheel galaxy.", ["supernova"]),
+            _story("Solar Eclipse", "Watch the Moon cover the Sun.", ["eclipse"]),
+            _story("Annular Eclipse", "A ring of fire.", ["eclipse"]),
+            _story("Brick", "A dark cloud in the Milky Way.", ["milky way", "nebula"]),
+        ]
+    )
+
+
+def _names(stories) -> list:
+    return [story.name for story in stories]
+
+
+def test_tokenize_folds_case_and_accents():
+    assert tokenize("Ångström's  Café, NOVA!") == ["angstrom", "s", "cafe", "nova"]
+
+
+def test_story_description_is_rendered_once():
+    story = _story("Story", "Some *emphasis*.")
+
+    assert story.description_html == "<p>Some <em>emphasis</em>.</p>"
+
+
+def test_empty_search_matches_everything_in_order(catalog):
+    assert catalog.search() == list(catalog.stories)
+    assert catalog.search("   ") == list(catalog.stories)
+
+
+def test_search_by_word_prefix(catalog):
+    assert _names(catalog.search("ecl")) == ["Solar Eclipse", "Annular Eclipse"]
+    # Words match from their start only
+    assert _names(catalog.search("nova")) == ["Nova"]
+    assert _names(catalog.search("super")) == ["Supernova"]
+    # Every word has to match
+    assert _names(catalog.search("star pinwheel")) == ["Supernova"]
+    assert catalog.search("eclipse pinwheel") == []
+
+
+def test_search_covers_names_descriptions_and_tags(catalog):
+    assert _names(catalog.search("HUBBLE")) == ["Hubble's Law"]
+    assert _names(catalog.search("expansion")) == ["Hubble's Law"]
+    assert _names(catalog.search("science")) == ["Hubble's Law"]
+    # but not link targets
+    assert catalog.search("example") == []
+
+
+def test_search_by_tags(catalog):
+    assert _names(catalog.search(tags=["eclipse"])) == ["Solar Eclipse", "Annular Eclipse"]
+    assert _names(catalog.search(tags=["nova", "nebula"])) == ["Nova", "Brick"]
+    assert _names(catalog.search(tags=["milky way", "nebula"], match_all=True)) == ["Brick"]
+    assert catalog.search(tags=["nova", "nebula"], match_all=True) == []
+    assert catalog.search(tags=["unknown"]) == []
+
+
+def test_search_by_text_and_tags(catalog):
+    assert _names(catalog.search("annular", tags=["eclipse"])) == ["Annular Eclipse"]
+    assert catalog.search("annular", tags=["nova"]) == []
+
+
+def test_catalog_tags_are_sorted_and_distinct(catalog):
+    assert catalog.tags == ("data science", "eclipse", "milky way", "nebula", "nova", "supernova")
+
+
+def test_load_catalog(tmp_path):
+    path = tmp_path / "stories.json"
+    path.write_text(
+        json.dumps(
+            [{"name": "Story", "description": "Text", "image_filename": "a.png", "url": "u"}]
+        )
+    )
+
+    catalog = load_catalog(path)
+
+    assert _names(catalog.search()) == ["Story"]
+    assert catalog.stories[0].tags == ()
+    assert load_catalog(path) is catalog
+    assert load_catalog().search(tags=["eclipse"])
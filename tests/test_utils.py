@@ -0,0 +1,133 @@
+import threading
+import time
+
+import ipyvuetify as v
+import pytest
+import solara
+
+from cds_portal.utils import use_api_resource
+
+
+class Fetch:
+    """A fetch function whose runs only finish when the test releases them."""
+
+    def __init__(self):
+        self.started = 0
+        self.finished = 0
+        self.fail = False
+        self._released = threading.Event()
+
+    def run(self):
+        self.started += 1
+        run = self.started
+
+        while not self._released.is_set():
+            time.sleep(0.01)
+
+        self._released.clear()
+
+        if self.fail:
+            raise RuntimeError("The API is down")
+
+        self.finished += 1
+        return f"result {run}"
+
+    def release(self):
+        self._released.set()
+
+
+def _wait_for(condition, timeout: float = 5):
+    deadline = time.monotonic() + timeout
+
+    while not condition():
+        assert time.monotonic() < deadline, "Timed out"
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def fetch():
+    fetch = Fetch()
+
+    yield fetch
+
+    # Let any run still going end
+    fetch.release()
+
+
+@pytest.fixture
+def render(fetch):
+    resources = []
+
+    @solara.component
+    def Resource():
+        resource = use_api_resource(fetch.run, initial="initial")
+        resources.append(resource)
+
+        return solara.Text(f"{resource.data} {resource.loading}")
+
+    box, rc = solara.render(Resource(), handle_error=False)
+
+    yield rc, resources
+
+    rc.close()
+
+
+def _text(rc) -> str:
+    return rc.find(v.Html).widget.children[0]
+
+
+def test_initial_until_the_first_result(fetch, render):
+    rc, resources = render
+
+    _wait_for(lambda: fetch.started == 1)
+    assert _text(rc) == "initial True"
+
+    fetch.release()
+
+    _wait_for(lambda: _text(rc) == "result 1 False")
+    assert resources[-1].error is None
+
+
+def test_refresh_keeps_the_last_result(fetch, render):
+    rc, resources = render
+    fetch.release()
+    _wait_for(lambda: _text(rc) == "result 1 False")
+
+    resources[-1].refresh()
+
+    _wait_for(lambda: fetch.started == 2)
+    # Not back to `initial` while refreshing
+    assert _text(rc) == "result 1 True"
+
+    fetch.release()
+
+    _wait_for(lambda: _text(rc) == "result 2 False")
+
+
+def test_failed_refresh_keeps_the_last_result(fetch, render):
+    rc, resources = render
+    fetch.release()
+    _wait_for(lambda: _text(rc) == "result 1 False")
+
+    fetch.fail = True
+    resources[-1].refresh()
+    _wait_for(lambda: fetch.started == 2)
+    fetch.release()
+
+    _wait_for(lambda: resources[-1].error is not None)
+    assert _text(rc) == "result 1 False"
+    assert str(resources[-1].error) == "The API is down"
+
+
+def test_unmounting_cancels_the_run(fetch, render):
+    rc, resources = render
+    _wait_for(lambda: fetch.started == 1)
+    task = resources[-1].refresh
+
+    rc.close()
+    fetch.release()
+
+    # A thread cannot be interrupted; its result is discarded instead
+    _wait_for(lambda: not task.pending)
+    assert fetch.finished == 1
+    assert task.cancelled and task.value is None